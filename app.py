@@ -1,9 +1,13 @@
 import os
 import logging
-from flask import Flask, render_template, session
-from flask_socketio import SocketIO, emit
-from compiler_service import start_interactive_session, get_output, send_input, cleanup_session, get_or_create_session
-from utils.socketio_logger import log_socket_event, track_connection, track_session, log_error
+from flask import Flask, Response, render_template, session, request
+from flask_socketio import SocketIO, emit, join_room, leave_room
+from compiler_service import (
+    start_interactive_session, get_output, send_input, cleanup_session,
+    get_or_create_session, start_output_stream
+)
+from utils.socketio_logger import log_socket_event, track_connection, track_session, log_error, metrics
+from utils.compile_scheduler import get_compile_scheduler, SchedulerFull
 
 # Enhanced logging
 logging.basicConfig(level=logging.DEBUG)
@@ -18,6 +22,11 @@ def index():
     """Render the main page with C# editor and console"""
     return render_template('index.html')
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Socket.IO metrics in the Prometheus text format"""
+    return Response(metrics.prometheus_text(), mimetype='text/plain; version=0.0.4')
+
 @socketio.on('connect')
 def handle_connect():
     """Handle new socket connection with tracking"""
@@ -50,18 +59,44 @@ def handle_compile_and_run(data):
     try:
         logger.info("Received compile_and_run request")
         code = data.get('code', '')
+        language = data.get('language', 'csharp')
 
         if not code:
             logger.warning("No code provided in compile_and_run request")
             emit('output', {'success': False, 'error': 'No code provided'})
             return
 
-        # Create new interactive session
-        logger.info("Creating new session for compilation")
-        interactive_session = get_or_create_session()
-
-        logger.info(f"Starting interactive session with id: {interactive_session.session_id}")
-        result = start_interactive_session(interactive_session, code, 'csharp')
+        # Release the previous run's session before starting a new one
+        previous_session_id = session.pop('session_id', None)
+        if previous_session_id:
+            leave_room(previous_session_id)
+            cleanup_session(previous_session_id)
+            track_session(previous_session_id, active=False)
+
+        sid = request.sid
+
+        def compile_job():
+            # Create new interactive session once the job is admitted
+            logger.info("Creating new session for compilation")
+            new_session = get_or_create_session()
+            logger.info(f"Starting interactive session with id: {new_session.session_id}")
+            return new_session, start_interactive_session(new_session, code, language)
+
+        def publish_position(position):
+            socketio.emit('queue_position', {'position': position}, to=sid)
+
+        try:
+            interactive_session, result = get_compile_scheduler().run(
+                sid, compile_job, on_position=publish_position
+            )
+        except SchedulerFull as e:
+            logger.warning(f"Compile request rejected: {e}, retry after {e.retry_after}s")
+            emit('output', {
+                'success': False,
+                'error': f'The server is busy, please try again in {e.retry_after} seconds',
+                'retry_after': e.retry_after
+            })
+            return
 
         logger.info(f"Interactive session result: {result}")
 
@@ -70,17 +105,25 @@ def handle_compile_and_run(data):
             session['session_id'] = interactive_session.session_id
             track_session(interactive_session.session_id, active=True)
 
-            logger.info(f"Getting initial output for session: {interactive_session.session_id}")
-            output_result = get_output(interactive_session.session_id)
-
-            logger.info(f"Emitting output result: {output_result}")
+            # Program output is pushed to the session's room as it is produced
+            room = interactive_session.session_id
+            join_room(room)
             emit('output', {
                 'success': True,
-                'output': output_result.get('output', ''),
-                'waiting_for_input': output_result.get('waiting_for_input', False),
-                'session_id': interactive_session.session_id
+                'output': '',
+                'waiting_for_input': True,
+                'session_id': room
             })
+
+            def push_output(payload):
+                socketio.emit('output', payload, to=room)
+
+            logger.info(f"Streaming output for session: {room}")
+            stream_result = start_output_stream(room, push_output)
+            if not stream_result['success']:
+                emit('output', stream_result)
         else:
+            cleanup_session(interactive_session.session_id)
             error_msg = result.get('error', 'Compilation failed')
             logger.error(f"Compilation failed: {error_msg}")
             emit('output', {
@@ -116,6 +159,9 @@ def handle_input(data):
 
         if result['success']:
             output_result = get_output(session_id)
+            if output_result.get('streaming'):
+                # The output stream pushes whatever the program prints next
+                return
             logger.info(f"Got output after input: {output_result}")
             emit('output', {
                 'success': True,
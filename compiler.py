@@ -2,24 +2,37 @@ import os
 import subprocess
 import logging
 import pty
-import select
 import uuid
 from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
 
 # Basic logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Constants section update
+MAX_COMPILATION_TIME = 30  # Increased from 20
+MAX_EXECUTION_TIME = 10   # Increased from 5
+MEMORY_LIMIT = 512
+MAX_PARALLEL_COMPILATIONS = min(os.cpu_count() or 4, 8)
+CONNECTION_TIMEOUT = 45  # New timeout for socket connections
+RETRY_ATTEMPTS = 3      # Number of retry attempts
+CPP_WORKSPACE = os.path.join(os.getcwd(), 'compiler_workspace')
+os.makedirs(CPP_WORKSPACE, exist_ok=True)
+
 # Simple session management
 active_sessions = {}
 session_lock = Lock()
 
 class InteractiveSession:
-    def __init__(self, process, master_fd, slave_fd):
+    def __init__(self, process, master_fd, slave_fd, workspace=None):
         self.process = process
+        self.workspace = workspace
         self.master_fd = master_fd
         self.slave_fd = slave_fd
-        self.output_buffer = []
+        # Bounded: the multiplexer fills it, get_output drains it
+        self.output_buffer = OutputRingBuffer()
+        self.reported_dropped = 0
         self.waiting_for_input = False
         self.input_patterns = ['Console.Read', 'Console.ReadLine', 'Enter']
 
@@ -28,39 +41,53 @@ def compile_and_run(code: str, language: str = 'csharp', session_id: str = None)
     if not code:
         return {'success': False, 'error': "No code provided"}
 
+    if language == 'cpp':
+        return compile_and_run_cpp(code, session_id)
     if language != 'csharp':
-        return {'success': False, 'error': "Only C# is supported"}
+        return {'success': False, 'error': f"Unsupported language: {language}"}
 
     try:
         session_id = session_id or str(uuid.uuid4())
         master_fd, slave_fd = pty.openpty()
 
-        # Create C# project and compile
-        with open('Program.cs', 'w') as f:
-            f.write(code)
-
-        # Simple project file
-        with open('program.csproj', 'w') as f:
-            f.write("""<Project Sdk="Microsoft.NET.Sdk">
+        project_content = """<Project Sdk="Microsoft.NET.Sdk">
               <PropertyGroup>
                 <OutputType>Exe</OutputType>
                 <TargetFramework>net7.0</TargetFramework>
               </PropertyGroup>
-            </Project>""")
-
-        # Compile
-        compile_result = subprocess.run(
-            ['dotnet', 'build', 'program.csproj', '--nologo'],
-            capture_output=True,
-            text=True
-        )
-
-        if compile_result.returncode != 0:
-            return {'success': False, 'error': compile_result.stderr}
-
-        # Run the compiled program
-        process = subprocess.Popen(
-            ['dotnet', 'run', '--no-build'],
+            </Project>"""
+        cache_key = build_cache.get_key(code, project_content)
+        cached_build = build_cache.lookup(cache_key)
+
+        if cached_build is None:
+            # Create C# project and compile
+            with open('Program.cs', 'w') as f:
+                f.write(code)
+
+            # Simple project file
+            with open('program.csproj', 'w') as f:
+                f.write(project_content)
+
+            # Compile on a warm build worker
+            compile_result = get_build_pool().build(
+                'program.csproj',
+                os.getcwd(),
+                MAX_COMPILATION_TIME,
+                configuration='Debug'
+            )
+
+            if compile_result.returncode != 0:
+                return {'success': False, 'error': compile_result.stderr}
+
+            cached_build = build_cache.store(cache_key, Path('bin') / 'Debug' / 'net7.0')
+
+        # Run the compiled program, straight from the cache when available
+        if cached_build is not None:
+            command = [str(cached_build / 'program')]
+        else:
+            command = ['dotnet', 'run', '--no-build']
+        process = sandboxed_popen(
+            command,
             stdin=slave_fd,
             stdout=slave_fd,
             stderr=slave_fd,
@@ -71,6 +98,7 @@ def compile_and_run(code: str, language: str = 'csharp', session_id: str = None)
         session = InteractiveSession(process, master_fd, slave_fd)
         with session_lock:
             active_sessions[session_id] = session
+        get_multiplexer().register(session_id, master_fd, process, buffer=session.output_buffer)
 
         return {
             'success': True,
@@ -82,6 +110,49 @@ def compile_and_run(code: str, language: str = 'csharp', session_id: str = None)
         logger.error(f"Error in compile_and_run: {str(e)}")
         return {'success': False, 'error': str(e)}
 
+def compile_and_run_cpp(code: str, session_id: str = None) -> dict:
+    """Compile C++ with the shared precompiled header and run it on a PTY"""
+    workspace = tempfile.mkdtemp(prefix='cpp_', dir=CPP_WORKSPACE)
+    try:
+        session_id = session_id or str(uuid.uuid4())
+        compile_result = get_cpp_compiler().compile(code, Path(workspace), MAX_COMPILATION_TIME)
+        if not compile_result['success']:
+            shutil.rmtree(workspace, ignore_errors=True)
+            return {
+                'success': False,
+                'error': format_cpp_error(compile_result['error']),
+                'diagnostics': compile_result.get('diagnostics', [])
+            }
+
+        master_fd, slave_fd = pty.openpty()
+        process = sandboxed_popen(
+            compile_result['command'],
+            limits=SandboxLimits(runtime='native'),
+            stdin=slave_fd,
+            stdout=slave_fd,
+            stderr=slave_fd,
+            close_fds=True,
+            cwd=workspace
+        )
+
+        session = InteractiveSession(process, master_fd, slave_fd, workspace=workspace)
+        session.input_patterns = ['cin', 'getline', 'Enter']
+        with session_lock:
+            active_sessions[session_id] = session
+        get_multiplexer().register(session_id, master_fd, process, buffer=session.output_buffer)
+
+        return {
+            'success': True,
+            'session_id': session_id,
+            'interactive': True,
+            'cached': compile_result['cached']
+        }
+
+    except Exception as e:
+        shutil.rmtree(workspace, ignore_errors=True)
+        logger.error(f"Error in compile_and_run_cpp: {str(e)}")
+        return {'success': False, 'error': str(e)}
+
 def get_output(session_id: str) -> dict:
     """Get output from the session"""
     try:
@@ -90,45 +161,41 @@ def get_output(session_id: str) -> dict:
             if not session:
                 return {'success': False, 'error': "Session not found"}
 
-        # Read output with timeout and accumulation
-        ready, _, _ = select.select([session.master_fd], [], [], 0.1)
-        output = ''
-
-        if ready:
+        # The multiplexer drains the PTY into output_buffer; wait briefly for anything new
+        data = get_multiplexer().read(session_id, timeout=0.1)
+        if data:
             try:
-                # Read in a loop to get all available output
-                while True:
-                    try:
-                        data = os.read(session.master_fd, 1024)
-                        if not data:
-                            break
-                        output += data.decode()
-                    except (OSError, IOError):
-                        break
-
-                # Store in buffer and check for input prompts
-                if output:
-                    session.output_buffer.append(output)
-                    session.waiting_for_input = any(pattern in output for pattern in session.input_patterns)
-
-                # Return accumulated output
-                full_output = ''.join(session.output_buffer)
-                session.output_buffer = []  # Clear buffer after reading
+                output = data.decode(errors='replace')
+                session.waiting_for_input = any(pattern in output for pattern in session.input_patterns)
+
+                # Tell the reader when output was dropped since the last read
+                dropped = session.output_buffer.bytes_dropped - session.reported_dropped
+                if dropped:
+                    session.reported_dropped = session.output_buffer.bytes_dropped
+                    output = f"[... {dropped} bytes of output truncated ...]\n" + output
+
                 return {
                     'success': True,
-                    'output': full_output,
-                    'waiting_for_input': session.waiting_for_input
+                    'output': output,
+                    'waiting_for_input': session.waiting_for_input,
+                    'bytes_produced': session.output_buffer.bytes_produced,
+                    'bytes_dropped': session.output_buffer.bytes_dropped
                 }
             except Exception as e:
                 logger.error(f"Error reading output: {str(e)}")
                 return {'success': False, 'error': str(e)}
 
         # No new output
-        return {
+        result = {
             'success': True,
             'output': '',
             'waiting_for_input': session.waiting_for_input
         }
+        if session.process.poll() is not None and get_multiplexer().has_exited(session_id):
+            result['finished'] = True
+            result['exit_code'] = session.process.returncode
+            result['usage'] = session.process.usage()
+        return result
 
     except Exception as e:
         logger.error(f"Error getting output: {str(e)}")
@@ -158,12 +225,15 @@ def cleanup_session(session_id: str):
         with session_lock:
             session = active_sessions.pop(session_id, None)
             if session:
+                get_multiplexer().unregister(session_id)
                 session.process.terminate()
                 try:
                     os.close(session.master_fd)
                     os.close(session.slave_fd)
                 except:
                     pass
+                if session.workspace:
+                    shutil.rmtree(session.workspace, ignore_errors=True)
     except Exception as e:
         logger.error(f"Error cleaning up session: {str(e)}")
 
@@ -232,47 +302,11 @@ def format_csharp_error(error_msg: str) -> str:
 
 def get_cache_key(code: str) -> str:
     """Generate a unique cache key for the code"""
-    return hashlib.sha256(code.encode()).hexdigest()
+    return build_cache.get_key(code)
 
 def cleanup_old_cache():
     """Remove old cache entries when size limit is exceeded"""
-    try:
-        with cache_lock:
-            total_size = 0
-            cache_entries = []
-
-            # Get all cache entries with their timestamps
-            cache_dir = Path(CACHE_DIR)
-            for entry in cache_dir.iterdir():
-                if entry.is_dir():
-                    try:
-                        size = sum(f.stat().st_size for f in entry.rglob('*'))
-                        mtime = entry.stat().st_mtime
-                        cache_entries.append((entry, size, mtime))
-                        total_size += size
-                    except OSError as e:
-                        logger.warning(f"Error processing cache entry {entry}: {e}")
-                        continue
-
-            # If size limit exceeded, remove oldest entries
-            if total_size > CACHE_SIZE_LIMIT:
-                # Sort by access time (oldest first)
-                cache_entries.sort(key=lambda x: x[2])
-
-                # Remove entries until we're under the limit
-                for entry_path, entry_size, _ in cache_entries:
-                    if total_size <= CACHE_SIZE_LIMIT:
-                        break
-                    try:
-                        if entry_path.exists():
-                            shutil.rmtree(str(entry_path))
-                            total_size -= entry_size
-                    except OSError as e:
-                        logger.warning(f"Failed to remove cache entry {entry_path}: {e}")
-                        continue
-
-    except Exception as e:
-        logger.warning(f"Cache cleanup failed: {e}")
+    build_cache.cleanup()
 
 class ParallelCompilationManager:
     """Manage parallel compilation resources and execution"""
@@ -295,25 +329,11 @@ class ParallelCompilationManager:
             process = psutil.Process()
             initial_memory = process.memory_info().rss
 
-            # Use optimized compilation settings
-            env = os.environ.copy()
-            env.update({
-                'DOTNET_MULTILEVEL_LOOKUP': '0',
-                'DOTNET_SKIP_FIRST_TIME_EXPERIENCE': '1',
-                'DOTNET_CLI_TELEMETRY_OPTOUT': '1',
-                'DOTNET_ReadyToRun': '1',
-                'DOTNET_TC_QuickJitForLoops': '1',
-                'DOTNET_GCHeapCount': str(min(os.cpu_count() or 2, 4)),
-                'DOTNET_GCHighMemPercent': '85',
-                'DOTNET_GCNoAffinitize': '1',
-                'DOTNET_TieredPGO': '1'
-            })
-
-            result = compile_and_run(code, language, env)
+            result = compile_and_run(code, language)
 
             # Add resource usage metrics
             current_memory = process.memory_info().rss
-            result['metrics'].update({
+            result.setdefault('metrics', {}).update({
                 'memory_usage': (current_memory - initial_memory) / (1024 * 1024),  # MB
                 'total_time': time.time() - start_time
             })
@@ -358,8 +378,9 @@ def compile_and_run_parallel(codes: List[str], language: str = 'csharp') -> List
     if not codes:
         return []
 
-    if language != 'csharp':
-        return [{'success': False, 'error': f'Language {language} not supported for parallel compilation'} * len(codes)]
+    if language not in ('csharp', 'cpp'):
+        return [{'success': False, 'error': f'Language {language} not supported for parallel compilation'}
+                for _ in codes]
 
     logger.info(f"Starting parallel compilation for {len(codes)} files")
     start_time = time.time()
@@ -375,14 +396,14 @@ def compile_and_run_parallel(codes: List[str], language: str = 'csharp') -> List
         timeout = max(MAX_COMPILATION_TIME * len(codes) / MAX_PARALLEL_COMPILATIONS, MAX_COMPILATION_TIME)
         results = manager.wait_for_completions(timeout=timeout)
 
-        totaltime = time.time() - start_time
+        total_time = time.time() - start_time
         logger.info(f"Parallel compilation completed in {total_time:.2f}s")
 
         return results
 
     except Exception as e:
         logger.error(f"Parallel compilation failed: {e}")
-        return [{'success': False, 'error': str(e)}] * len(codes)
+        return [{'success': False, 'error': str(e)} for _ in codes]
 
 
 def get_template(language: str) -> str:
@@ -420,20 +441,15 @@ from pathlib import Path
 import hashlib
 import shutil
 from utils.compiler_logger import compiler_logger
+from utils.build_cache import build_cache, CACHE_DIR, CACHE_SIZE_LIMIT
+from utils.build_pool import get_build_pool
+from utils.pty_multiplexer import get_multiplexer
+from utils.output_buffer import OutputRingBuffer
+from utils.sandbox import sandboxed_popen, SandboxLimits
+from utils.cpp_compiler import get_cpp_compiler
+import tempfile
 import re
 import time
 import psutil
 
-# Constants section update
-MAX_COMPILATION_TIME = 30  # Increased from 20
-MAX_EXECUTION_TIME = 10   # Increased from 5
-MEMORY_LIMIT = 512
-MAX_PARALLEL_COMPILATIONS = min(os.cpu_count() or 4, 8)
-CACHE_DIR = "/tmp/compiler_cache"
-CACHE_SIZE_LIMIT = 1024 * 1024 * 1024
-CONNECTION_TIMEOUT = 45  # New timeout for socket connections
-RETRY_ATTEMPTS = 3      # Number of retry attempts
-
-# Initialize cache
-os.makedirs(CACHE_DIR, exist_ok=True)
 cache_lock = Lock()
\ No newline at end of file
@@ -1,15 +1,20 @@
 import os
-import subprocess
+import codecs
 import logging
 import pty
-import select
 import uuid
 import psutil
 import shutil
 import time
 from threading import Lock
 from pathlib import Path
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Callable
+from utils.csharp_build import build_csharp
+from utils.pty_multiplexer import get_multiplexer
+from utils.output_buffer import OutputRingBuffer
+from utils.sandbox import sandboxed_popen, SandboxLimits
+from utils.cpp_compiler import get_cpp_compiler
+from utils.warm_host import get_warm_host_pool, EXECUTION_MODE
 
 # Enhanced logging setup with formatting
 logging.basicConfig(
@@ -23,6 +28,7 @@ MAX_MEMORY_MB = 512
 MAX_COMPILATION_TIME = 30
 MAX_EXECUTION_TIME = 10
 CLEANUP_INTERVAL = 300  # 5 minutes
+SESSION_TIMEOUT = 300  # Idle seconds before a live session is evicted
 
 # Use project directory with size limit
 COMPILER_DIR = os.path.join(os.getcwd(), 'compiler_workspace')
@@ -57,11 +63,17 @@ class ResourceMonitor:
                 self._last_cleanup = current_time
 
     def _perform_cleanup(self):
-        """Clean up old compilation directories"""
+        """Evict idle sessions and clean up old compilation directories"""
         try:
+            evicted = session_registry.evict_expired()
+            if evicted:
+                logger.info(f"Evicted {evicted} idle sessions")
+
             total_size = 0
             for item in os.listdir(COMPILER_DIR):
                 item_path = os.path.join(COMPILER_DIR, item)
+                if item in session_registry:
+                    continue
                 try:
                     if os.path.isdir(item_path):
                         size = sum(f.stat().st_size for f in Path(item_path).rglob('*'))
@@ -88,7 +100,7 @@ class ResourceMonitor:
             directories = []
             for item in os.listdir(COMPILER_DIR):
                 item_path = os.path.join(COMPILER_DIR, item)
-                if os.path.isdir(item_path):
+                if os.path.isdir(item_path) and item not in session_registry:
                     directories.append((item_path, os.path.getmtime(item_path)))
 
             # Sort by modification time (oldest first)
@@ -117,6 +129,10 @@ class InteractiveSession:
         self.start_time = time.time()
         self.last_activity = time.time()
         self.waiting_for_input = False
+        self.lock = Lock()
+        self.streamer: Optional['OutputStreamer'] = None
+        self.watched = False
+        self.output_buffer = OutputRingBuffer()
 
         # Initialize PTY with error handling
         try:
@@ -130,14 +146,26 @@ class InteractiveSession:
         """Update last activity timestamp"""
         self.last_activity = time.time()
 
-    def is_expired(self) -> bool:
-        """Check if session has expired"""
-        return (time.time() - self.last_activity) > MAX_EXECUTION_TIME
+    def watch(self):
+        """Hand the PTY and child process to the shared multiplexer"""
+        if not self.watched and self.master_fd is not None:
+            get_multiplexer().register(self.session_id, self.master_fd, self.process,
+                                      buffer=self.output_buffer)
+            self.watched = True
+
+    def is_expired(self, timeout: float = SESSION_TIMEOUT) -> bool:
+        """Check if session has been idle longer than the timeout"""
+        return (time.time() - self.last_activity) > timeout
 
     def cleanup(self):
         """Clean up session resources"""
         try:
             logger.info(f"[Session {self.session_id}] Cleaning up resources")
+            if self.streamer:
+                self.streamer.stop()
+            if self.watched:
+                get_multiplexer().unregister(self.session_id)
+                self.watched = False
             if self.process:
                 try:
                     self.process.terminate()
@@ -155,8 +183,11 @@ class InteractiveSession:
                         os.close(fd)
                     except Exception as e:
                         logger.error(f"[Session {self.session_id}] Error closing fd {fd}: {e}")
+            self.master_fd = None
+            self.slave_fd = None
+            self.process = None
 
-            if os.path.exists(self.temp_dir):
+            if self.temp_dir and os.path.exists(self.temp_dir):
                 try:
                     shutil.rmtree(self.temp_dir)
                     logger.info(f"[Session {self.session_id}] Removed temp directory")
@@ -165,6 +196,130 @@ class InteractiveSession:
         except Exception as e:
             logger.error(f"[Session {self.session_id}] Error in cleanup: {e}")
 
+class SessionRegistry:
+    """In-process index of live interactive sessions keyed by session id"""
+    def __init__(self, timeout: float = SESSION_TIMEOUT):
+        self._sessions: Dict[str, InteractiveSession] = {}
+        self._lock = Lock()
+        self.timeout = timeout
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def register(self, session: InteractiveSession) -> None:
+        """Register a session, cleaning up any previous session with the same id"""
+        with self._lock:
+            previous = self._sessions.get(session.session_id)
+            self._sessions[session.session_id] = session
+        if previous is not None and previous is not session:
+            logger.warning(f"[Session {session.session_id}] Replacing existing session")
+            with previous.lock:
+                if previous.temp_dir == session.temp_dir:
+                    previous.temp_dir = None  # The new session owns the directory now
+                previous.cleanup()
+        logger.debug(f"[Session {session.session_id}] Registered, {len(self._sessions)} active")
+
+    def get(self, session_id: str) -> Optional[InteractiveSession]:
+        """Look up a live session by id"""
+        return self._sessions.get(session_id)
+
+    def remove(self, session_id: str) -> Optional[InteractiveSession]:
+        """Remove a session from the registry without cleaning it up"""
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def evict_expired(self) -> int:
+        """Clean up sessions idle for longer than the timeout"""
+        with self._lock:
+            expired = [s for s in self._sessions.values() if s.is_expired(self.timeout)]
+            for session in expired:
+                del self._sessions[session.session_id]
+
+        for session in expired:
+            logger.info(f"[Session {session.session_id}] Evicting idle session")
+            with session.lock:
+                session.cleanup()
+        return len(expired)
+
+    def clear(self) -> None:
+        """Clean up every registered session"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            with session.lock:
+                session.cleanup()
+
+# Initialize session registry
+session_registry = SessionRegistry()
+
+class OutputStreamer:
+    """Pushes a session's PTY output to emit as the multiplexer delivers it"""
+    def __init__(self, session: InteractiveSession, emit: Callable[[Dict[str, Any]], None]):
+        self.session = session
+        self.emit = emit
+        self.stopped = False
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.bytes_streamed = 0
+
+    def start(self) -> bool:
+        self.session.watch()
+        return get_multiplexer().subscribe(self.session.session_id, self._on_output, self._on_exit)
+
+    def stop(self):
+        self.stopped = True
+
+    def _send(self, text: str, final: bool = False, exit_code: Optional[int] = None):
+        if self.stopped:
+            return
+        running = not final
+        self.session.waiting_for_input = running
+        payload = {
+            'success': True,
+            'output': text,
+            'waiting_for_input': running,
+            'session_id': self.session.session_id
+        }
+        if final:
+            payload['finished'] = True
+            payload['exit_code'] = exit_code
+            if hasattr(self.session.process, 'usage'):
+                payload['usage'] = self.session.process.usage()
+        try:
+            self.emit(payload)
+        except Exception as e:
+            logger.error(f"[Session {self.session.session_id}] Error emitting output: {e}")
+
+    def _on_output(self, session_id: str, data: bytes):
+        self.bytes_streamed += len(data)
+        self.session.update_activity()
+        text = self._decoder.decode(data)
+        if text:
+            self._send(text)
+
+    def _on_exit(self, session_id: str, exit_code: Optional[int]):
+        self._send(self._decoder.decode(b'', final=True), final=True, exit_code=exit_code)
+        logger.info(f"[Session {session_id}] Program exited with code {exit_code}, "
+                    f"streamed {self.bytes_streamed} bytes")
+
+def start_output_stream(session_id: str, emit: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+    """Start pushing a session's output to emit as it is produced"""
+    session = session_registry.get(session_id)
+    if session is None or not session.master_fd:
+        logger.error(f"[Session {session_id}] Cannot stream output - session not found")
+        return {'success': False, 'error': 'Session not found'}
+
+    with session.lock:
+        if session.streamer is None:
+            session.streamer = OutputStreamer(session, emit)
+            if not session.streamer.start():
+                session.streamer = None
+                return {'success': False, 'error': 'Session not found'}
+    return {'success': True}
+
 def start_interactive_session(session: InteractiveSession, code: str, language: str = 'csharp') -> Dict[str, Any]:
     """Start an interactive session with resource monitoring"""
     try:
@@ -181,128 +336,132 @@ def start_interactive_session(session: InteractiveSession, code: str, language:
         # Create and verify temp directory
         os.makedirs(session.temp_dir, exist_ok=True)
 
-        # Write source code with error handling
-        source_file = Path(session.temp_dir) / "Program.cs"
-        try:
-            with open(source_file, 'w') as f:
-                f.write(code)
-        except Exception as e:
-            logger.error(f"[Session {session.session_id}] Failed to write source file: {e}")
-            return {'success': False, 'error': 'Failed to prepare code for compilation'}
-
-        # Create optimized project file
-        project_file = Path(session.temp_dir) / "program.csproj"
-        project_content = """<Project Sdk="Microsoft.NET.Sdk">
-          <PropertyGroup>
-            <OutputType>Exe</OutputType>
-            <TargetFramework>net7.0</TargetFramework>
-            <RuntimeIdentifier>linux-x64</RuntimeIdentifier>
-            <PublishSingleFile>true</PublishSingleFile>
-            <SelfContained>false</SelfContained>
-            <EnableDefaultItems>false</EnableDefaultItems>
-            <GenerateAssemblyInfo>false</GenerateAssemblyInfo>
-          </PropertyGroup>
-          <ItemGroup>
-            <Compile Include="Program.cs" />
-          </ItemGroup>
-        </Project>"""
-
-        try:
-            with open(project_file, 'w') as f:
-                f.write(project_content)
-        except Exception as e:
-            logger.error(f"[Session {session.session_id}] Failed to write project file: {e}")
-            return {'success': False, 'error': 'Failed to create project configuration'}
-
-        # Compile with optimized settings and timeout
-        logger.info(f"[Session {session.session_id}] Starting compilation")
-        try:
-            compile_result = subprocess.run(
-                ['dotnet', 'build', str(project_file), '--nologo', '-c', 'Release',
-                 '/p:GenerateFullPaths=true',
-                 '/consoleloggerparameters:NoSummary'],
-                capture_output=True,
-                text=True,
-                timeout=MAX_COMPILATION_TIME,
-                cwd=session.temp_dir
-            )
-        except subprocess.TimeoutExpired:
-            logger.error(f"[Session {session.session_id}] Compilation timed out")
-            return {'success': False, 'error': 'Compilation timed out'}
-        except Exception as e:
-            logger.error(f"[Session {session.session_id}] Compilation failed: {e}")
-            return {'success': False, 'error': str(e)}
-
-        if compile_result.returncode != 0:
-            logger.error(f"[Session {session.session_id}] Build failed: {compile_result.stderr}")
-            return {'success': False, 'error': compile_result.stderr}
-
-        # Run the compiled program
-        exe_path = Path(session.temp_dir) / "bin" / "Release" / "net7.0" / "linux-x64" / "program"
-        if not os.path.exists(exe_path):
-            logger.error(f"[Session {session.session_id}] Executable not found at {exe_path}")
-            return {'success': False, 'error': 'Compiled executable not found'}
-
-        # Add more detailed logging for process execution
-        try:
-            logger.info(f"[Session {session.session_id}] Attempting to start process: {exe_path}")
-            session.process = subprocess.Popen(
-                [str(exe_path)],
-                stdin=session.slave_fd,
-                stdout=session.slave_fd,
-                stderr=session.slave_fd,
-                close_fds=True,
-                env={
-                    **os.environ,
-                    'DOTNET_ROOT': '/nix/store/4k08ckhym1bcwnsk52j201a80l2xrkhp-dotnet-sdk-7.0.410',
-                    'DOTNET_CLI_HOME': session.temp_dir,
-                    'DOTNET_NOLOGO': 'true',
-                    'DOTNET_CLI_TELEMETRY_OPTOUT': 'true'
+        if language == 'cpp':
+            logger.info(f"[Session {session.session_id}] Starting C++ compilation")
+            compile_result = get_cpp_compiler().compile(code, Path(session.temp_dir) / "bin", MAX_COMPILATION_TIME)
+            if not compile_result['success']:
+                logger.error(f"[Session {session.session_id}] Build failed: {compile_result['error']}")
+                return {
+                    'success': False,
+                    'error': compile_result['error'],
+                    'diagnostics': compile_result.get('diagnostics', [])
                 }
+            return launch_program(session, compile_result['command'], compile_result['cached'],
+                                  SandboxLimits(runtime='native'))
+        elif language != 'csharp':
+            return {'success': False, 'error': f"Unsupported language: {language}"}
+
+        logger.info(f"[Session {session.session_id}] Starting C# build")
+        build_result = build_csharp(code, Path(session.temp_dir), MAX_COMPILATION_TIME)
+        if not build_result['success']:
+            logger.error(f"[Session {session.session_id}] Build failed: {build_result['error']}")
+            return {
+                'success': False,
+                'error': build_result['error'],
+                'diagnostics': build_result.get('diagnostics', [])
+            }
+        cached = build_result['cached']
+        command = build_result['command']
+        assembly_path = build_result['output_dir'] / "program.dll"
+        logger.info(f"[Session {session.session_id}] Built with {build_result['backend']}, cached={cached}")
+
+        # Prefer a pre-started host when enabled; it returns None if it cannot take the job
+        if EXECUTION_MODE == 'warm_host' and assembly_path.exists():
+            session.process = get_warm_host_pool().launch(
+                str(assembly_path), os.ttyname(session.slave_fd), session.temp_dir
             )
-            logger.info(f"[Session {session.session_id}] Process started successfully with PID: {session.process.pid}")
-            return {'success': True, 'session_id': session.session_id}
-        except Exception as e:
-            logger.error(f"[Session {session.session_id}] Failed to start process: {e}")
-            return {'success': False, 'error': f'Failed to start program: {str(e)}'}
+            if session.process is not None:
+                logger.info(f"[Session {session.session_id}] Running on warm host PID: {session.process.pid}")
+                session.watch()
+                return {'success': True, 'session_id': session.session_id, 'cached': cached}
+
+        return launch_program(session, command, cached)
 
     except Exception as e:
         logger.error(f"[Session {session.session_id}] Unexpected error: {e}", exc_info=True)
         return {'success': False, 'error': str(e)}
 
+def launch_program(session: InteractiveSession, command: list, cached: bool,
+                   limits: Optional[SandboxLimits] = None) -> Dict[str, Any]:
+    """Start a compiled program on the session PTY under the sandbox"""
+    try:
+        logger.info(f"[Session {session.session_id}] Attempting to start process: {command}")
+        session.process = sandboxed_popen(
+            command,
+            limits=limits,
+            stdin=session.slave_fd,
+            stdout=session.slave_fd,
+            stderr=session.slave_fd,
+            close_fds=True,
+            cwd=session.temp_dir,
+            env={
+                **os.environ,
+                'DOTNET_ROOT': '/nix/store/4k08ckhym1bcwnsk52j201a80l2xrkhp-dotnet-sdk-7.0.410',
+                'DOTNET_CLI_HOME': session.temp_dir,
+                'DOTNET_NOLOGO': 'true',
+                'DOTNET_CLI_TELEMETRY_OPTOUT': 'true'
+            }
+        )
+        logger.info(f"[Session {session.session_id}] Process started successfully with PID: {session.process.pid}")
+        session.watch()
+        return {'success': True, 'session_id': session.session_id, 'cached': cached}
+    except Exception as e:
+        logger.error(f"[Session {session.session_id}] Failed to start process: {e}")
+        return {'success': False, 'error': f'Failed to start program: {str(e)}'}
+
 def get_output(session_id: str) -> Dict[str, Any]:
     """Get output from the session with timeout handling"""
-    session = InteractiveSession(session_id)
+    session = session_registry.get(session_id)
+    if session is None:
+        logger.error(f"[Session {session_id}] Session not found")
+        return {'success': False, 'error': 'Session not found'}
+
     try:
-        if not session.master_fd:
-            logger.error(f"[Session {session_id}] Invalid session - no master_fd")
-            return {'success': False, 'error': 'Invalid session'}
+        with session.lock:
+            if not session.master_fd:
+                logger.error(f"[Session {session_id}] Invalid session - no master_fd")
+                return {'success': False, 'error': 'Invalid session'}
 
-        if session.is_expired():
-            logger.warning(f"[Session {session_id}] Session expired")
-            return {'success': False, 'error': 'Session expired'}
+            if session.is_expired():
+                logger.warning(f"[Session {session_id}] Session expired")
+                return {'success': False, 'error': 'Session expired'}
 
-        ready, _, _ = select.select([session.master_fd], [], [], 0.1)
-        if ready:
-            try:
-                output = os.read(session.master_fd, 1024).decode()
+            if session.streamer is not None:
+                # Output is pushed by the streamer; reading here would steal it
+                return {
+                    'success': True,
+                    'output': '',
+                    'waiting_for_input': session.waiting_for_input,
+                    'streaming': True
+                }
+
+            # The multiplexer drains the PTY; wait briefly for anything new
+            session.watch()
+            data = get_multiplexer().read(session_id, timeout=0.1)
+            if data:
+                output = data.decode(errors='replace')
                 session.update_activity()
                 session.waiting_for_input = 'input' in output.lower() or '?' in output
                 logger.debug(f"[Session {session_id}] Output received: {len(output)} bytes")
                 return {
                     'success': True,
                     'output': output,
-                    'waiting_for_input': session.waiting_for_input
+                    'waiting_for_input': session.waiting_for_input,
+                    'bytes_dropped': session.output_buffer.bytes_dropped
                 }
-            except OSError as e:
-                logger.error(f"[Session {session_id}] Error reading from PTY: {e}")
-                return {'success': False, 'error': f'Error reading output: {e}'}
 
-        return {
-            'success': True,
-            'output': '',
-            'waiting_for_input': session.waiting_for_input
-        }
+            result = {
+                'success': True,
+                'output': '',
+                'waiting_for_input': session.waiting_for_input
+            }
+            if session.process is not None and session.process.poll() is not None \
+                    and get_multiplexer().has_exited(session_id):
+                result['finished'] = True
+                result['exit_code'] = session.process.returncode
+                if hasattr(session.process, 'usage'):
+                    result['usage'] = session.process.usage()
+            return result
 
     except Exception as e:
         logger.error(f"[Session {session_id}] Error in get_output: {e}", exc_info=True)
@@ -310,18 +469,14 @@ def get_output(session_id: str) -> Dict[str, Any]:
 
 def send_input(session_id: str, input_text: str) -> Dict[str, Any]:
     """Send input to the session with validation"""
-    session = InteractiveSession(session_id)
+    session = session_registry.get(session_id)
+    if session is None:
+        logger.error(f"[Session {session_id}] Session not found")
+        return {'success': False, 'error': 'Session not found'}
+
     try:
         logger.info(f"[Session {session_id}] Sending input: {len(input_text)} bytes")
 
-        if not session.master_fd:
-            logger.error(f"[Session {session_id}] Invalid session - no master_fd")
-            return {'success': False, 'error': 'Invalid session'}
-
-        if session.is_expired():
-            logger.warning(f"[Session {session_id}] Session expired")
-            return {'success': False, 'error': 'Session expired'}
-
         # Validate input
         if len(input_text) > 1024:  # Limit input size
             logger.warning(f"[Session {session_id}] Input too large: {len(input_text)} bytes")
@@ -330,14 +485,23 @@ def send_input(session_id: str, input_text: str) -> Dict[str, Any]:
         if not input_text.endswith('\n'):
             input_text += '\n'
 
-        try:
-            bytes_written = os.write(session.master_fd, input_text.encode())
-            session.update_activity()
-            logger.info(f"[Session {session_id}] Successfully wrote {bytes_written} bytes")
-            return {'success': True}
-        except OSError as e:
-            logger.error(f"[Session {session_id}] Error writing to PTY: {e}")
-            return {'success': False, 'error': f'Error sending input: {e}'}
+        with session.lock:
+            if not session.master_fd:
+                logger.error(f"[Session {session_id}] Invalid session - no master_fd")
+                return {'success': False, 'error': 'Invalid session'}
+
+            if session.is_expired():
+                logger.warning(f"[Session {session_id}] Session expired")
+                return {'success': False, 'error': 'Session expired'}
+
+            try:
+                bytes_written = os.write(session.master_fd, input_text.encode())
+                session.update_activity()
+                logger.info(f"[Session {session_id}] Successfully wrote {bytes_written} bytes")
+                return {'success': True}
+            except OSError as e:
+                logger.error(f"[Session {session_id}] Error writing to PTY: {e}")
+                return {'success': False, 'error': f'Error sending input: {e}'}
 
     except Exception as e:
         logger.error(f"[Session {session_id}] Error in send_input: {e}", exc_info=True)
@@ -347,20 +511,33 @@ def cleanup_session(session_id: str):
     """Clean up session resources"""
     try:
         logger.info(f"[Session {session_id}] Starting cleanup")
-        session = InteractiveSession(session_id)
-        session.cleanup()
+        session = session_registry.remove(session_id)
+        if session is None:
+            logger.debug(f"[Session {session_id}] No live session to clean up")
+            return
+        with session.lock:
+            session.cleanup()
         logger.info(f"[Session {session_id}] Cleanup completed")
     except Exception as e:
         logger.error(f"[Session {session_id}] Error in cleanup: {e}")
 
 def cleanup_old_sessions():
-    """Clean up old compilation directories using ResourceMonitor"""
+    """Evict idle sessions and clean up old compilation directories"""
+    evicted = session_registry.evict_expired()
+    if evicted:
+        logger.info(f"Evicted {evicted} idle sessions")
     resource_monitor.cleanup_if_needed()
 
 def get_or_create_session(session_id=None):
     """Get existing session or create new one, with cleanup"""
     cleanup_old_sessions()
 
+    if session_id:
+        existing = session_registry.get(session_id)
+        if existing is not None:
+            logger.info(f"[Session {session_id}] Retrieved live session")
+            return existing
+
     session_id = session_id or str(uuid.uuid4())
     session_dir = os.path.join(COMPILER_DIR, session_id)
 
@@ -372,5 +549,7 @@ def get_or_create_session(session_id=None):
             logger.error(f"Error cleaning up existing session directory: {e}")
 
     os.makedirs(session_dir, exist_ok=True)
-    logger.info(f"[Session {session_id}] Created/retrieved session in {session_dir}")
-    return InteractiveSession(session_id)
\ No newline at end of file
+    session = InteractiveSession(session_id)
+    session_registry.register(session)
+    logger.info(f"[Session {session_id}] Created session in {session_dir}")
+    return session
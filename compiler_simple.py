@@ -4,6 +4,9 @@ import os
 import logging
 from typing import Dict, Optional, Any
 from pathlib import Path
+from utils.build_cache import build_cache
+from utils.build_pool import get_build_pool, BuildQueueFull
+from utils.sandbox import sandboxed_popen
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -46,55 +49,69 @@ def compile_and_run(code: str, input_data: Optional[str] = None) -> Dict[str, An
             with open(project_file, 'w', encoding='utf-8') as f:
                 f.write(project_content)
 
-            # Build the project with optimized settings
-            logger.debug("Starting build process")
-            build_process = subprocess.run(
-                ['dotnet', 'build', str(project_file), '--nologo', '-c', 'Release'],
-                capture_output=True,
-                text=True,
-                timeout=30,
-                cwd=str(temp_path),
-                env={
-                    **os.environ,
-                    'DOTNET_ROOT': '/nix/store/4k08ckhym1bcwnsk52j201a80l2xrkhp-dotnet-sdk-7.0.410',
-                    'DOTNET_CLI_HOME': temp_dir,
-                    'DOTNET_NOLOGO': 'true',
-                    'DOTNET_CLI_TELEMETRY_OPTOUT': 'true'
-                }
-            )
+            exe_dir = temp_path / "bin" / "Release" / "net7.0" / "linux-x64"
+            cache_key = build_cache.get_key(code, project_content)
 
-            if build_process.returncode != 0:
-                logger.error(f"Build failed: {build_process.stderr}")
-                return {
-                    'success': False,
-                    'error': format_error(build_process.stderr)
-                }
+            if build_cache.restore(cache_key, exe_dir):
+                logger.debug(f"Using cached build {cache_key[:12]}")
+            else:
+                # Build the project on a warm build worker
+                logger.debug("Starting build process")
+                build_process = get_build_pool().build(project_file, temp_path, 30)
+
+                if build_process.returncode != 0:
+                    logger.error(f"Build failed: {build_process.stderr}")
+                    return {
+                        'success': False,
+                        'error': format_error(build_process.stderr)
+                    }
+
+                build_cache.store(cache_key, exe_dir)
 
             # Run the compiled program
             logger.debug("Starting program execution")
-            exe_path = temp_path / "bin" / "Release" / "net7.0" / "linux-x64" / "program"
+            exe_path = exe_dir / "program"
 
-            run_process = subprocess.run(
+            run_process = sandboxed_popen(
                 [str(exe_path)],
-                input=input_data.encode() if input_data else None,
-                capture_output=True,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 text=True,
-                timeout=10,
                 cwd=str(temp_path)
             )
+            try:
+                stdout, stderr = run_process.communicate(input=input_data, timeout=10)
+            except subprocess.TimeoutExpired:
+                run_process.kill()
+                run_process.communicate()
+                raise
+            usage = run_process.usage()
+            logger.debug(f"Program finished: {usage}")
 
             if run_process.returncode != 0:
-                logger.error(f"Execution failed: {run_process.stderr}")
+                logger.error(f"Execution failed: {stderr}")
+                error = stderr
+                if usage.get('limit_exceeded') == 'cpu':
+                    error = "Program exceeded its CPU time limit"
                 return {
                     'success': False,
-                    'error': format_error(run_process.stderr)
+                    'error': format_error(error),
+                    'usage': usage
                 }
 
             return {
                 'success': True,
-                'output': run_process.stdout
+                'output': stdout,
+                'usage': usage
             }
 
+        except BuildQueueFull:
+            logger.warning("Build queue full")
+            return {
+                'success': False,
+                'error': "Compiler is busy, please try again"
+            }
         except subprocess.TimeoutExpired as e:
             logger.error(f"Process timed out: {str(e)}")
             return {
@@ -0,0 +1,22 @@
+"""add curriculum expectation codes to coding activities
+
+Revision ID: 003_add_activity_curriculum_expectations
+Revises: 002_add_password_reset_fields
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_add_activity_curriculum_expectations'
+down_revision = '002_add_password_reset_fields'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Expectation codes an activity covers, used for curriculum progress
+    op.add_column('coding_activity', sa.Column('curriculum_expectations', sa.JSON(), nullable=True))
+
+def downgrade():
+    op.drop_column('coding_activity', 'curriculum_expectations')
@@ -0,0 +1,53 @@
+"""add activity progress summary
+
+Revision ID: 004_add_activity_progress_summary
+Revises: 003_add_activity_curriculum_expectations
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_add_activity_progress_summary'
+down_revision = '003_add_activity_curriculum_expectations'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Submission totals per student and activity, maintained on insert
+    op.create_table(
+        'activity_progress_summary',
+        sa.Column('student_id', sa.Integer(), sa.ForeignKey('student.id'), primary_key=True),
+        sa.Column('activity_id', sa.Integer(), sa.ForeignKey('coding_activity.id'), primary_key=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('successes', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('first_submission_at', sa.DateTime(), nullable=True),
+        sa.Column('first_success_at', sa.DateTime(), nullable=True),
+        sa.Column('last_submission_at', sa.DateTime(), nullable=True),
+        sa.Column('last_success', sa.Boolean(), nullable=False, server_default=sa.false())
+    )
+    op.create_index('ix_activity_progress_summary_activity_id', 'activity_progress_summary', ['activity_id'])
+    op.create_index('ix_activity_progress_summary_last_submission_at', 'activity_progress_summary',
+                    ['last_submission_at'])
+
+    # Backfill from the existing submissions
+    op.execute("""
+        INSERT INTO activity_progress_summary
+            (student_id, activity_id, attempts, successes, first_submission_at,
+             first_success_at, last_submission_at, last_success)
+        SELECT student_id, activity_id, COUNT(*),
+               SUM(CASE WHEN success THEN 1 ELSE 0 END),
+               MIN(created_at),
+               MIN(CASE WHEN success THEN created_at END),
+               MAX(created_at),
+               CASE WHEN MAX(CASE WHEN success THEN created_at END) = MAX(created_at)
+                    THEN TRUE ELSE FALSE END
+        FROM code_submission
+        GROUP BY student_id, activity_id
+    """)
+
+def downgrade():
+    op.drop_index('ix_activity_progress_summary_last_submission_at', 'activity_progress_summary')
+    op.drop_index('ix_activity_progress_summary_activity_id', 'activity_progress_summary')
+    op.drop_table('activity_progress_summary')
@@ -7,6 +7,7 @@ from .student import (
     CodeSubmission,
     CodingActivity,
     StudentProgress,
+    ActivityProgressSummary,
     SharedCode,
     AuditLog,
     Achievement,
@@ -25,6 +26,7 @@ __all__ = [
     'CodeSubmission', 
     'CodingActivity',
     'StudentProgress',
+    'ActivityProgressSummary',
     'SharedCode',
     'AuditLog',
     'Achievement',
@@ -3,9 +3,13 @@ Database models for Ontario Computer Science Curriculum (ICS3U)
 Supports bilingual content and hierarchical structure
 """
 from datetime import datetime
-from sqlalchemy import CheckConstraint, Index
+import logging
+from sqlalchemy import CheckConstraint, Index, event
+from sqlalchemy.orm import Session
 from app import db
 
+logger = logging.getLogger(__name__)
+
 class Course(db.Model):
     __tablename__ = 'courses'
     id = db.Column(db.Integer, primary_key=True)
@@ -71,4 +75,33 @@ class SpecificExpectation(db.Model):
                        name='check_specific_descriptions'),
         Index('idx_specific_code', 'code'),
         Index('idx_specific_overall', 'overall_expectation_id', 'code'),
-    )
\ No newline at end of file
+    )
+
+CURRICULUM_MODELS = (Course, Strand, OverallExpectation, SpecificExpectation)
+
+# Cached curriculum trees (utils/curriculum_tree.py) are invalidated whenever
+# a transaction that changed curriculum rows commits, in any process
+@event.listens_for(Session, 'after_flush')
+def _note_curriculum_changes(session, flush_context):
+    if any(isinstance(obj, CURRICULUM_MODELS) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info['curriculum_changed'] = True
+
+@event.listens_for(Session, 'do_orm_execute')
+def _note_curriculum_bulk_changes(orm_execute_state):
+    mapper = orm_execute_state.bind_mapper
+    if (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete) and \
+            mapper is not None and mapper.class_ in CURRICULUM_MODELS:
+        orm_execute_state.session.info['curriculum_changed'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_curriculum_cache(session):
+    if session.info.pop('curriculum_changed', False):
+        try:
+            from utils.curriculum_tree import invalidate_curriculum_cache
+            invalidate_curriculum_cache()
+        except Exception as e:
+            logger.error(f"Failed to invalidate curriculum cache: {e}")
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_curriculum_changes(session):
+    session.info.pop('curriculum_changed', None)
@@ -143,6 +143,7 @@ class CodingActivity(db.Model):
     common_errors = db.Column(db.JSON, nullable=True)
     points = db.Column(db.Integer, nullable=True)
     max_attempts = db.Column(db.Integer, nullable=True)
+    curriculum_expectations = db.Column(db.JSON, nullable=True)  # Expectation codes, e.g. ["B2.1", "B2.3"]
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     deleted_at = db.Column(db.DateTime, nullable=True)
 
@@ -189,6 +190,37 @@ class CodeSubmission(db.Model):
     def __repr__(self):
         return f'<CodeSubmission student_id={self.student_id} activity_id={self.activity_id}>'
 
+class ActivityProgressSummary(db.Model):
+    """Submission totals per student and activity, updated whenever submissions are inserted"""
+    __tablename__ = 'activity_progress_summary'
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), primary_key=True)
+    activity_id = db.Column(db.Integer, db.ForeignKey('coding_activity.id'), primary_key=True, index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    successes = db.Column(db.Integer, nullable=False, default=0)
+    first_submission_at = db.Column(db.DateTime)
+    first_success_at = db.Column(db.DateTime)
+    last_submission_at = db.Column(db.DateTime, index=True)
+    last_success = db.Column(db.Boolean, nullable=False, default=False)
+
+    @property
+    def pass_rate(self):
+        return self.successes / self.attempts if self.attempts else 0.0
+
+    def __repr__(self):
+        return f'<ActivityProgressSummary student_id={self.student_id} activity_id={self.activity_id}>'
+
+@event.listens_for(CodeSubmission, 'after_insert')
+def _summarize_submission(mapper, connection, target):
+    """Keep the progress summary current for submissions added through the session"""
+    # Bulk inserts (utils/submission_sink.py) call record_submissions themselves
+    from utils.progress_summary import record_submissions
+    record_submissions(connection, [{
+        'student_id': target.student_id,
+        'activity_id': target.activity_id,
+        'success': target.success,
+        'created_at': target.created_at
+    }])
+
 class SharedCode(db.Model):
     """Model for sharing code snippets"""
     id = db.Column(db.Integer, primary_key=True)
@@ -169,6 +169,13 @@ class PerformanceOptimizer:
         else:
             return cpu_count               # Use all cores under normal load
 
+    def get_recommended_compile_workers(self, memory_per_worker_mb: float = 512) -> int:
+        """Determine how many compile jobs can run at once given CPU load and free memory"""
+        thread_count = self.get_recommended_thread_count()
+        available_mb = self.resource_monitor.get_current_usage()['memory_available']
+        memory_bound = int(available_mb // memory_per_worker_mb)
+        return max(1, min(thread_count, memory_bound))
+
     def _update_language_metrics(self, language: str, metrics: Dict[str, Any]) -> None:
         """Update language-specific performance metrics"""
         if language not in self.language_metrics:
@@ -13,6 +13,9 @@ from extensions import limiter
 from datetime import datetime
 from routes.static_routes import get_user_language
 from compiler import compile_and_run, get_template
+from utils.compile_scheduler import get_compile_scheduler, SchedulerFull
+from utils.grading import activity_language, grade_submission
+from utils.submission_sink import get_submission_sink
 from flask import make_response
 import time
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -205,34 +208,39 @@ def run_code():
             from utils.compiler_logger import compiler_logger
             compiler_logger.log_compilation_start(session_id, code)
 
-            # Execute with timeout
+            # Execute through the compile scheduler, one fair queue slot per student
             logger.debug("Calling compile_and_run")
-            result = compile_and_run(
-                code=code,
-                language=language,
-                session_id=session_id
-            )
+            try:
+                result = get_compile_scheduler().run(
+                    current_user.id,
+                    compile_and_run,
+                    code=code,
+                    language=language,
+                    session_id=session_id
+                )
+            except SchedulerFull as e:
+                logger.warning(f"Run rejected for user {current_user.id}: {e}")
+                response = jsonify({
+                    'success': False,
+                    'error': 'The server is busy, please try again shortly',
+                    'retry_after': e.retry_after
+                })
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response, 429
             logger.debug(f"Compilation result: {result}")
 
-            # Store successful compilation if activity_id is provided
+            # Store successful compilation if activity_id is provided; the
+            # sink writes it in the background so the response does not wait
             if activity_id and result.get('success'):
-                try:
-                    submission = CodeSubmission(
-                        student_id=current_user.id,
-                        activity_id=activity_id,
-                        code=code,
-                        language=language,
-                        success=True,
-                        output=result.get('output', ''),
-                        error=None,
-                        submitted_at=datetime.utcnow()
-                    )
-                    db.session.add(submission)
-                    db.session.commit()
-                except Exception as db_error:
-                    logger.error(f"Database error storing submission: {db_error}")
-                    # Continue execution even if storage fails
-                    pass
+                get_submission_sink(current_app._get_current_object()).submit(
+                    student_id=current_user.id,
+                    activity_id=activity_id,
+                    code=code,
+                    language=language,
+                    success=True,
+                    output=result.get('output', ''),
+                    error=None
+                )
 
             # Always return a JSON response with proper headers
             response = jsonify(result)
@@ -272,6 +280,48 @@ def run_code():
             'error': str(e)
         }), 500
 
+@activities.route('/activities/grade', methods=['POST'])
+@json_login_required
+def grade_code():
+    """Grade a submission against the activity's test cases"""
+    try:
+        data = request.get_json(silent=True) or {}
+        code = data.get('code', '').strip()
+        activity = CodingActivity.query.get(data.get('activity_id'))
+
+        if not activity:
+            return jsonify({'success': False, 'error': 'Activity not found'}), 404
+        if not code:
+            return jsonify({'success': False, 'error': 'Code cannot be empty'}), 400
+
+        # Plain values only: the ORM object belongs to this request's session, not the scheduler thread
+        language = activity_language(activity)
+        test_cases = list(activity.test_cases or [])
+        try:
+            result = get_compile_scheduler().run(
+                current_user.id,
+                grade_submission,
+                code,
+                language,
+                test_cases,
+                stop_on_failure=bool(data.get('stop_on_failure', False))
+            )
+        except SchedulerFull as e:
+            logger.warning(f"Grading rejected for user {current_user.id}: {e}")
+            response = jsonify({
+                'success': False,
+                'error': 'The server is busy, please try again shortly',
+                'retry_after': e.retry_after
+            })
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 429
+
+        return jsonify(result)
+
+    except Exception as e:
+        logger.error(f"Error grading code: {str(e)}", exc_info=True)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @activities.route('/activities/get_output', methods=['GET', 'POST'])
 @json_login_required
 def get_output():
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, session, jsonify
 from flask_mail import Message
 from extensions import mail
 import secrets
@@ -13,6 +13,8 @@ from urllib.parse import urlparse, urljoin
 import logging
 from functools import wraps
 from routes.static_routes import get_user_language
+from utils.regrade import start_regrade, get_regrade_job
+from utils.progress_summary import class_grid, student_summary, active_students_since
 
 auth = Blueprint('auth', __name__)
 logger = logging.getLogger(__name__)
@@ -175,8 +177,7 @@ def admin_console():
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
 
     # Count active users today (users who have made submissions today)
-    active_today = db.session.query(db.func.count(db.distinct(CodeSubmission.student_id)))\
-        .filter(CodeSubmission.submitted_at >= today_start).scalar() or 0
+    active_today = active_students_since(today_start)
 
     # Calculate average completion rate
     total_activities = db.session.query(db.func.count(CodingActivity.id)).scalar() or 0
@@ -195,6 +196,42 @@ def admin_console():
                          avg_completion_rate=avg_completion_rate,
                          total_activities=total_activities)
 
+@auth.route('/admin/regrade/<int:activity_id>', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def admin_regrade(activity_id):
+    """Start a background regrade of an activity's submissions, or report its progress"""
+    if request.method == 'POST':
+        if not CodingActivity.query.get(activity_id):
+            return jsonify({'success': False, 'error': 'Activity not found'}), 404
+        job = start_regrade(current_app._get_current_object(), activity_id,
+                            resume=request.args.get('resume', 'true') != 'false')
+        logger.info(f"Admin {current_user.username} started regrade of activity {activity_id}")
+        return jsonify({'success': True, **job.get_status()}), 202
+
+    job = get_regrade_job(activity_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'No regrade has been started for this activity'}), 404
+    return jsonify({'success': True, **job.get_status()})
+
+@auth.route('/admin/progress/<curriculum>')
+@login_required
+@admin_required
+def admin_progress_grid(curriculum):
+    """Progress of every student on every activity of a curriculum"""
+    return jsonify({'success': True, **class_grid(curriculum)})
+
+@auth.route('/admin/progress/student/<int:student_id>')
+@login_required
+@admin_required
+def admin_student_progress(student_id):
+    """Progress of one student on every activity they have attempted"""
+    student = db.session.get(Student, student_id)
+    if student is None:
+        return jsonify({'success': False, 'error': 'Student not found'}), 404
+    return jsonify({'success': True, 'student_id': student.id, 'username': student.username,
+                    'activities': student_summary(student_id)})
+
 @auth.route('/reset_password_request', methods=['GET', 'POST'])
 def reset_password_request():
     if current_user.is_authenticated:
@@ -1,68 +1,67 @@
-from flask import Blueprint, render_template, jsonify, session, request
+from flask import Blueprint, Response, abort, render_template, jsonify, session, request, send_file, url_for
 from models.curriculum import Course, Strand, OverallExpectation, SpecificExpectation
+from utils.curriculum_tree import curriculum_cache
+from utils.curriculum_snapshots import snapshot_store
 
 curriculum_bp = Blueprint('curriculum', __name__)
 
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+def _send_snapshot(name, cache_control):
+    """Send a snapshot file, precompressed if the client accepts it"""
+    found = snapshot_store.variant(name, request.accept_encodings)
+    if found is None:
+        abort(404)
+    path, encoding = found
+    # The name carries the content hash, which makes a strong ETag
+    response = send_file(path, mimetype='application/json', etag=name.split('.')[1], max_age=None)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    return response
+
 @curriculum_bp.route('/')
 def view_curriculum():
     """Display the curriculum visualization page"""
     # Get the current language from session or default to English
     lang = session.get('lang', request.args.get('lang', 'en'))
-    # Get all courses
-    courses = Course.query.all()
-    return render_template('curriculum/view.html', courses=courses, lang=lang)
+    courses = snapshot_store.courses()
+    if courses is None:
+        # Nothing published since the last curriculum change
+        return render_template('curriculum/view.html', courses=Course.query.all(), lang=lang, snapshot_urls={})
+
+    snapshot_urls = {
+        course['code']: url_for('curriculum.course_snapshot',
+                                name=course['files'].get(lang, course['files']['en']))
+        for course in courses
+    }
+    return render_template('curriculum/view.html', courses=courses, lang=lang, snapshot_urls=snapshot_urls)
+
+@curriculum_bp.route('/snapshots/<name>')
+def course_snapshot(name):
+    """Serve a published course snapshot; its content never changes"""
+    return _send_snapshot(name, IMMUTABLE)
 
 @curriculum_bp.route('/get_course_data/<course_code>')
 def get_course_data(course_code):
     """Get curriculum data for a specific course"""
-    course = Course.query.filter_by(code=course_code).first_or_404()
     # Get the current language from session or default to English
     lang = session.get('lang', request.args.get('lang', 'en'))
 
-    # Build curriculum structure
-    curriculum_data = {
-        'code': course.code,
-        'title': course.title_fr if lang == 'fr' else course.title_en,
-        'description': course.description_fr if lang == 'fr' else course.description_en,
-        'strands': []
-    }
-
-    # Sort strands by code to ensure consistent order
-    sorted_strands = sorted(course.strands, key=lambda x: x.code.upper())
-
-    for strand in sorted_strands:
-        # Fix strand title casing and formatting
-        strand_code = strand.code.upper()
-        strand_data = {
-            'code': strand_code,
-            'title': strand.title_fr if lang == 'fr' else strand.title_en,
-            'overall_expectations': []
-        }
-
-        # Sort overall expectations by code
-        sorted_overall = sorted(strand.overall_expectations, 
-                              key=lambda x: x.code.upper())
-
-        for overall in sorted_overall:
-            overall_data = {
-                'code': overall.code,
-                'description': overall.description_fr if lang == 'fr' else overall.description_en,
-                'specific_expectations': []
-            }
-
-            # Sort specific expectations by code
-            sorted_specific = sorted(overall.specific_expectations, 
-                                   key=lambda x: x.code.upper())
-
-            for specific in sorted_specific:
-                specific_data = {
-                    'code': specific.code,
-                    'description': specific.description_fr if lang == 'fr' else specific.description_en
-                }
-                overall_data['specific_expectations'].append(specific_data)
-
-            strand_data['overall_expectations'].append(overall_data)
+    snapshot = snapshot_store.snapshot_name(course_code, lang)
+    if snapshot is not None:
+        response = _send_snapshot(snapshot, 'no-cache')
+        response.vary.add('Cookie')
+        return response
 
-        curriculum_data['strands'].append(strand_data)
+    course_json = curriculum_cache.get(course_code, lang)
+    if course_json is None:
+        abort(404)
 
-    return jsonify(curriculum_data)
\ No newline at end of file
+    response = Response(course_json.body, mimetype='application/json')
+    response.set_etag(course_json.etag)
+    # Clients revalidate with If-None-Match and get a 304 while the curriculum is unchanged
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Cookie'
+    return response.make_conditional(request)
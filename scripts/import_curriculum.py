@@ -15,8 +15,13 @@ def main():
 
         # Import curriculum data
         importer = CurriculumImporter()
-        importer.import_curriculum(content)
+        stats = importer.import_curriculum(content)
 
+        for level in ('courses', 'strands', 'overall_expectations', 'specific_expectations'):
+            counts = stats[level]
+            print(f"{level}: {counts['inserted']} inserted, {counts['updated']} updated, "
+                  f"{counts['unchanged']} unchanged, {counts['deleted']} deleted")
+        print(f"Timings (s): {stats['timings']}")
         print("ICS3U curriculum import completed successfully!")
 
 if __name__ == '__main__':
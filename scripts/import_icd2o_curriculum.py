@@ -11,6 +11,7 @@ sys.path.append(str(project_root))
 
 from app import app, db
 from models.curriculum import Course, Strand, OverallExpectation, SpecificExpectation
+from utils.curriculum_snapshots import publish_snapshots
 
 def clear_existing_data(course_code: str):
     """Clear existing curriculum data for a given course code"""
@@ -379,6 +380,9 @@ def main():
                 logger.info(f"- Strands: {strand_count}")
                 logger.info(f"- Overall Expectations: {overall_count}")
                 logger.info(f"- Specific Expectations: {specific_count}")
+
+                stats = publish_snapshots()
+                logger.info(f"Published curriculum snapshots for {stats['courses']} courses")
             else:
                 logger.error("Verification failed: Course not found after creation")
                 raise ValueError("Course verification failed")
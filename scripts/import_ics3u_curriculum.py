@@ -12,6 +12,7 @@ sys.path.append(str(project_root))
 
 from app import app, db
 from models.curriculum import Course, Strand, OverallExpectation, SpecificExpectation
+from utils.curriculum_snapshots import publish_snapshots
 
 def get_strand_titles():
     """Get bilingual titles for curriculum strands"""
@@ -85,6 +86,9 @@ def main():
             db.session.commit()
             logger.info("Successfully updated strand titles and overall descriptions")
 
+            stats = publish_snapshots()
+            logger.info(f"Published curriculum snapshots for {stats['courses']} courses")
+
     except Exception as e:
         logger.error(f"Import failed: {str(e)}")
         db.session.rollback()
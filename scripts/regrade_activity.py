@@ -0,0 +1,47 @@
+"""
+Script to regrade every submission of an activity against its current test cases
+"""
+import argparse
+import os
+import sys
+import logging
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app
+from utils.regrade import RegradeJob, REGRADE_BATCH_SIZE, REGRADE_WORKERS
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logger = logging.getLogger(__name__)
+
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('activity_id', type=int, nargs='+', help='Activity ids to regrade')
+    parser.add_argument('--batch-size', type=int, default=REGRADE_BATCH_SIZE,
+                        help='Submissions fetched, graded and written per batch')
+    parser.add_argument('--workers', type=int, default=REGRADE_WORKERS,
+                        help='Distinct programs graded at once')
+    parser.add_argument('--restart', action='store_true',
+                        help='Ignore any checkpoint and regrade from the first submission')
+    args = parser.parse_args()
+
+    failed = False
+    with app.app_context():
+        for activity_id in args.activity_id:
+            job = RegradeJob(activity_id, batch_size=args.batch_size, workers=args.workers,
+                             resume=not args.restart)
+            status = job.run()
+            if status['status'] == 'completed':
+                logger.info(f"Activity {activity_id}: {status['passed']}/{status['processed']} submissions pass, "
+                            f"{status['distinct_programs']} distinct programs graded in {status['elapsed']}s")
+            else:
+                failed = True
+                logger.error(f"Activity {activity_id}: regrade failed: {status['error']}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
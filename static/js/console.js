@@ -98,6 +98,12 @@ class InteractiveConsole {
             this.writeError(`Connection error: ${error.message}`);
         });
 
+        this.socket.on('queue_position', (data) => {
+            if (data && data.position > 0) {
+                this.writeSystemMessage(`Waiting for a compiler (${data.position} ahead of you)...`);
+            }
+        });
+
         this.socket.on('output', (data) => {
             if (!data) return;
 
@@ -106,6 +112,8 @@ class InteractiveConsole {
                 return;
             }
 
+            data.output = data.output || '';
+
             // Check output size limits
             if (this.state.outputSize + data.output.length > this.config.maxOutputSize) {
                 this.clear(true); // Clear with preserve important
@@ -117,6 +125,10 @@ class InteractiveConsole {
             }
 
             this.state.waitingForInput = !!data.waiting_for_input;
+
+            if (data.finished) {
+                this.writeSystemMessage(`Program exited with code ${data.exit_code}`);
+            }
         });
     }
 
@@ -217,7 +229,7 @@ class InteractiveConsole {
         };
     }
 
-    compileAndRun(code) {
+    compileAndRun(code, language = 'csharp') {
         if (!this.state.connected) {
             this.writeError('Not connected to server');
             return;
@@ -225,7 +237,7 @@ class InteractiveConsole {
 
         this.clear();
         this.writeSystemMessage('Compiling and running code...');
-        this.socket.emit('compile_and_run', { code });
+        this.socket.emit('compile_and_run', { code, language });
     }
 
     destroy() {
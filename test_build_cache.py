@@ -0,0 +1,52 @@
+import unittest
+import os
+import tempfile
+from pathlib import Path
+from utils.build_cache import BuildCache
+
+class TestBuildCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = BuildCache(cache_dir=os.path.join(self.tmp.name, 'cache'))
+        self.output_dir = Path(self.tmp.name) / 'out'
+        self.output_dir.mkdir()
+        (self.output_dir / 'program').write_bytes(b'\x7fELF')
+        (self.output_dir / 'program.dll').write_bytes(b'MZ' * 64)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_depends_on_code_and_project(self):
+        """Keys are stable and change with the source or project file"""
+        key = self.cache.get_key('class A {}', '<Project/>')
+        self.assertEqual(key, self.cache.get_key('class A {}', '<Project/>'))
+        self.assertNotEqual(key, self.cache.get_key('class B {}', '<Project/>'))
+        self.assertNotEqual(key, self.cache.get_key('class A {}', '<Project />'))
+
+    def test_store_and_restore(self):
+        """A stored build is materialized into a new workspace on hit"""
+        key = self.cache.get_key('class A {}')
+        self.assertFalse(self.cache.restore(key, Path(self.tmp.name) / 'miss'))
+
+        self.assertIsNotNone(self.cache.store(key, self.output_dir))
+        dest = Path(self.tmp.name) / 'session' / 'bin'
+        self.assertTrue(self.cache.restore(key, dest))
+        self.assertEqual((dest / 'program').read_bytes(), b'\x7fELF')
+        self.assertEqual(self.cache.get_stats()['hits'], 1)
+        self.assertEqual(self.cache.get_stats()['misses'], 1)
+
+    def test_cleanup_evicts_least_recently_used(self):
+        """Entries are evicted oldest first once over the size limit"""
+        old_key = self.cache.get_key('old')
+        new_key = self.cache.get_key('new')
+        self.cache.store(old_key, self.output_dir)
+        self.cache.store(new_key, self.output_dir)
+        os.utime(self.cache.cache_dir / old_key, (0, 0))
+
+        self.cache.size_limit = 200
+        self.cache.cleanup()
+        self.assertIsNone(self.cache.lookup(old_key))
+        self.assertIsNotNone(self.cache.lookup(new_key))
+
+if __name__ == '__main__':
+    unittest.main()
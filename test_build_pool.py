@@ -0,0 +1,108 @@
+import unittest
+import subprocess
+import tempfile
+import threading
+import time
+from unittest import mock
+from utils.build_pool import BuildPool, BuildWorker, BuildQueueFull
+
+def fake_run(args, **kwargs):
+    return subprocess.CompletedProcess(args, 0, stdout='Build succeeded', stderr='')
+
+class TestBuildPool(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = mock.patch('utils.build_pool.subprocess.run', side_effect=fake_run)
+        self.run = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_worker_uses_stable_home_and_node_reuse(self):
+        """Every build from a worker shares one DOTNET_CLI_HOME and keeps servers resident"""
+        worker = BuildWorker(0, self.tmp.name)
+        worker.build('program.csproj', self.tmp.name, 30)
+        worker.build('program.csproj', self.tmp.name, 30)
+        homes = {c.kwargs['env']['DOTNET_CLI_HOME'] for c in self.run.call_args_list}
+        self.assertEqual(homes, {str(worker.home)})
+        self.assertIn('/nodeReuse:true', self.run.call_args.args[0])
+        self.assertEqual(worker.builds_done, 2)
+
+    def test_build_returns_completed_process(self):
+        """Jobs submitted to the pool run on a warm worker"""
+        pool = BuildPool(size=2, max_queue=4, base_dir=self.tmp.name)
+        try:
+            result = pool.build('program.csproj', self.tmp.name, 30)
+            self.assertEqual(result.returncode, 0)
+            self.assertTrue(all(w.healthy for w in pool.workers))
+        finally:
+            pool.shutdown()
+
+    def test_recycle_after_n_builds(self):
+        """Workers shut down their build server after the configured number of builds"""
+        pool = BuildPool(size=1, max_queue=4, recycle_after=2, base_dir=self.tmp.name)
+        try:
+            for _ in range(3):
+                pool.build('program.csproj', self.tmp.name, 30)
+            commands = [c.args[0][:2] for c in self.run.call_args_list]
+            self.assertIn(['dotnet', 'build-server'], commands)
+        finally:
+            pool.shutdown()
+
+    def test_full_queue_rejects(self):
+        """Submissions beyond the queue bound are rejected"""
+        release = threading.Event()
+
+        def blocking_run(args, **kwargs):
+            release.wait(5)
+            return fake_run(args, **kwargs)
+
+        self.run.side_effect = blocking_run
+        pool = BuildPool(size=1, max_queue=1, base_dir=self.tmp.name)
+        try:
+            pool.submit('a.csproj', self.tmp.name, 30)
+            with self.assertRaises(BuildQueueFull):
+                pool.submit('b.csproj', self.tmp.name, 30)
+            self.assertEqual(pool.get_stats()['rejected'], 1)
+        finally:
+            release.set()
+            pool.shutdown()
+
+    def test_queue_wait_timeout_raises_timeout_expired(self):
+        """A job still waiting when the deadline passes surfaces as a build timeout"""
+        release = threading.Event()
+
+        def blocking_run(args, **kwargs):
+            release.wait(5)
+            return fake_run(args, **kwargs)
+
+        self.run.side_effect = blocking_run
+        pool = BuildPool(size=1, max_queue=4, base_dir=self.tmp.name)
+        try:
+            with mock.patch('utils.build_pool.WARMUP_TIMEOUT', 0):
+                with self.assertRaises(subprocess.TimeoutExpired):
+                    pool.build('program.csproj', self.tmp.name, 0.1)
+        finally:
+            release.set()
+            pool.shutdown()
+
+    def test_failed_warmup_gets_no_jobs(self):
+        """A worker whose warmup failed is recycled instead of building"""
+        self.run.side_effect = lambda args, **kwargs: subprocess.CompletedProcess(args, 1, '', 'no sdk')
+        pool = BuildPool(size=1, max_queue=4, base_dir=self.tmp.name)
+        try:
+            pool.start()
+            for _ in range(50):
+                if pool.workers[0].last_health_check:
+                    break
+                time.sleep(0.1)
+            with self.assertRaises(RuntimeError):
+                pool.build('program.csproj', self.tmp.name, 30)
+            builds = [c for c in self.run.call_args_list if 'program.csproj' in c.args[0]]
+            self.assertEqual(builds, [])
+        finally:
+            pool.shutdown()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+Compile backend benchmark.
+Compares the MSBuild path (cold and on a warm build worker) with the
+direct csc compile daemon for a single-file student program.
+"""
+import os
+import time
+import statistics
+import subprocess
+import tempfile
+import logging
+from pathlib import Path
+from utils.build_pool import BuildWorker
+from utils.compile_daemon import CompileDaemon, parse_diagnostics
+
+# Only enable debug logging when running tests directly
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RUNS = 3
+
+PROJECT = """<Project Sdk="Microsoft.NET.Sdk">
+  <PropertyGroup>
+    <OutputType>Exe</OutputType>
+    <TargetFramework>net7.0</TargetFramework>
+    <RuntimeIdentifier>linux-x64</RuntimeIdentifier>
+    <SelfContained>false</SelfContained>
+    <EnableDefaultItems>false</EnableDefaultItems>
+    <GenerateAssemblyInfo>false</GenerateAssemblyInfo>
+  </PropertyGroup>
+  <ItemGroup>
+    <Compile Include="Program.cs" />
+  </ItemGroup>
+</Project>"""
+
+def make_code(i: int) -> str:
+    # Vary the source so no run can be served from any cache
+    return f"""using System;
+class Program {{
+    static void Main() {{
+        Console.WriteLine("Run {i}");
+    }}
+}}"""
+
+def write_project(root: Path, i: int) -> Path:
+    project_dir = root / f"msbuild_{i}"
+    project_dir.mkdir()
+    (project_dir / "Program.cs").write_text(make_code(i))
+    project_file = project_dir / "program.csproj"
+    project_file.write_text(PROJECT)
+    return project_file
+
+def bench_cold_msbuild(root: Path):
+    """dotnet build with a fresh CLI home per run, as before the build pool"""
+    times = []
+    for i in range(RUNS):
+        project_file = write_project(root, 100 + i)
+        start = time.time()
+        result = subprocess.run(
+            ['dotnet', 'build', str(project_file), '--nologo', '-c', 'Release'],
+            capture_output=True, text=True, cwd=str(project_file.parent),
+            env={**os.environ, 'DOTNET_CLI_HOME': str(project_file.parent), 'DOTNET_NOLOGO': 'true'}
+        )
+        times.append(time.time() - start)
+        assert result.returncode == 0, result.stdout
+    return times
+
+def bench_warm_msbuild(root: Path):
+    """dotnet build on a warm build worker"""
+    worker = BuildWorker(0, str(root / 'workers'))
+    assert worker.warm(), "Warmup build failed"
+    times = []
+    for i in range(RUNS):
+        project_file = write_project(root, 200 + i)
+        start = time.time()
+        result = worker.build(str(project_file), str(project_file.parent), 120)
+        times.append(time.time() - start)
+        assert result.returncode == 0, result.stdout
+    return times
+
+def bench_csc_daemon(root: Path):
+    """Direct csc compilation through the resident compiler server"""
+    daemon = CompileDaemon(work_dir=str(root / 'daemon'))
+    assert daemon.warm(), "Compile daemon warmup failed"
+    times = []
+    for i in range(RUNS):
+        start = time.time()
+        result = daemon.compile(make_code(300 + i), root / f"csc_{i}")
+        times.append(time.time() - start)
+        assert result['success'], result.get('error')
+        run = subprocess.run(result['command'], capture_output=True, text=True)
+        assert f"Run {300 + i}" in run.stdout
+    return times
+
+def test_parse_diagnostics():
+    """csc output is parsed into structured diagnostics"""
+    output = ("/tmp/x/Program.cs(5,34): error CS1002: ; expected\n"
+              "/tmp/x/Program.cs(3,9): warning CS0168: The variable 'x' is declared but never used\n")
+    diagnostics = parse_diagnostics(output)
+    assert [d.code for d in diagnostics] == ['CS1002', 'CS0168']
+    assert diagnostics[0].file == 'Program.cs'
+    assert (diagnostics[0].line, diagnostics[0].column) == (5, 34)
+    assert diagnostics[1].error_type == 'warning'
+
+def test_compile_backend_benchmark():
+    """Compare p50 compile latency of the backends"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        results = {
+            'dotnet build (cold)': bench_cold_msbuild(root),
+            'dotnet build (warm worker)': bench_warm_msbuild(root),
+            'csc daemon': bench_csc_daemon(root),
+        }
+
+    for name, times in results.items():
+        logger.info(f"{name}: p50 {statistics.median(times):.2f}s, "
+                    f"min {min(times):.2f}s, max {max(times):.2f}s")
+
+    assert statistics.median(results['csc daemon']) < statistics.median(results['dotnet build (cold)'])
+
+if __name__ == "__main__":
+    test_parse_diagnostics()
+    test_compile_backend_benchmark()
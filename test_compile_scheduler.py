@@ -0,0 +1,83 @@
+import unittest
+import threading
+from utils.compile_scheduler import CompileScheduler, SchedulerFull
+
+class TestCompileScheduler(unittest.TestCase):
+    def setUp(self):
+        self.gate = threading.Event()
+        self.running = threading.Event()
+        self.order = []
+        self.scheduler = CompileScheduler(workers=1, max_queue=4, max_per_user=2)
+
+    def tearDown(self):
+        self.gate.set()
+        self.scheduler.shutdown()
+
+    def job(self, name):
+        self.running.set()
+        self.gate.wait(5)
+        self.order.append(name)
+        return name
+
+    def occupy_worker(self, name):
+        future = self.scheduler.submit('x', self.job, name)
+        self.assertTrue(self.running.wait(5))
+        return future
+
+    def test_round_robin_between_users(self):
+        """A user with several queued runs does not starve others"""
+        blocker = self.occupy_worker('x1')
+        futures = [
+            self.scheduler.submit('alice', self.job, 'a1'),
+            self.scheduler.submit('alice', self.job, 'a2'),
+            self.scheduler.submit('bob', self.job, 'b1'),
+        ]
+        self.gate.set()
+        blocker.result(timeout=5)
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(self.order, ['x1', 'a1', 'b1', 'a2'])
+
+    def test_rejects_when_full(self):
+        """Jobs beyond the queue bound or per-user limit get a retry-after hint"""
+        self.occupy_worker('running')
+        self.scheduler.submit('alice', self.job, 'a1')
+        self.scheduler.submit('alice', self.job, 'a2')
+        with self.assertRaises(SchedulerFull) as ctx:
+            self.scheduler.submit('alice', self.job, 'a3')
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+
+        self.scheduler.submit('bob', self.job, 'b1')
+        self.scheduler.submit('carol', self.job, 'c1')
+        with self.assertRaises(SchedulerFull):
+            self.scheduler.submit('dave', self.job, 'd1')
+        self.assertEqual(self.scheduler.get_stats()['rejected'], 2)
+
+    def test_queue_position_updates(self):
+        """Queued jobs are told how many jobs are ahead of them"""
+        positions = []
+        self.occupy_worker('running')
+        self.scheduler.submit('alice', self.job, 'a1')
+        future = self.scheduler.submit('bob', self.job, 'b1', on_position=positions.append)
+        self.gate.set()
+        future.result(timeout=5)
+        self.assertEqual(positions[0], 1)
+        self.assertEqual(positions[-1], 0)
+
+    def test_background_jobs_wait_for_everyone_else(self):
+        """A background user only gets a worker when no other user has a job queued"""
+        blocker = self.occupy_worker('x1')
+        futures = [
+            self.scheduler.submit('regrade', self.job, 'r1', background=True),
+            self.scheduler.submit('regrade', self.job, 'r2', background=True),
+            self.scheduler.submit('alice', self.job, 'a1'),
+            self.scheduler.submit('bob', self.job, 'b1'),
+        ]
+        self.gate.set()
+        blocker.result(timeout=5)
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(self.order, ['x1', 'a1', 'b1', 'r1', 'r2'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import os
+import tempfile
+import time
+from utils.context_index import ContextIndex
+
+DOCS = {
+    'auth.md': '# Auth\nPassword hashing, login sessions and account lockout.',
+    'compiler.md': '# Compiler\nThe C# compiler service builds programs with dotnet.',
+    'curriculum.md': '# Curriculum\nOntario strands, overall and specific expectations.',
+    'sockets.md': '# Sockets\nSocket.IO events stream program output to the console.',
+}
+
+class TestContextIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = self.temp_dir.name
+        for name, content in DOCS.items():
+            self.write(name, content)
+        self.index = ContextIndex(self.directory)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def write(self, name, content):
+        with open(self.path(name), 'w') as f:
+            f.write(content)
+        # Make sure the change is visible through the mtime
+        stat = os.stat(self.path(name))
+        os.utime(self.path(name), ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    def test_scores_all_files_with_one_fit(self):
+        scores = self.index.score('dotnet compiler builds')
+        self.assertEqual(len(scores), 4)
+        self.assertEqual(max(scores, key=scores.get), os.path.abspath(self.path('compiler.md')))
+        self.index.score('password login')
+        self.assertEqual(self.index.fits, 1)
+
+        single = self.index.score('dotnet compiler builds', [self.path('compiler.md')])
+        self.assertAlmostEqual(list(single.values())[0], scores[os.path.abspath(self.path('compiler.md'))])
+
+    def test_changed_file_is_revectorized_without_refit(self):
+        self.index.score('password')
+        self.write('auth.md', '# Auth\nThe compiler now handles password hashing too.')
+        scores = self.index.score('compiler')
+        self.assertEqual(self.index.fits, 1)
+        self.assertEqual(self.index.transforms, 1)
+        self.assertGreater(scores[os.path.abspath(self.path('auth.md'))], 0)
+
+        # Touching a file without changing it is not a change
+        os.utime(self.path('auth.md'), None)
+        self.index.score('compiler')
+        self.assertEqual(self.index.transforms, 1)
+
+    def test_added_and_removed_files_refit(self):
+        self.index.score('password')
+        self.write('grading.md', '# Grading\nTest cases run against compiled programs.')
+        scores = self.index.score('test cases')
+        self.assertEqual(self.index.fits, 2)
+        self.assertIn(os.path.abspath(self.path('grading.md')), scores)
+
+        os.remove(self.path('sockets.md'))
+        self.assertEqual(len(self.index.score('test cases')), 4)
+        with self.assertRaises(FileNotFoundError):
+            self.index.score('events', [self.path('sockets.md')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+from utils.cpp_compiler import CppCompiler, leading_headers, parse_diagnostics
+
+PROGRAM = """#include <iostream>
+#include <string>
+#include <vector>
+using namespace std;
+int main() {
+    vector<string> names;
+    string name;
+    while (cin >> name) names.push_back(name);
+    cout << "Read " << names.size() << " names" << endl;
+    return 0;
+}
+"""
+
+@unittest.skipUnless(shutil.which('g++') or shutil.which('clang++'), "No C++ compiler installed")
+class TestCppCompiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.compiler = CppCompiler(pch_dir=str(self.tmp / 'pch'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_compiles_with_pch_and_caches_executable(self):
+        """First build uses the precompiled header, an identical program hits the cache"""
+        self.assertTrue(self.compiler.pch_flags())
+        code = PROGRAM + f"// {time.time()}\n"
+
+        result = self.compiler.compile(code, self.tmp / 'first')
+        self.assertTrue(result['success'], result.get('error'))
+        self.assertFalse(result['cached'])
+        run = subprocess.run(result['command'], input='Ada Grace Alan', capture_output=True, text=True)
+        self.assertEqual(run.stdout.strip(), 'Read 3 names')
+
+        again = self.compiler.compile(code, self.tmp / 'second')
+        self.assertTrue(again['cached'])
+        self.assertTrue(Path(again['executable']).exists())
+
+    def test_pch_never_adds_headers_the_program_did_not_include(self):
+        """A global count stays unambiguous next to <iostream> alone"""
+        code = ("#include <iostream>\nusing namespace std;\nint count = 3;\n"
+                "int main() { cout << count << endl; return 0; }\n" f"// {time.time()}\n")
+        result = self.compiler.compile(code, self.tmp / 'count')
+        self.assertTrue(result['success'], result.get('error'))
+        run = subprocess.run(result['command'], capture_output=True, text=True)
+        self.assertEqual(run.stdout.strip(), '3')
+        self.assertEqual(len(list((self.tmp / 'pch').iterdir())), 1)
+
+    def test_timed_out_pch_build_is_retried(self):
+        """A header build that times out is not remembered as a failure"""
+        real_run = subprocess.run
+        timed_out = []
+
+        def time_out_once(args, **kwargs):
+            if 'c++-header' in args and not timed_out:
+                timed_out.append(args)
+                raise subprocess.TimeoutExpired(args, kwargs.get('timeout'))
+            return real_run(args, **kwargs)
+
+        with mock.patch('utils.cpp_compiler.subprocess.run', side_effect=time_out_once):
+            self.assertEqual(self.compiler.pch_flags(('iostream',)), [])
+            self.assertTrue(self.compiler.pch_flags(('iostream',)))
+
+    def test_pch_build_only_blocks_its_header_set(self):
+        """Waiting for one header set does not hold up another"""
+        release = threading.Event()
+        real_run = subprocess.run
+
+        def slow_cmath(args, **kwargs):
+            if 'c++-header' in args and 'cmath' in Path(args[args.index('c++-header') + 1]).read_text():
+                release.wait(10)
+            return real_run(args, **kwargs)
+
+        with mock.patch('utils.cpp_compiler.subprocess.run', side_effect=slow_cmath):
+            builder = threading.Thread(target=self.compiler.pch_flags, args=(('cmath',),))
+            builder.start()
+            try:
+                time.sleep(0.2)
+                # A second request for the building set gives up at its own timeout
+                self.assertEqual(self.compiler.pch_flags(('cmath',), timeout=0.1), [])
+                self.assertTrue(self.compiler.pch_flags(('string',)))
+            finally:
+                release.set()
+                builder.join()
+
+    def test_leading_headers(self):
+        self.assertEqual(leading_headers(PROGRAM), ('iostream', 'string', 'vector'))
+        self.assertIsNone(leading_headers('#include <iostream>\n#include <bitset>\nint main() {}\n'))
+        self.assertIsNone(leading_headers('#define N 5\n#include <iostream>\nint main() {}\n'))
+        self.assertEqual(leading_headers('// sum\n#include <cmath>\nint main() {}\n#include <map>\n'),
+                         ('cmath',))
+
+    def test_reports_structured_errors(self):
+        """Compiler errors come back with file, line and column"""
+        result = self.compiler.compile('int main() {\n    return missing;\n}\n', self.tmp / 'broken')
+        self.assertFalse(result['success'])
+        self.assertEqual(result['diagnostics'][0]['line'], 2)
+        self.assertIn('missing', result['error'])
+
+    def test_parse_diagnostics(self):
+        output = ("main.cpp:3:5: warning: unused variable 'x' [-Wunused-variable]\n"
+                  "main.cpp:7:1: fatal error: foo.h: No such file or directory\n")
+        diagnostics = parse_diagnostics(output)
+        self.assertEqual([d.error_type for d in diagnostics], ['warning', 'error'])
+        self.assertEqual(diagnostics[0].code, '-Wunused-variable')
+        self.assertEqual((diagnostics[1].line, diagnostics[1].column), (7, 1))
+
+if __name__ == '__main__':
+    unittest.main()
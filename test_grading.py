@@ -0,0 +1,83 @@
+import unittest
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+from utils import csharp_build, grading
+from utils.grading import grade_submission, normalize_output
+
+CPP_PROGRAM = """#include <iostream>
+using namespace std;
+int main() {
+    int a, b;
+    cin >> a >> b;
+    cout << a + b << endl;
+    return 0;
+}
+"""
+
+def make_cases(count):
+    return [{'input': f'{i} {i}\n', 'expected_output': f'{2 * i}\n'} for i in range(count)]
+
+@unittest.skipUnless(shutil.which('g++') or shutil.which('clang++'), "No C++ compiler installed")
+class TestGrading(unittest.TestCase):
+    def test_compiles_once_for_all_cases(self):
+        """Twenty cases cost one compilation and run in parallel"""
+        code = CPP_PROGRAM + f"// {time.time()}\n"
+        with mock.patch.object(grading, 'compile_once', wraps=grading.compile_once) as compile_once:
+            result = grade_submission(code, 'cpp', make_cases(20), max_workers=4)
+        self.assertEqual(compile_once.call_count, 1)
+        self.assertTrue(result['all_passed'], result)
+        self.assertEqual(result['passed'], 20)
+        self.assertTrue(all('time' in r for r in result['results']))
+
+    def test_reports_failures_and_timeouts(self):
+        """Wrong output and hung programs are reported per case"""
+        cases = [
+            {'input': '1 2', 'expected_output': '3'},
+            {'name': 'wrong', 'input': '1 2', 'expected_output': '4'},
+        ]
+        result = grade_submission(CPP_PROGRAM, 'cpp', cases)
+        self.assertEqual([r['status'] for r in result['results']], ['passed', 'failed'])
+        self.assertEqual(result['results'][1]['actual_output'].strip(), '3')
+
+        hang = '#include <iostream>\nint main() { while (true) {} }\n'
+        result = grade_submission(hang, 'cpp', [{'input': '', 'expected_output': '', 'timeout': 0.5}])
+        self.assertEqual(result['results'][0]['status'], 'timeout')
+
+    def test_stop_on_first_failure(self):
+        """Cases not yet started are skipped once one fails"""
+        cases = [{'input': '1 1', 'expected_output': 'nope'}] + make_cases(5)
+        result = grade_submission(CPP_PROGRAM, 'cpp', cases, stop_on_failure=True, max_workers=1)
+        self.assertEqual(result['results'][0]['status'], 'failed')
+        self.assertTrue(all(r['status'] == 'skipped' for r in result['results'][1:]))
+
+    def test_compile_error_is_returned_once(self):
+        result = grade_submission('int main() { return x; }', 'cpp', make_cases(3))
+        self.assertFalse(result['success'])
+        self.assertTrue(result['diagnostics'])
+
+    def test_normalize_output(self):
+        self.assertEqual(normalize_output('a  \r\nb\r\n\r\n'), normalize_output('a\nb'))
+
+class TestCsharpBackend(unittest.TestCase):
+    def test_csc_falls_back_to_build_pool(self):
+        """Without csc, C# grading builds on the MSBuild pool like interactive runs"""
+        daemon = mock.Mock()
+        daemon.resolve.return_value = False
+        pool = mock.Mock()
+        pool.build.return_value = subprocess.CompletedProcess([], 1, stdout='error CS1002: ; expected', stderr='')
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(csharp_build, 'COMPILER_BACKEND', 'csc'), \
+                mock.patch.object(csharp_build, 'get_compile_daemon', return_value=daemon), \
+                mock.patch.object(csharp_build, 'get_build_pool', return_value=pool):
+            result = grading.compile_once(f"class P {{ }} // {time.time()}", 'csharp', Path(tmp))
+        daemon.compile.assert_not_called()
+        pool.build.assert_called_once()
+        self.assertFalse(result['success'])
+        self.assertIn('CS1002', result['error'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import tempfile
+import time
+from pathlib import Path
+from utils.jsonl_writer import JsonlWriter, read_events, segment_paths, session_timeline
+from utils.compiler_logger import CompilerLogger
+
+class TestJsonlWriter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.directory = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_rotates_and_compresses_segments(self):
+        """Records survive rotation and gzip and come back in order"""
+        writer = JsonlWriter(self.directory, max_bytes=4096, max_segments=1000)
+        for i in range(2000):
+            writer.write({'session_id': f's{i % 4}', 'timestamp': f'{i:06d}', 'seq': i})
+        writer.close()
+
+        segments = segment_paths(self.directory)
+        self.assertGreater(len(segments), 5)
+        self.assertTrue(all(p.suffix == '.gz' for p in segments[:-1]))
+        self.assertEqual([r['seq'] for r in read_events(self.directory)], list(range(2000)))
+
+        timeline = session_timeline(self.directory, 's1')
+        self.assertEqual([r['seq'] for r in timeline], list(range(1, 2000, 4)))
+        self.assertEqual(writer.get_stats()['written'], 2000)
+
+    def test_keeps_newest_segments(self):
+        writer = JsonlWriter(self.directory, max_bytes=512, max_segments=3, compress=False)
+        for i in range(500):
+            writer.write({'seq': i})
+        writer.close()
+        rotated = [p for p in segment_paths(self.directory) if p.name != 'events.jsonl']
+        self.assertEqual(len(rotated), 3)
+        # The newest records are the ones kept
+        self.assertEqual(list(read_events(self.directory))[-1]['seq'], 499)
+
+    def test_compiler_logger_events_leave_request_thread(self):
+        """Logging an event costs a queue put, independent of session length"""
+        compiler_logger = CompilerLogger(log_dir=self.directory)
+        start = time.perf_counter()
+        for i in range(5000):
+            compiler_logger.log_execution_state('session-1', f'state-{i}')
+        elapsed = time.perf_counter() - start
+        self.assertLess(elapsed / 5000, 0.001)
+
+        try:
+            raise ValueError('bad')
+        except ValueError as e:
+            compiler_logger.log_compilation_error('session-2', e, {'step': 'build'})
+        timeline = compiler_logger.get_session_timeline('session-1')
+        self.assertEqual(len(timeline), 5000)
+        self.assertEqual(timeline[-1]['data']['state'], 'state-4999')
+        error = compiler_logger.get_session_timeline('session-2')[0]
+        self.assertIn('raise ValueError', error['data']['stack_trace'])
+        compiler_logger.writer.close()
+        self.assertFalse(list(Path(self.directory).glob('session_*.json')))
+
+if __name__ == '__main__':
+    unittest.main()
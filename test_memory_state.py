@@ -0,0 +1,88 @@
+import unittest
+import json
+import os
+import tempfile
+import time
+from unittest import mock
+from utils import memory_state
+from utils.memory_state import MemoryStateStore
+
+class TestMemoryStateStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.paths = [os.path.join(self.temp_dir.name, name) for name in
+                      ('memory_changes.json', 'memory_versions.json', 'context_relevance.json')]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def load(self, index):
+        with open(self.paths[index]) as f:
+            return json.load(f)
+
+    def test_batch_writes_each_file_once(self):
+        """A bulk update of many files costs one write per state file"""
+        store = MemoryStateStore(*self.paths, debounce=60)
+        with mock.patch.object(memory_state, 'write_json_atomic', wraps=memory_state.write_json_atomic) as write:
+            with store.batch():
+                for i in range(50):
+                    store.bump_version(f'file{i % 5}.md')
+                    store.append_change({'file': f'file{i % 5}.md', 'operation': 'update_timestamp'})
+                    store.set_relevance({'file0.md': {'score': i}})
+        # Versions and relevance are rewritten, the change log is appended to its journal
+        self.assertEqual(write.call_count, 2)
+        self.assertEqual(store.writes, 3)
+        self.assertEqual(self.load(1)['file0.md'], 10)
+        self.assertEqual(len(MemoryStateStore(*self.paths).changes), 50)
+        self.assertEqual(self.load(2)['file0.md']['score'], 49)
+        self.assertFalse([p for p in os.listdir(self.temp_dir.name) if p.endswith('.tmp')])
+
+    def test_writes_are_debounced(self):
+        store = MemoryStateStore(*self.paths, debounce=0.1)
+        for _ in range(20):
+            store.bump_version('AI_CONTEXT.md')
+        self.assertFalse(os.path.exists(self.paths[1]))
+        time.sleep(0.3)
+        self.assertEqual(self.load(1), {'AI_CONTEXT.md': 20})
+        self.assertEqual(store.writes, 1)
+
+    def test_reloads_working_copy(self):
+        store = MemoryStateStore(*self.paths)
+        store.bump_version('a.md')
+        store.append_change({'file': 'a.md'})
+        store.flush()
+        reloaded = MemoryStateStore(*self.paths)
+        self.assertEqual(reloaded.get_version('a.md'), 1)
+        self.assertEqual(reloaded.changes, [{'file': 'a.md'}])
+        self.assertEqual(reloaded.relevance, {})
+
+    def test_processes_merge_instead_of_overwriting(self):
+        """Two working copies of the same files keep each other's changes"""
+        first = MemoryStateStore(*self.paths)
+        second = MemoryStateStore(*self.paths)
+        first.bump_version('a.md')
+        second.bump_version('a.md')
+        second.bump_version('b.md')
+        first.append_change({'file': 'a.md', 'by': 'first'})
+        second.append_change({'file': 'a.md', 'by': 'second'})
+        first.flush()
+        second.flush()
+        self.assertEqual(self.load(1), {'a.md': 2, 'b.md': 1})
+        self.assertEqual(second.get_version('a.md'), 2)
+        reloaded = MemoryStateStore(*self.paths)
+        self.assertEqual([c['by'] for c in reloaded.changes], ['first', 'second'])
+
+    def test_change_log_is_compacted(self):
+        """A journal past the size limit is folded into the JSON change log"""
+        store = MemoryStateStore(*self.paths)
+        with mock.patch.object(memory_state, 'COMPACT_BYTES', 200):
+            for i in range(10):
+                store.append_change({'file': f'file{i}.md', 'operation': 'update_timestamp'})
+                store.flush()
+        self.assertLess(os.path.getsize(store.journal) if os.path.exists(store.journal) else 0, 200)
+        self.assertGreaterEqual(len(self.load(0)), 2)
+        reloaded = MemoryStateStore(*self.paths)
+        self.assertEqual([c['file'] for c in reloaded.changes], [f'file{i}.md' for i in range(10)])
+
+if __name__ == '__main__':
+    unittest.main()
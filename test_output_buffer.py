@@ -0,0 +1,41 @@
+import unittest
+from utils.output_buffer import OutputRingBuffer
+
+class TestOutputRingBuffer(unittest.TestCase):
+    def test_drop_oldest_keeps_newest_bytes(self):
+        """Overflow drops the oldest bytes and counts them exactly"""
+        buffer = OutputRingBuffer(capacity=8)
+        buffer.write(b'abcdef')
+        self.assertEqual(buffer.write(b'ghij'), 4)
+        self.assertEqual(buffer.read(), b'cdefghij')
+        self.assertEqual((buffer.bytes_produced, buffer.bytes_dropped), (10, 2))
+
+        buffer.write(b'0123456789ABC')
+        self.assertEqual(buffer.read(), b'56789ABC')
+        self.assertEqual(buffer.bytes_dropped, 7)
+        self.assertTrue(buffer.overflowed)
+
+    def test_kill_policy_refuses_new_output(self):
+        """The kill policy keeps what was buffered and flags the overflow"""
+        buffer = OutputRingBuffer(capacity=4, policy='kill')
+        self.assertEqual(buffer.write(b'abcdef'), 4)
+        self.assertTrue(buffer.overflowed)
+        self.assertEqual(buffer.read(), b'abcd')
+        self.assertEqual(buffer.bytes_dropped, 2)
+
+    def test_peek_is_zero_copy_across_wraparound(self):
+        """peek returns views into the buffer split at the wrap point"""
+        buffer = OutputRingBuffer(capacity=6)
+        buffer.write(b'abcd')
+        buffer.consume(3)
+        buffer.write(b'efgh')
+        views = buffer.peek()
+        self.assertEqual(len(views), 2)
+        self.assertTrue(all(isinstance(v, memoryview) for v in views))
+        self.assertEqual(b''.join(views), b'defgh')
+        buffer.consume(2)
+        self.assertEqual(buffer.read(), b'fgh')
+        self.assertEqual(len(buffer), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import subprocess
+import threading
+from compiler_service import get_or_create_session, start_output_stream, send_input, cleanup_session
+
+class TestOutputStream(unittest.TestCase):
+    def setUp(self):
+        self.session = get_or_create_session()
+        self.payloads = []
+        self.finished = threading.Event()
+
+    def tearDown(self):
+        cleanup_session(self.session.session_id)
+
+    def collect(self, payload):
+        self.payloads.append(payload)
+        if payload.get('finished'):
+            self.finished.set()
+
+    def spawn(self, command):
+        self.session.process = subprocess.Popen(
+            command,
+            stdin=self.session.slave_fd,
+            stdout=self.session.slave_fd,
+            stderr=self.session.slave_fd,
+            close_fds=True
+        )
+
+    def output(self):
+        return ''.join(p['output'] for p in self.payloads).replace('\r\n', '\n')
+
+    def test_streams_full_output_of_chatty_program(self):
+        """Output well beyond a single 1KB read is delivered without polling"""
+        self.spawn(['seq', '1', '5000'])
+        self.assertTrue(start_output_stream(self.session.session_id, self.collect)['success'])
+        self.assertTrue(self.finished.wait(10))
+
+        self.assertEqual(self.output().split(), [str(i) for i in range(1, 5001)])
+        self.assertEqual(self.payloads[-1]['exit_code'], 0)
+        # Small writes are coalesced into far fewer emits than lines
+        self.assertLess(len(self.payloads), 500)
+
+    def test_streams_output_produced_after_input(self):
+        """Output that follows user input arrives without another request"""
+        self.spawn(['sh', '-c', 'read name; sleep 0.2; echo "Hello $name"'])
+        start_output_stream(self.session.session_id, self.collect)
+        self.assertTrue(send_input(self.session.session_id, 'Ada')['success'])
+        self.assertTrue(self.finished.wait(10))
+        self.assertIn('Hello Ada', self.output())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import os
+import pty
+import subprocess
+import threading
+from utils.pty_multiplexer import PtyMultiplexer
+from utils.output_buffer import OutputRingBuffer
+
+class TestPtyMultiplexer(unittest.TestCase):
+    def setUp(self):
+        self.multiplexer = PtyMultiplexer()
+        self.ptys = []
+
+    def tearDown(self):
+        self.multiplexer.shutdown()
+        for process, master_fd, slave_fd in self.ptys:
+            if process.poll() is None:
+                process.kill()
+            process.wait()
+            os.close(master_fd)
+            os.close(slave_fd)
+
+    def spawn(self, key, command, buffer=None):
+        master_fd, slave_fd = pty.openpty()
+        process = subprocess.Popen(command, stdin=slave_fd, stdout=slave_fd,
+                                   stderr=slave_fd, close_fds=True)
+        self.ptys.append((process, master_fd, slave_fd))
+        self.multiplexer.register(key, master_fd, process, buffer=buffer)
+        return process
+
+    def test_serves_many_sessions_from_one_loop(self):
+        """Output of concurrent sessions is routed to the right buffer"""
+        exits = {}
+        done = threading.Event()
+
+        def on_exit(key, exit_code):
+            exits[key] = exit_code
+            if len(exits) == 20:
+                done.set()
+
+        threads_before = threading.active_count()
+        for i in range(20):
+            self.spawn(f's{i}', ['sh', '-c', f'echo session-{i}; exit {i % 3}'])
+        # One loop thread regardless of the number of sessions
+        self.assertLessEqual(threading.active_count(), threads_before + 1)
+
+        outputs = {}
+        for i in range(20):
+            key = f's{i}'
+            outputs[key] = bytearray()
+            self.multiplexer.subscribe(key, lambda k, data: outputs[k].extend(data), on_exit)
+        self.assertTrue(done.wait(10))
+
+        for i in range(20):
+            self.assertIn(f'session-{i}', outputs[f's{i}'].decode())
+            self.assertEqual(exits[f's{i}'], i % 3)
+
+        metrics = self.multiplexer.get_metrics()
+        self.assertEqual(metrics['sessions'], 20)
+        self.assertGreater(metrics['bytes_total'], 0)
+        self.assertGreater(metrics['bytes_per_sec'], 0)
+
+    def test_read_waits_for_buffered_output(self):
+        """Polling readers get output buffered since their last call"""
+        self.spawn('poll', ['sh', '-c', 'sleep 0.2; echo late'])
+        self.assertEqual(self.multiplexer.read('poll'), b'')
+        data = b''
+        for _ in range(50):
+            data += self.multiplexer.read('poll', timeout=0.1)
+            if b'late' in data:
+                break
+        self.assertIn(b'late', data)
+
+        self.multiplexer.unregister('poll')
+        self.assertIsNone(self.multiplexer.read('poll'))
+        self.assertEqual(self.multiplexer.get_metrics()['active_fds'], 0)
+
+    def test_runaway_output_is_bounded(self):
+        """An endless printer is stopped once its buffer overflows"""
+        buffer = OutputRingBuffer(capacity=4096, policy='kill')
+        process = self.spawn('runaway', ['yes'], buffer=buffer)
+        process.wait(timeout=10)
+        self.assertEqual(len(buffer), 4096)
+        self.assertGreater(buffer.bytes_dropped, 0)
+        self.assertEqual(buffer.bytes_produced, 4096 + buffer.bytes_dropped)
+
+if __name__ == '__main__':
+    unittest.main()
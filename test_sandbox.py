@@ -0,0 +1,67 @@
+import unittest
+import subprocess
+import sys
+from utils.sandbox import sandboxed_popen, SandboxLimits
+
+class TestSandbox(unittest.TestCase):
+    def run_native(self, code, **limits):
+        process = sandboxed_popen([sys.executable, '-c', code],
+                                  limits=SandboxLimits(runtime='native', **limits),
+                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        process.output, process.errors = process.communicate(timeout=20)
+        return process
+
+    def test_cpu_limit_stops_busy_loop(self):
+        """A spinning program is stopped at its CPU budget"""
+        process = self.run_native('while True: pass', cpu_seconds=1)
+        usage = process.usage()
+        self.assertEqual(usage['limit_exceeded'], 'cpu')
+        self.assertGreater(usage['cpu_time'], 0.2)
+        self.assertLess(usage['wall_time'], 10)
+
+    def test_restart_budget_excludes_startup_cpu(self):
+        """CPU used before restart_budget counts against neither the budget nor the usage"""
+        process = sandboxed_popen(
+            [sys.executable, '-c',
+             "import sys, time\n"
+             "end = time.process_time() + 1.5\n"
+             "while time.process_time() < end: pass\n"
+             "print('ready', flush=True)\n"
+             "sys.stdin.readline()\n"
+             "while True: pass"],
+            limits=SandboxLimits(runtime='native', cpu_seconds=5),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        self.assertEqual(process.stdout.readline().strip(), b'ready')
+        process.restart_budget(SandboxLimits(runtime='native', cpu_seconds=1))
+        process.communicate(b'go\n', timeout=20)
+        usage = process.usage()
+        self.assertEqual(usage['limit_exceeded'], 'cpu')
+        self.assertLess(usage['cpu_time'], 3)
+
+    def test_memory_and_file_limits(self):
+        """Allocations and file writes beyond the limits fail in the program"""
+        process = self.run_native('x = bytearray(400 * 1024 * 1024)', memory_mb=200)
+        self.assertNotEqual(process.returncode, 0)
+
+        # Python ignores SIGXFSZ, so the write fails with EFBIG instead
+        process = self.run_native(
+            "import tempfile\n"
+            "with tempfile.TemporaryFile() as f: f.write(b'x' * (4 << 20))",
+            max_file_size_mb=1
+        )
+        self.assertNotEqual(process.returncode, 0)
+        self.assertIn(b'File too large', process.errors)
+
+    def test_reports_peak_rss(self):
+        """Peak RSS of a finished run reflects the program's own allocations"""
+        process = self.run_native('x = bytearray(300 * 1024 * 1024); x[::4096] = b"1" * len(x[::4096])',
+                                  memory_mb=1024)
+        self.assertEqual(process.returncode, 0)
+        usage = process.usage()
+        self.assertGreaterEqual(usage['peak_rss_mb'], 300)
+        self.assertIn('cpu_time', usage)
+        self.assertIn('wall_time', usage)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import logging
+import os
+import time
+from compiler_service import (
+    SessionRegistry, InteractiveSession, session_registry,
+    get_or_create_session, get_output, send_input, cleanup_session
+)
+
+logging.basicConfig(level=logging.INFO)
+
+class TestSessionRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = SessionRegistry(timeout=60)
+
+    def tearDown(self):
+        self.registry.clear()
+
+    def test_register_and_lookup(self):
+        """Registered sessions are returned by id"""
+        session = InteractiveSession('registry-lookup')
+        self.registry.register(session)
+        self.assertIn('registry-lookup', self.registry)
+        self.assertIs(self.registry.get('registry-lookup'), session)
+        self.assertIsNone(self.registry.get('missing'))
+
+    def test_evict_expired_closes_fds(self):
+        """Idle sessions are evicted and their PTY released"""
+        session = InteractiveSession('registry-idle')
+        master_fd = session.master_fd
+        self.registry.register(session)
+        session.last_activity = time.time() - 120
+
+        self.assertEqual(self.registry.evict_expired(), 1)
+        self.assertNotIn('registry-idle', self.registry)
+        self.assertIsNone(session.master_fd)
+        with self.assertRaises(OSError):
+            os.fstat(master_fd)
+
+    def test_replacing_session_cleans_previous(self):
+        """Registering a new session under an existing id releases the old one"""
+        first = InteractiveSession('registry-replace')
+        second = InteractiveSession('registry-replace')
+        self.registry.register(first)
+        self.registry.register(second)
+        self.assertIs(self.registry.get('registry-replace'), second)
+        self.assertIsNone(first.master_fd)
+
+    def test_replacing_session_keeps_workspace(self):
+        """The replaced session does not delete the directory the new one uses"""
+        first = InteractiveSession('registry-workspace')
+        self.registry.register(first)
+        second = InteractiveSession('registry-workspace')
+        os.makedirs(second.temp_dir, exist_ok=True)
+        self.registry.register(second)
+        self.assertTrue(os.path.isdir(second.temp_dir))
+
+class TestSessionReuse(unittest.TestCase):
+    def test_io_uses_live_session(self):
+        """get_output and send_input operate on the registered PTY"""
+        session = get_or_create_session()
+        try:
+            self.assertIs(get_or_create_session(session.session_id), session)
+            os.write(session.slave_fd, b'Enter your name?')
+            result = get_output(session.session_id)
+            self.assertTrue(result['success'])
+            self.assertIn('Enter your name', result['output'])
+            self.assertTrue(send_input(session.session_id, 'Ada')['success'])
+        finally:
+            cleanup_session(session.session_id)
+        self.assertNotIn(session.session_id, session_registry)
+        self.assertFalse(get_output(session.session_id)['success'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import random
+import threading
+from utils.metrics import LogHistogram, SlidingHistogram
+from utils.socketio_logger import SocketIOMetrics
+
+class TestLogHistogram(unittest.TestCase):
+    def test_percentiles_within_bucket_error(self):
+        values = [random.uniform(0.001, 2.0) for _ in range(20000)]
+        histogram = LogHistogram()
+        for value in values:
+            histogram.record(value)
+        values.sort()
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * len(values)) - 1]
+            self.assertAlmostEqual(histogram.percentile(q) / exact, 1.0, delta=0.1)
+        self.assertEqual(histogram.count, 20000)
+        self.assertEqual(histogram.max, values[-1])
+
+    def test_sliding_window_forgets_old_slots(self):
+        window = SlidingHistogram(window=60, slots=6)
+        window.record(5.0, now=1000)
+        window.record(0.01, now=1055)
+        self.assertEqual(window.snapshot(now=1055).count, 2)
+        self.assertEqual(window.snapshot(now=1065).count, 1)
+        self.assertAlmostEqual(window.snapshot(now=1065).percentile(0.99), 0.01)
+        self.assertEqual(window.snapshot(now=2000).count, 0)
+
+class TestSocketIOMetrics(unittest.TestCase):
+    def test_memory_does_not_grow_with_events(self):
+        """Concurrent tracking keeps counts exact and stores no payloads"""
+        metrics = SocketIOMetrics()
+
+        def worker():
+            for i in range(5000):
+                metrics.track_event('handle_compile_and_run', 0.001 * (i % 100 + 1),
+                                    {'args': 'x' * 10000})
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = metrics.get_stats()['average_event_timings']['handle_compile_and_run']
+        self.assertEqual(stats['count'], 20000)
+        self.assertEqual(stats['window']['count'], 20000)
+        self.assertLess(stats['p50'], stats['p95'])
+        self.assertLessEqual(stats['p99'], 0.1)
+        self.assertNotIn('xxxx', repr(vars(metrics)))
+
+    def test_prometheus_text(self):
+        metrics = SocketIOMetrics()
+        metrics.connection_opened()
+        metrics.track_event('handle_input', 0.02)
+        metrics.track_error('handle_input', ValueError('bad'))
+        text = metrics.prometheus_text()
+        self.assertIn('socketio_connections 1\n', text)
+        self.assertIn('socketio_event_errors_total{event="handle_input"} 1\n', text)
+        self.assertIn('socketio_event_duration_seconds_count{event="handle_input"} 1\n', text)
+        self.assertIn('socketio_event_duration_seconds{event="handle_input",quantile="0.99"}', text)
+        self.assertTrue(text.endswith('\n'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Warm host benchmark.
+Compares exec'ing a compiled program with handing it to a pre-started
+.NET host, measuring from launch until the program has exited.
+"""
+import os
+import pty
+import time
+import statistics
+import tempfile
+import logging
+from pathlib import Path
+from utils.compile_daemon import CompileDaemon
+from utils.sandbox import sandboxed_popen
+from utils.warm_host import WarmHostPool
+
+# Only enable debug logging when running tests directly
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RUNS = 5
+
+PROGRAM = """using System;
+using System.Collections.Generic;
+using System.Linq;
+class Program {
+    static int Main() {
+        Console.Write("Name? ");
+        string name = Console.ReadLine();
+        var scores = new List<double> { 72.5, 88, 91.25 };
+        Console.WriteLine($"Hello {name}, average {scores.Average():F2}, best {scores.Max()}");
+        return 3;
+    }
+}"""
+
+def read_all(master_fd: int) -> bytes:
+    os.set_blocking(master_fd, False)
+    output = b''
+    while True:
+        try:
+            data = os.read(master_fd, 4096)
+        except (BlockingIOError, OSError):
+            return output
+        if not data:
+            return output
+        output += data
+
+def run_on_pty(launch):
+    """Launch a program on a fresh PTY, answer its prompt and wait for exit"""
+    master_fd, slave_fd = pty.openpty()
+    try:
+        start = time.time()
+        process = launch(slave_fd)
+        os.write(master_fd, b'Ada\n')
+        process.wait(timeout=20)
+        elapsed = time.time() - start
+        return elapsed, process.returncode, read_all(master_fd).decode(errors='replace')
+    finally:
+        os.close(master_fd)
+        os.close(slave_fd)
+
+def wait_ready(pool: WarmHostPool, count: int):
+    deadline = time.time() + 30
+    while pool.get_stats()['ready'] < count and time.time() < deadline:
+        time.sleep(0.05)
+
+def test_warm_host_benchmark():
+    """Warm host runs the program with the same I/O and exit code, faster"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        daemon = CompileDaemon(work_dir=str(root / 'daemon'))
+        result = daemon.compile(PROGRAM, root / 'program')
+        assert result['success'], result.get('error')
+        assembly = result['assembly']
+
+        def exec_launch(slave_fd):
+            return sandboxed_popen(['dotnet', assembly], stdin=slave_fd, stdout=slave_fd,
+                                   stderr=slave_fd, close_fds=True, cwd=tmp)
+
+        pool = WarmHostPool(size=2, host_dir=str(root / 'host'))
+        pool.start()
+
+        def warm_launch(slave_fd):
+            host = pool.launch(assembly, os.ttyname(slave_fd), tmp)
+            assert host is not None, "No warm host available"
+            return host
+
+        exec_times, warm_times = [], []
+        try:
+            for _ in range(RUNS):
+                elapsed, code, output = run_on_pty(exec_launch)
+                exec_times.append(elapsed)
+                assert code == 3 and 'Hello Ada, average 83.92, best 91.25' in output, output
+
+                wait_ready(pool, 2)
+                elapsed, code, output = run_on_pty(warm_launch)
+                warm_times.append(elapsed)
+                assert code == 3 and 'Hello Ada, average 83.92, best 91.25' in output, output
+        finally:
+            pool.shutdown()
+
+    for name, times in (('exec', exec_times), ('warm host', warm_times)):
+        logger.info(f"{name}: p50 {statistics.median(times) * 1000:.0f}ms, "
+                    f"min {min(times) * 1000:.0f}ms, max {max(times) * 1000:.0f}ms")
+    assert statistics.median(warm_times) < statistics.median(exec_times)
+
+def test_warm_host_rejects_bad_assembly():
+    """A job the host cannot load is refused so the caller can fall back"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = WarmHostPool(size=1, host_dir=os.path.join(tmp, 'host'))
+        pool.start()
+        wait_ready(pool, 1)
+        master_fd, slave_fd = pty.openpty()
+        try:
+            assert pool.launch(os.path.join(tmp, 'missing.dll'), os.ttyname(slave_fd), tmp) is None
+            assert pool.get_stats()['fallbacks'] == 1
+        finally:
+            pool.shutdown()
+            os.close(master_fd)
+            os.close(slave_fd)
+
+if __name__ == "__main__":
+    test_warm_host_rejects_bad_assembly()
+    test_warm_host_benchmark()
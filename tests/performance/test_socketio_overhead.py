@@ -0,0 +1,64 @@
+"""
+Per-event overhead of the log_socket_event decorator.
+
+Compares the current decorator with the previous eager one, which
+stringified every payload and formatted every debug message, on a
+compile_and_run-sized payload with debug logging off and on.
+"""
+import logging
+import time
+from datetime import datetime
+from functools import wraps
+from unittest import mock
+from utils import socketio_logger
+from utils.socketio_logger import SocketIOMetrics, log_socket_event
+
+EVENTS = 20000
+PAYLOAD = {'code': 'Console.WriteLine("Hello");\n' * 800, 'language': 'csharp'}
+
+def eager_log_socket_event(func, logger, metrics):
+    """The decorator as it was before lazy logging"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        event_name = func.__name__
+        start_time = time.time()
+        context = {'args': str(args), 'kwargs': str(kwargs)}
+        logger.debug(f"Socket.IO event {event_name} started at {datetime.now()}")
+        logger.debug(f"Event context: {context}")
+        result = func(*args, **kwargs)
+        duration = time.time() - start_time
+        metrics.track_event(event_name, duration, context)
+        logger.debug(f"Socket.IO event {event_name} completed in {duration:.3f}s")
+        logger.debug(f"Event result: {result}")
+        return result
+    return wrapper
+
+def handle_compile_and_run(data):
+    return {'success': True, 'session_id': 'abc'}
+
+def per_event_us(handler) -> float:
+    start = time.perf_counter_ns()
+    for _ in range(EVENTS):
+        handler(PAYLOAD)
+    return (time.perf_counter_ns() - start) / EVENTS / 1000
+
+def measure(level: int):
+    logger = logging.getLogger(f'socketio_overhead_{level}')
+    logger.handlers = [logging.NullHandler()]
+    logger.propagate = False
+    logger.setLevel(level)
+    with mock.patch.object(socketio_logger, 'logger', logger), \
+            mock.patch.object(socketio_logger, 'metrics', SocketIOMetrics()):
+        baseline = per_event_us(handle_compile_and_run)
+        before = per_event_us(eager_log_socket_event(handle_compile_and_run, logger, SocketIOMetrics()))
+        after = per_event_us(log_socket_event(handle_compile_and_run))
+    return before - baseline, after - baseline
+
+def test_decorator_overhead():
+    for level in (logging.INFO, logging.DEBUG):
+        before, after = measure(level)
+        print(f"{logging.getLevelName(level)}: {before:.2f}us per event before, {after:.2f}us after")
+        assert after < before
+
+if __name__ == "__main__":
+    test_decorator_overhead()
@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy import event
+from database import db
+from models.student import Student, CodingActivity, StudentProgress
+from utils import curriculum_tree
+from utils.curriculum_checker import CurriculumChecker
+from utils.curriculum_importer import CurriculumImporter
+from utils import curriculum_snapshots
+
+DOCUMENT = """
+A1 Environnement
+A1.1 Composants
+A1.2 Systeme
+B1 Programmation
+B1.1 Variables
+B1.2 Boucles
+B2 Tests
+"""
+
+@pytest.fixture
+def checker(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(curriculum_tree, 'CURRICULUM_VERSION_FILE', str(tmp_path / 'curriculum.version'))
+    monkeypatch.setattr(curriculum_snapshots, 'SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    CurriculumImporter().import_curriculum(DOCUMENT, 'ICS3U')
+    return CurriculumChecker()
+
+@pytest.fixture
+def student(app, checker):
+    student = Student(username='coverage_student', password_hash='x')
+    activities = [
+        CodingActivity(title='Hardware', curriculum='ICS3U', sequence=1, curriculum_expectations=['A1']),
+        CodingActivity(title='Variables', curriculum='ICS3U', sequence=2, curriculum_expectations=['B1.1']),
+        CodingActivity(title='Loops', curriculum='ICS3U', sequence=3, curriculum_expectations=['B1.2', 'B2']),
+        CodingActivity(title='Review', curriculum='ICS3U', sequence=4, curriculum_expectations=['b1.1']),
+    ]
+    db.session.add_all([student, *activities])
+    db.session.commit()
+    db.session.add(StudentProgress(student_id=student.id, activity_id=activities[0].id, completed=True))
+    db.session.add(StudentProgress(student_id=student.id, activity_id=activities[1].id, completed=True))
+    db.session.add(StudentProgress(student_id=student.id, activity_id=activities[2].id, completed=False))
+    db.session.commit()
+    student.activity_ids = [a.id for a in activities]
+    return student
+
+def test_index_lookups(checker):
+    index = checker.get_index('ICS3U')
+    assert index.expectations['A1.2'].overall == 'A1'
+    assert [e.code for e in index.lookup('a1')] == ['A1', 'A1.1', 'A1.2']
+    assert [e.code for e in index.lookup('B')] == ['B1', 'B1.1', 'B1.2', 'B2']
+    # B2 has no specific expectations, so it is a leaf itself
+    assert index.leaves == ['A1.1', 'A1.2', 'B1.1', 'B1.2', 'B2']
+    assert checker.get_index('ICS4U') is None
+
+def test_validate_activity(checker):
+    result = checker.validate_activity({'curriculum_expectations': ['A1.1', 'b2', 'Z9']}, 'ICS3U')
+    assert not result['valid']
+    assert [m['code'] for m in result['matches']] == ['A1.1', 'B2']
+    assert result['errors'] == ['Invalid curriculum expectation code: Z9']
+    assert checker.validate_activity({'curriculum_expectations': []}, 'ICS9Z')['errors'] == \
+        ['Unsupported grade level: ICS9Z']
+
+def test_progress_uses_one_query(app, checker, student):
+    checker.get_index('ICS3U')
+    student_id = student.id
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    progress = checker.get_student_progress(student_id, 'ICS3U')
+    assert len(statements) == 1
+    assert progress['completed_expectations'] == ['A1.1', 'A1.2', 'B1.1']
+    assert progress['pending_expectations'] == ['B1.2', 'B2']
+    assert progress['progress_percentage'] == 60.0
+
+def test_suggestions_rank_by_pending_coverage(checker, student):
+    # Review only repeats B1.1, which is already covered
+    assert checker.suggest_next_activities(student.id, 'ICS3U') == [student.activity_ids[2]]
+
+def test_index_rebuilds_after_curriculum_change(checker):
+    assert 'C1' not in checker.get_index('ICS3U').expectations
+    CurriculumImporter().import_curriculum(DOCUMENT + 'C1 Societe\n', 'ICS3U')
+    assert 'C1' in checker.get_index('ICS3U').expectations
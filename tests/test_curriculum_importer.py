@@ -0,0 +1,92 @@
+import pytest
+from sqlalchemy import event
+from database import db
+from models.curriculum import Course, Strand, OverallExpectation, SpecificExpectation
+from utils import curriculum_snapshots, curriculum_tree
+from utils.curriculum_importer import CurriculumImporter
+
+DOCUMENT = """
+A1 Environnement de travail
+A1.1 Identifier les composants
+A1.2 Décrire le système d'exploitation
+B1 Concepts de programmation
+B1.1 Utiliser des variables
+B1.2 Utiliser des boucles
+B2.1 Sans parent
+"""
+
+@pytest.fixture
+def importer(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(curriculum_tree, 'CURRICULUM_VERSION_FILE', str(tmp_path / 'curriculum.version'))
+    monkeypatch.setattr(curriculum_snapshots, 'SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    return CurriculumImporter()
+
+def write_statements(app):
+    statements = []
+    def record(conn, cursor, statement, *args):
+        if statement.split()[0].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    return statements
+
+def test_import_inserts_each_level_in_one_statement(app, importer):
+    statements = write_statements(app)
+    stats = importer.import_curriculum(DOCUMENT, 'ICS3U')
+
+    assert stats['courses']['inserted'] == 1
+    assert stats['strands']['inserted'] == 2
+    assert stats['overall_expectations']['inserted'] == 2
+    assert stats['specific_expectations']['inserted'] == 4
+    assert len(statements) == 4
+    assert set(stats['timings']) == {'parse', 'load', 'write'}
+
+    specific = SpecificExpectation.query.filter_by(code='B1.2').one()
+    assert specific.description_fr == 'Utiliser des boucles'
+    assert specific.overall_expectation.strand.course.code == 'ICS3U'
+
+def test_reimporting_unchanged_course_writes_nothing(app, importer):
+    importer.import_curriculum(DOCUMENT, 'ICS3U')
+    statements = write_statements(app)
+
+    stats = importer.import_curriculum(DOCUMENT, 'ICS3U')
+    assert stats['changed'] is False
+    assert stats['specific_expectations']['unchanged'] == 4
+    assert statements == []
+
+def test_reimport_applies_only_the_differences(app, importer):
+    importer.import_curriculum(DOCUMENT, 'ICS3U')
+    # Translations added by the update scripts survive a re-import
+    SpecificExpectation.query.filter_by(code='A1.1').one().description_en = 'Identify components'
+    db.session.commit()
+
+    changed = DOCUMENT.replace('B1.2 Utiliser des boucles\n', 'B1.3 Utiliser des fonctions\n') \
+                      .replace('Utiliser des variables', 'Déclarer des variables')
+    stats = importer.import_curriculum(changed, 'ICS3U')
+
+    assert stats['specific_expectations'] == {'inserted': 1, 'updated': 1, 'unchanged': 2, 'deleted': 1}
+    assert stats['strands']['unchanged'] == 2
+    assert SpecificExpectation.query.filter_by(code='A1.1').one().description_en == 'Identify components'
+    assert SpecificExpectation.query.filter_by(code='B1.1').one().description_fr == 'Déclarer des variables'
+    assert SpecificExpectation.query.filter_by(code='B1.2').first() is None
+
+def test_bulk_import_removes_missing_branches(app, importer):
+    tree = {
+        'code': 'ICD2O', 'title_en': 'Digital Technology', 'title_fr': 'Technologies numériques',
+        'strands': {
+            code: {'title_en': f'Strand {code}', 'title_fr': f'Domaine {code}', 'overall': {
+                f'{code}1': {'description_en': 'Overall', 'description_fr': 'Globale', 'specifics': {
+                    f'{code}1.1': {'description_en': 'Specific', 'description_fr': 'Spécifique'}
+                }}
+            }}
+            for code in ('A', 'B')
+        }
+    }
+    importer.bulk_import(tree)
+    del tree['strands']['B']
+    stats = importer.bulk_import(tree)
+
+    assert stats['strands']['deleted'] == 1
+    assert stats['specific_expectations']['deleted'] == 1
+    assert Strand.query.count() == 1
+    assert OverallExpectation.query.count() == 1
+    assert curriculum_tree.load_course_tree('ICD2O')['en']['strands'][0]['title'] == 'Strand A'
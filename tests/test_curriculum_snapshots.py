@@ -0,0 +1,99 @@
+import gzip
+import json
+import os
+import pytest
+from sqlalchemy import event
+from database import db
+from models.curriculum import Course, Strand, OverallExpectation
+from routes.curriculum_routes import curriculum_bp
+from utils import curriculum_snapshots, curriculum_tree
+
+@pytest.fixture
+def snapshot_dir(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(curriculum_tree, 'CURRICULUM_VERSION_FILE', str(tmp_path / 'curriculum.version'))
+    monkeypatch.setattr(curriculum_snapshots, 'SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    monkeypatch.setattr(curriculum_snapshots.snapshot_store, 'directory', str(tmp_path / 'snapshots'))
+    curriculum_tree.curriculum_cache.clear()
+
+    course = Course(code='ICS3U', title_en='Computer Science', title_fr='Informatique')
+    db.session.add(course)
+    db.session.flush()
+    strand = Strand(course_id=course.id, code='A', title_en='Tools', title_fr='Outils')
+    db.session.add(strand)
+    db.session.flush()
+    db.session.add(OverallExpectation(strand_id=strand.id, code='A1',
+                                      description_en='Hardware', description_fr='Materiel'))
+    db.session.commit()
+    return str(tmp_path / 'snapshots')
+
+@pytest.fixture
+def client(app, snapshot_dir):
+    app.register_blueprint(curriculum_bp, url_prefix='/curriculum')
+    app.secret_key = 'test'
+    return app.test_client()
+
+def snapshot_url(lang):
+    name = curriculum_snapshots.snapshot_store.snapshot_name('ICS3U', lang)
+    return f'/curriculum/snapshots/{name}'
+
+def test_publish_writes_hashed_precompressed_files(snapshot_dir):
+    brotli = pytest.importorskip('brotli')
+    stats = curriculum_snapshots.publish_snapshots()
+    assert stats['courses'] == 1
+
+    manifest = json.load(open(os.path.join(snapshot_dir, 'manifest.json')))
+    name = manifest['courses'][0]['files']['fr']
+    assert curriculum_snapshots.SNAPSHOT_NAME.match(name)
+    body = open(os.path.join(snapshot_dir, name), 'rb').read()
+    assert json.loads(body)['title'] == 'Informatique'
+    assert gzip.decompress(open(os.path.join(snapshot_dir, name + '.gz'), 'rb').read()) == body
+    assert brotli.decompress(open(os.path.join(snapshot_dir, name + '.br'), 'rb').read()) == body
+
+    # Unchanged content keeps its name
+    curriculum_snapshots.publish_snapshots()
+    assert json.load(open(os.path.join(snapshot_dir, 'manifest.json')))['courses'][0]['files']['fr'] == name
+
+def test_snapshots_are_served_immutable_and_precompressed(client):
+    brotli = pytest.importorskip('brotli')
+    curriculum_snapshots.publish_snapshots()
+    url = snapshot_url('en')
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'br'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert json.loads(brotli.decompress(response.data))['title'] == 'Computer Science'
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert client.get(url).headers.get('Content-Encoding') is None
+    assert client.get('/curriculum/snapshots/..%2Fmanifest.json').status_code == 404
+
+def test_published_course_data_does_not_touch_the_database(app, client):
+    curriculum_snapshots.publish_snapshots()
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    response = client.get('/curriculum/get_course_data/ICS3U?lang=fr')
+    assert response.status_code == 200
+    assert response.get_json()['strands'][0]['title'] == 'Outils'
+    etag = response.headers['ETag']
+    assert client.get('/curriculum/get_course_data/ICS3U?lang=fr',
+                      headers={'If-None-Match': etag}).status_code == 304
+    assert statements == []
+
+def test_unpublished_change_falls_back_to_database(client):
+    curriculum_snapshots.publish_snapshots()
+    old_url = snapshot_url('en')
+
+    course = Course.query.filter_by(code='ICS3U').one()
+    course.title_en = 'Introduction to Computer Science'
+    db.session.commit()
+    assert curriculum_snapshots.snapshot_store.courses() is None
+    response = client.get('/curriculum/get_course_data/ICS3U')
+    assert response.get_json()['title'] == 'Introduction to Computer Science'
+
+    curriculum_snapshots.publish_snapshots()
+    assert snapshot_url('en') != old_url
+    # Pages rendered before the publish can still load the previous snapshot
+    assert client.get(old_url).status_code == 200
@@ -0,0 +1,102 @@
+import pytest
+from sqlalchemy import event, update
+from database import db
+from models.curriculum import Course, Strand, OverallExpectation, SpecificExpectation
+from routes.curriculum_routes import curriculum_bp
+from utils import curriculum_tree
+
+@pytest.fixture
+def course(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(curriculum_tree, 'CURRICULUM_VERSION_FILE', str(tmp_path / 'curriculum.version'))
+    curriculum_tree.curriculum_cache.clear()
+    course = Course(code='ICS3U', title_en='Computer Science', title_fr='Informatique')
+    db.session.add(course)
+    db.session.flush()
+    for strand_code in ('b', 'A'):
+        strand = Strand(course_id=course.id, code=strand_code,
+                        title_en=f'Strand {strand_code}', title_fr=f'Domaine {strand_code}')
+        db.session.add(strand)
+        db.session.flush()
+        overall = OverallExpectation(strand_id=strand.id, code=f'{strand_code.upper()}1',
+                                     description_en='Overall', description_fr='Globale')
+        db.session.add(overall)
+        db.session.flush()
+        for n in (2, 1):
+            db.session.add(SpecificExpectation(overall_expectation_id=overall.id,
+                                               code=f'{strand_code.upper()}1.{n}',
+                                               description_en=f'Specific {n}',
+                                               description_fr=f'Specifique {n}'))
+    db.session.commit()
+    return course
+
+@pytest.fixture
+def client(app, course):
+    app.register_blueprint(curriculum_bp)
+    app.secret_key = 'test'
+    return app.test_client()
+
+def count_queries(app):
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    return statements
+
+def test_tree_is_loaded_with_one_query_in_both_languages(app, course):
+    statements = count_queries(app)
+    trees = curriculum_tree.load_course_tree('ICS3U')
+    assert len(statements) == 1
+
+    en, fr = trees['en'], trees['fr']
+    assert en['title'] == 'Computer Science' and fr['title'] == 'Informatique'
+    assert [s['code'] for s in en['strands']] == ['A', 'B']
+    assert [s['title'] for s in fr['strands']] == ['Domaine A', 'Domaine b']
+    specifics = en['strands'][0]['overall_expectations'][0]['specific_expectations']
+    assert [s['code'] for s in specifics] == ['A1.1', 'A1.2']
+    assert curriculum_tree.load_course_tree('NOPE') is None
+
+def test_cache_serves_repeated_requests_without_queries(app, course):
+    cache = curriculum_tree.curriculum_cache
+    first = cache.get('ICS3U', 'fr')
+    statements = count_queries(app)
+    assert cache.get('ICS3U', 'fr') is first
+    assert cache.get('ICS3U', 'en').etag != first.etag
+    assert statements == []
+
+def test_route_answers_304_for_matching_etag(client):
+    response = client.get('/get_course_data/ICS3U?lang=fr')
+    assert response.status_code == 200
+    assert response.get_json()['title'] == 'Informatique'
+    etag = response.headers['ETag']
+
+    cached = client.get('/get_course_data/ICS3U?lang=fr', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert client.get('/get_course_data/NOPE').status_code == 404
+
+def test_commit_of_curriculum_change_invalidates_cache(client, course):
+    etag = client.get('/get_course_data/ICS3U').headers['ETag']
+
+    course.title_en = 'Introduction to Computer Science'
+    db.session.commit()
+    response = client.get('/get_course_data/ICS3U', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['title'] == 'Introduction to Computer Science'
+
+    etag = response.headers['ETag']
+    db.session.execute(update(Strand).where(Strand.code == 'A').values(title_en='Renamed'))
+    db.session.commit()
+    response = client.get('/get_course_data/ICS3U', headers={'If-None-Match': etag})
+    assert response.get_json()['strands'][0]['title'] == 'Renamed'
+
+def test_rollback_does_not_invalidate(app, course):
+    cache = curriculum_tree.curriculum_cache
+    first = cache.get('ICS3U', 'en')
+    course.title_en = 'Discarded'
+    db.session.flush()
+    db.session.rollback()
+    assert cache.get('ICS3U', 'en') is first
+
+def test_unknown_codes_are_not_cached(app, course):
+    cache = curriculum_tree.curriculum_cache
+    for n in range(3):
+        assert cache.get(f'NOPE{n}', 'en') is None
+    assert cache.get('ICS3U', 'en') is not None
+    assert set(code for code, _ in cache._entries) == {'ICS3U'}
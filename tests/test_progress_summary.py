@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event, insert
+from database import db
+from models.student import ActivityProgressSummary, CodeSubmission, CodingActivity, Student
+from utils.progress_summary import class_grid, rebuild_progress_summaries, record_submissions, student_summary
+
+START = datetime(2026, 1, 5, 9, 0)
+
+@pytest.fixture
+def classroom(app):
+    students = [Student(username=f'student{i:02d}', password_hash='x') for i in range(3)]
+    admin = Student(username='teacher', password_hash='x', is_admin=True)
+    activities = [CodingActivity(title=f'Activity {i}', curriculum='ICS3U', sequence=i) for i in range(2)]
+    other = CodingActivity(title='Other course', curriculum='ICD2O')
+    db.session.add_all([*students, admin, *activities, other])
+    db.session.commit()
+    return students, activities
+
+def submission(student, activity, minutes, success):
+    return {'student_id': student.id, 'activity_id': activity.id, 'code': 'x', 'language': 'cpp',
+            'success': success, 'created_at': START + timedelta(minutes=minutes)}
+
+def bulk_insert(rows):
+    """What the submission sink does for each batch"""
+    db.session.execute(insert(CodeSubmission).values(rows))
+    record_submissions(db.session.connection(), rows)
+    db.session.commit()
+
+def test_batches_fold_into_one_row_per_pair(classroom):
+    (alice, bob, _), (first, _) = classroom
+    bulk_insert([submission(alice, first, 5, False), submission(alice, first, 1, False),
+                 submission(alice, first, 3, True), submission(bob, first, 2, True)])
+    bulk_insert([submission(alice, first, 10, False), submission(alice, first, 0, True)])
+
+    summary = db.session.get(ActivityProgressSummary, (alice.id, first.id))
+    assert (summary.attempts, summary.successes) == (5, 2)
+    assert summary.first_submission_at == START
+    assert summary.first_success_at == START
+    assert summary.last_submission_at == START + timedelta(minutes=10)
+    assert summary.last_success is False
+    assert summary.pass_rate == pytest.approx(2 / 5)
+    assert ActivityProgressSummary.query.count() == 2
+
+def test_session_inserts_update_the_summary(classroom):
+    (alice, _, _), (first, _) = classroom
+    db.session.add(CodeSubmission(student_id=alice.id, activity_id=first.id, code='x', language='cpp',
+                                  success=True))
+    db.session.commit()
+    summary = db.session.get(ActivityProgressSummary, (alice.id, first.id))
+    assert (summary.attempts, summary.successes, summary.last_success) == (1, 1, True)
+
+def test_rebuild_matches_incremental_totals(classroom):
+    (alice, bob, _), (first, second) = classroom
+    bulk_insert([submission(alice, first, i, i % 3 == 0) for i in range(7)] +
+                [submission(bob, second, i, False) for i in range(2)])
+    incremental = {(s.student_id, s.activity_id): (s.attempts, s.successes, s.first_success_at,
+                                                   s.last_submission_at, s.last_success)
+                   for s in ActivityProgressSummary.query.all()}
+
+    assert rebuild_progress_summaries() == 2
+    db.session.expire_all()
+    rebuilt = {(s.student_id, s.activity_id): (s.attempts, s.successes, s.first_success_at,
+                                               s.last_submission_at, s.last_success)
+               for s in ActivityProgressSummary.query.all()}
+    assert rebuilt == incremental
+
+def test_class_grid_is_one_query(app, classroom):
+    (alice, bob, carol), (first, second) = classroom
+    bulk_insert([submission(alice, first, 1, True), submission(bob, second, 2, False)])
+    statements = []
+    event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    grid = class_grid('ICS3U')
+    assert len(statements) == 1
+    assert [s['username'] for s in grid['students']] == ['student00', 'student01', 'student02']
+    assert [a['title'] for a in grid['activities']] == ['Activity 0', 'Activity 1']
+    assert len(grid['cells']) == 2
+    cell = grid['cells'][0]
+    assert cell['attempts'] == 1 and cell['pass_rate'] == 1.0 and cell['last_success'] is True
+
+def test_student_summary(classroom):
+    (alice, _, _), (first, second) = classroom
+    bulk_insert([submission(alice, second, 1, False), submission(alice, first, 2, True)])
+    assert [row['title'] for row in student_summary(alice.id)] == ['Activity 0', 'Activity 1']
@@ -0,0 +1,78 @@
+import shutil
+import pytest
+from unittest import mock
+from database import db
+from models.student import Student, CodingActivity, CodeSubmission
+from utils import regrade
+from utils.compile_scheduler import get_compile_scheduler
+
+pytestmark = pytest.mark.skipif(not (shutil.which('g++') or shutil.which('clang++')),
+                                reason="No C++ compiler installed")
+
+CORRECT = '#include <iostream>\nint main() { int a, b; std::cin >> a >> b; std::cout << a + b; }\n'
+WRONG = '#include <iostream>\nint main() { int a, b; std::cin >> a >> b; std::cout << a - b; }\n'
+BROKEN = 'int main() { return x; }\n'
+
+@pytest.fixture
+def activity(app):
+    student = Student(username='regrade_student', password_hash='x')
+    activity = CodingActivity(title='Sum', language='cpp', test_cases=[
+        {'input': '1 2', 'expected_output': '3'},
+        {'input': '5 5', 'expected_output': '10'},
+    ])
+    db.session.add_all([student, activity])
+    db.session.commit()
+    for i in range(30):
+        db.session.add(CodeSubmission(student_id=student.id, activity_id=activity.id,
+                                      code=[CORRECT, WRONG, BROKEN][i % 3], language='cpp'))
+    db.session.commit()
+    return activity
+
+def test_regrade_grades_each_distinct_program_once(activity, tmp_path):
+    """Thirty submissions of three programs cost three gradings"""
+    job = regrade.RegradeJob(activity.id, batch_size=7, workers=2, checkpoint_dir=str(tmp_path))
+    completed = get_compile_scheduler().get_stats()['completed']
+    with mock.patch.object(regrade, 'grade_submission', wraps=regrade.grade_submission) as grade:
+        status = job.run()
+    # Every grading was admitted through the shared compile scheduler
+    assert get_compile_scheduler().get_stats()['completed'] - completed == 3
+
+    assert status['status'] == 'completed'
+    assert status['processed'] == 30
+    assert grade.call_count == 3
+    assert status['passed'] == 10
+
+    submissions = CodeSubmission.query.order_by(CodeSubmission.id).all()
+    assert [s.success for s in submissions[:3]] == [True, False, False]
+    assert submissions[0].output == 'Passed 2/2 test cases'
+    assert 'error' in submissions[2].error
+    # A finished regrade leaves no checkpoint behind
+    assert not list(tmp_path.iterdir())
+
+def test_regrade_resumes_from_checkpoint(activity, tmp_path):
+    """An interrupted regrade picks up after the last committed batch"""
+    job = regrade.RegradeJob(activity.id, batch_size=10, workers=2, checkpoint_dir=str(tmp_path))
+    commit = db.session.commit
+    committed = []
+
+    def commit_then_fail():
+        committed.append(True)
+        if len(committed) == 2:
+            raise RuntimeError('interrupted')
+        commit()
+
+    with mock.patch.object(db.session, 'commit', side_effect=commit_then_fail):
+        assert job.run()['status'] == 'failed'
+    assert job.last_id > 0
+    # The checkpoint keeps counters only; graded programs are in the sidecar
+    with open(job.checkpoint_path) as f:
+        assert 'results' not in f.read()
+    assert len(job._load_results()) == 3
+
+    resumed = regrade.RegradeJob(activity.id, batch_size=10, workers=2, checkpoint_dir=str(tmp_path))
+    with mock.patch.object(regrade, 'grade_submission', wraps=regrade.grade_submission) as grade:
+        status = resumed.run()
+    assert status['status'] == 'completed'
+    assert status['processed'] == 30
+    # Programs graded before the interruption come from the checkpoint
+    assert grade.call_count == 0
@@ -0,0 +1,42 @@
+from database import db
+from models.student import Student, CodingActivity, CodeSubmission
+from utils.submission_sink import SubmissionSink
+
+def make_rows(app):
+    student = Student(username='sink_student', password_hash='x')
+    activity = CodingActivity(title='Sink')
+    db.session.add_all([student, activity])
+    db.session.commit()
+    return {'student_id': student.id, 'activity_id': activity.id, 'language': 'cpp', 'success': True}
+
+def test_rows_are_inserted_in_batches(app):
+    """Queued submissions are written with a few multi-row inserts"""
+    row = make_rows(app)
+    sink = SubmissionSink(app, flush_interval_ms=50, batch_rows=100)
+    sink.start()
+    try:
+        for i in range(250):
+            assert sink.submit(code=f'// {i}', output=str(i), **row)
+        assert sink.flush(timeout=10)
+    finally:
+        sink.shutdown()
+
+    db.session.expire_all()
+    assert CodeSubmission.query.count() == 250
+    stats = sink.get_stats()
+    assert stats['written'] == 250
+    assert stats['batches'] <= 10
+    assert stats['dropped'] == 0
+
+def test_full_queue_drops_and_shutdown_flushes(app):
+    """Overflow is counted, and rows still queued are written on shutdown"""
+    row = make_rows(app)
+    sink = SubmissionSink(app, max_queue=3)
+    accepted = [sink.submit(code=f'// {i}', **row) for i in range(5)]
+    assert accepted == [True, True, True, False, False]
+    assert sink.get_stats()['dropped'] == 2
+
+    sink.shutdown()
+    db.session.expire_all()
+    assert CodeSubmission.query.count() == 3
+    assert sink.get_stats()['written'] == 3
@@ -1,5 +1,10 @@
 import os
+import re
+import shutil
+import hashlib
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import subprocess
 from flask import current_app
@@ -8,10 +13,26 @@ import json
 
 logger = logging.getLogger(__name__)
 
+# Backups are pg_dump directory-format dumps: one compressed file per table,
+# dumped and restored by BACKUP_JOBS parallel workers
+BACKUP_JOBS = int(os.environ.get('BACKUP_JOBS', min(os.cpu_count() or 2, 8)))
+BACKUP_COMPRESSION = os.environ.get('BACKUP_COMPRESSION', 'zstd')  # 'zstd' or 'gzip'
+BACKUP_COMPRESSION_LEVEL = int(os.environ.get('BACKUP_COMPRESSION_LEVEL', 3))
+BACKUPS_TO_KEEP = 5
+MANIFEST_FILE = 'MANIFEST.json'
+CHUNK_SIZE = 1024 * 1024
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 class DatabaseBackup:
-    def __init__(self, db_url=None):
+    def __init__(self, db_url=None, backup_dir=None):
         self.db_url = db_url or os.environ.get('DATABASE_URL')
-        self.backup_dir = os.path.join(os.getcwd(), 'backups')
+        self.backup_dir = backup_dir or os.path.join(os.getcwd(), 'backups')
         self.history_file = os.path.join(self.backup_dir, 'backup_history.json')
         if not os.path.exists(self.backup_dir):
             os.makedirs(self.backup_dir)
@@ -23,7 +44,7 @@ class DatabaseBackup:
             with open(self.history_file, 'w') as f:
                 json.dump({"backups": [], "version": 1}, f)
 
-    def _log_backup_event(self, backup_file, success, error=None):
+    def _log_backup_event(self, backup_file, success, error=None, **details):
         """Log backup event to history file"""
         try:
             with open(self.history_file, 'r') as f:
@@ -34,7 +55,8 @@ class DatabaseBackup:
                 "file": os.path.basename(backup_file),
                 "success": success,
                 "error": error,
-                "version": history.get("version", 1) + 1
+                "version": history.get("version", 1) + 1,
+                **details
             }
 
             history["backups"].append(backup_event)
@@ -48,61 +70,186 @@ class DatabaseBackup:
             logger.error(f"Failed to log backup event: {str(e)}")
             return None
 
-    def create_backup(self):
-        """Create a backup of the database"""
-        try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_file = os.path.join(self.backup_dir, f'backup_{timestamp}.sql')
+    def _pg_env(self, db_params):
+        env = os.environ.copy()
+        env['PGPASSWORD'] = db_params['password']
+        env['PGSSLMODE'] = db_params.get('sslmode', 'require')
+        return env
+
+    def _connection_args(self, db_params):
+        return [
+            '-h', db_params['host'],
+            '-p', db_params['port'],
+            '-U', db_params['user'],
+            '-d', db_params['dbname'],
+            '--no-password'
+        ]
 
-            # Parse database URL
+    def _compression_args(self, compression):
+        """--compress for this pg_dump; zstd needs pg_dump 16, older ones fall back to gzip"""
+        if compression == 'zstd':
+            version = subprocess.run(['pg_dump', '--version'], capture_output=True, text=True).stdout
+            match = re.search(r'(\d+)\.', version)
+            if match and int(match.group(1)) >= 16:
+                return [f'--compress=zstd:{BACKUP_COMPRESSION_LEVEL}'], 'zstd'
+            logger.warning(f"pg_dump {version.strip()} has no zstd support, using gzip")
+        return [f'--compress={min(BACKUP_COMPRESSION_LEVEL, 9)}'], 'gzip'
+
+    def _write_manifest(self, backup_path, jobs):
+        """Checksum every file of a dump directory and store the manifest next to it"""
+        files = sorted(
+            os.path.relpath(os.path.join(root, name), backup_path)
+            for root, _, names in os.walk(backup_path)
+            for name in names if name != MANIFEST_FILE
+        )
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            checksums = list(executor.map(lambda f: _sha256(os.path.join(backup_path, f)), files))
+        manifest = {
+            name: {'size': os.path.getsize(os.path.join(backup_path, name)), 'sha256': checksum}
+            for name, checksum in zip(files, checksums)
+        }
+        with open(os.path.join(backup_path, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        manifest_digest = _sha256(os.path.join(backup_path, MANIFEST_FILE))
+        return manifest, manifest_digest
+
+    def create_backup(self, jobs=None, compression=None):
+        """Create a parallel, compressed directory-format backup of the database"""
+        jobs = jobs or BACKUP_JOBS
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        backup_path = os.path.join(self.backup_dir, f'backup_{timestamp}')
+        try:
             db_params = self._parse_db_url()
+            compression_args, compression = self._compression_args(compression or BACKUP_COMPRESSION)
 
-            # Create backup using pg_dump with SSL mode
             command = [
                 'pg_dump',
-                '-h', db_params['host'],
-                '-p', db_params['port'],
-                '-U', db_params['user'],
-                '-d', db_params['dbname'],
+                *self._connection_args(db_params),
+                '--format=directory',
+                f'--jobs={jobs}',
+                *compression_args,
                 '--no-owner',  # Exclude ownership commands
                 '--no-acl',    # Exclude access privileges
-                '-f', backup_file
+                '-f', backup_path
             ]
 
-            # Add SSL mode options for secure connections
-            if db_params.get('sslmode') == 'require':
-                command.extend(['--no-password'])
-                os.environ['PGSSLMODE'] = 'require'
-
-            env = os.environ.copy()
-            env['PGPASSWORD'] = db_params['password']
-
-            logger.info(f"Starting database backup to {backup_file}")
-            result = subprocess.run(
+            logger.info(f"Starting database backup to {backup_path} with {jobs} jobs")
+            start = time.time()
+            subprocess.run(
                 command,
-                env=env,
+                env=self._pg_env(db_params),
                 check=True,
                 capture_output=True,
                 text=True
             )
-            logger.info(f"Database backup created successfully: {backup_file}")
+            dump_time = time.time() - start
+            manifest, manifest_digest = self._write_manifest(backup_path, jobs)
+            size = sum(entry['size'] for entry in manifest.values())
+            logger.info(f"Database backup created in {dump_time:.1f}s: {backup_path} "
+                        f"({len(manifest)} files, {size} bytes)")
 
-            # Log successful backup
-            version = self._log_backup_event(backup_file, True)
+            version = self._log_backup_event(
+                backup_path, True,
+                format='directory',
+                compression=compression,
+                jobs=jobs,
+                files=len(manifest),
+                size=size,
+                manifest_sha256=manifest_digest,
+                duration=round(dump_time, 2)
+            )
 
-            # Keep only last 5 backups
             self._cleanup_old_backups()
 
-            return True, f"Backup created successfully (version {version}): {backup_file}"
+            return True, f"Backup created successfully (version {version}): {backup_path}"
         except subprocess.CalledProcessError as e:
             error_msg = f"pg_dump error: {e.stderr}"
             logger.error(error_msg)
-            self._log_backup_event(backup_file, False, error_msg)
+            shutil.rmtree(backup_path, ignore_errors=True)
+            self._log_backup_event(backup_path, False, error_msg)
             return False, error_msg
         except Exception as e:
             error_msg = f"Backup creation failed: {str(e)}"
             logger.error(error_msg)
-            self._log_backup_event(backup_file, False, error_msg)
+            shutil.rmtree(backup_path, ignore_errors=True)
+            self._log_backup_event(backup_path, False, error_msg)
+            return False, error_msg
+
+    def _backup_path(self, name):
+        return os.path.join(self.backup_dir, os.path.basename(name))
+
+    def verify_backup(self, name):
+        """Check a backup's files against its manifest and history entry, then its table of contents"""
+        backup_path = self._backup_path(name)
+        manifest_path = os.path.join(backup_path, MANIFEST_FILE)
+        if not os.path.isfile(manifest_path):
+            return False, f"No manifest in {backup_path}"
+
+        recorded = next((b for b in reversed(self.get_backup_history().get('backups', []))
+                         if b.get('file') == os.path.basename(backup_path) and b.get('success')), None)
+        if recorded and recorded.get('manifest_sha256') and recorded['manifest_sha256'] != _sha256(manifest_path):
+            return False, "Manifest does not match backup history"
+
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        problems = []
+        for relative, entry in manifest.items():
+            path = os.path.join(backup_path, relative)
+            if not os.path.isfile(path):
+                problems.append(f"{relative}: missing")
+            elif os.path.getsize(path) != entry['size']:
+                problems.append(f"{relative}: size {os.path.getsize(path)} != {entry['size']}")
+        if not problems:
+            with ThreadPoolExecutor(max_workers=BACKUP_JOBS) as executor:
+                names = list(manifest)
+                checksums = executor.map(lambda f: _sha256(os.path.join(backup_path, f)), names)
+                problems = [f"{n}: checksum mismatch" for n, c in zip(names, checksums)
+                            if c != manifest[n]['sha256']]
+        if problems:
+            logger.error(f"Backup {backup_path} failed verification: {problems}")
+            return False, f"Backup is corrupt: {', '.join(problems[:10])}"
+
+        # The archive's table of contents must also be readable by pg_restore
+        if shutil.which('pg_restore'):
+            result = subprocess.run(['pg_restore', '--list', backup_path], capture_output=True, text=True)
+            if result.returncode != 0:
+                return False, f"pg_restore cannot read backup: {result.stderr.strip()}"
+        else:
+            logger.warning("pg_restore not installed, skipping table of contents check")
+
+        return True, f"Backup verified: {len(manifest)} files"
+
+    def restore_backup(self, name, jobs=None, clean=True):
+        """Verify a backup, then restore it into the database with parallel pg_restore"""
+        backup_path = self._backup_path(name)
+        verified, message = self.verify_backup(name)
+        if not verified:
+            return False, message
+
+        try:
+            db_params = self._parse_db_url()
+            command = [
+                'pg_restore',
+                *self._connection_args(db_params),
+                '--format=directory',
+                f'--jobs={jobs or BACKUP_JOBS}',
+                '--no-owner',
+                '--no-acl',
+                *(['--clean', '--if-exists'] if clean else []),
+                backup_path
+            ]
+            logger.info(f"Restoring database from {backup_path}")
+            start = time.time()
+            subprocess.run(command, env=self._pg_env(db_params), check=True, capture_output=True, text=True)
+            logger.info(f"Database restored from {backup_path} in {time.time() - start:.1f}s")
+            return True, f"Restored {backup_path}"
+        except subprocess.CalledProcessError as e:
+            error_msg = f"pg_restore error: {e.stderr}"
+            logger.error(error_msg)
+            return False, error_msg
+        except Exception as e:
+            error_msg = f"Restore failed: {str(e)}"
+            logger.error(error_msg)
             return False, error_msg
 
     def _parse_db_url(self):
@@ -159,17 +306,21 @@ class DatabaseBackup:
             raise
 
     def _cleanup_old_backups(self):
-        """Keep only the 5 most recent backups"""
+        """Keep only the most recent backups, directory dumps and legacy .sql files alike"""
         try:
             backups = sorted(
-                [f for f in os.listdir(self.backup_dir) if f.startswith('backup_') and f.endswith('.sql')],
+                [f for f in os.listdir(self.backup_dir) if f.startswith('backup_')
+                 and (f.endswith('.sql') or os.path.isdir(os.path.join(self.backup_dir, f)))],
+                key=lambda f: f[len('backup_'):].replace('.sql', ''),
                 reverse=True
             )
 
-            # Remove old backups keeping only the last 5
-            for old_backup in backups[5:]:
+            for old_backup in backups[BACKUPS_TO_KEEP:]:
                 backup_path = os.path.join(self.backup_dir, old_backup)
-                os.remove(backup_path)
+                if os.path.isdir(backup_path):
+                    shutil.rmtree(backup_path)
+                else:
+                    os.remove(backup_path)
                 logger.info(f"Removed old backup: {old_backup}")
         except Exception as e:
             logger.error(f"Cleanup of old backups failed: {str(e)}")
@@ -0,0 +1,174 @@
+"""
+Content-addressed cache for compiled C# build output.
+
+Entries are keyed by the SHA-256 of the source, the project file and a
+fingerprint of the installed toolchain, so identical programs built by
+the same SDK skip MSBuild entirely.
+"""
+import hashlib
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import uuid
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get('COMPILER_CACHE_DIR', '/tmp/compiler_cache')
+CACHE_SIZE_LIMIT = 1024 * 1024 * 1024  # 1 GB
+CLEANUP_EVERY_N_STORES = 20
+
+class BuildCache:
+    """Shares built program output between compiler backends"""
+
+    def __init__(self, cache_dir: str = CACHE_DIR, size_limit: int = CACHE_SIZE_LIMIT):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.size_limit = size_limit
+        self._lock = Lock()
+        self._fingerprint: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def toolchain_fingerprint(self) -> str:
+        """Identify the SDK that produced an entry, computed once per process"""
+        if self._fingerprint is None:
+            try:
+                version = subprocess.run(
+                    ['dotnet', '--version'],
+                    capture_output=True,
+                    text=True,
+                    timeout=10
+                ).stdout.strip()
+            except Exception as e:
+                logger.warning(f"Could not determine dotnet version: {e}")
+                version = 'unknown'
+            self._fingerprint = '|'.join([
+                version,
+                os.environ.get('DOTNET_ROOT', ''),
+                platform.machine()
+            ])
+            logger.debug(f"Toolchain fingerprint: {self._fingerprint}")
+        return self._fingerprint
+
+    def get_key(self, code: str, project: str = '') -> str:
+        """Generate the cache key for a source file and its project file"""
+        digest = hashlib.sha256()
+        for part in (self.toolchain_fingerprint(), project, code):
+            digest.update(part.encode())
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """Return the cached output directory for a key, if present"""
+        entry = self.cache_dir / key
+        if not entry.is_dir():
+            self.misses += 1
+            return None
+        try:
+            os.utime(entry)  # Mark as recently used for eviction
+        except OSError:
+            pass
+        self.hits += 1
+        logger.debug(f"Build cache hit: {key[:12]}")
+        return entry
+
+    def restore(self, key: str, dest_dir: Path) -> bool:
+        """Materialize a cached entry into dest_dir, hard-linking where possible"""
+        entry = self.lookup(key)
+        if entry is None:
+            return False
+        try:
+            dest_dir = Path(dest_dir)
+            for src in entry.rglob('*'):
+                target = dest_dir / src.relative_to(entry)
+                if src.is_dir():
+                    target.mkdir(parents=True, exist_ok=True)
+                    continue
+                target.parent.mkdir(parents=True, exist_ok=True)
+                if target.exists():
+                    target.unlink()
+                try:
+                    os.link(src, target)
+                except OSError:
+                    shutil.copy2(src, target)
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to restore cache entry {key[:12]}: {e}")
+            return False
+
+    def store(self, key: str, output_dir: Path) -> Optional[Path]:
+        """Copy a successful build output into the cache atomically"""
+        entry = self.cache_dir / key
+        if entry.is_dir():
+            return entry
+
+        staging = self.cache_dir / f".{key}.{uuid.uuid4().hex}"
+        try:
+            shutil.copytree(output_dir, staging)
+            try:
+                os.rename(staging, entry)
+            except OSError:
+                # Another worker stored the same key first
+                shutil.rmtree(staging, ignore_errors=True)
+            self.stores += 1
+            logger.debug(f"Stored build output in cache: {key[:12]}")
+        except Exception as e:
+            logger.warning(f"Failed to store build output for {key[:12]}: {e}")
+            shutil.rmtree(staging, ignore_errors=True)
+            return None
+
+        if self.stores % CLEANUP_EVERY_N_STORES == 0:
+            self.cleanup()
+        return entry if entry.is_dir() else None
+
+    def cleanup(self):
+        """Remove least recently used entries when the size limit is exceeded"""
+        try:
+            with self._lock:
+                total_size = 0
+                cache_entries = []
+
+                for entry in self.cache_dir.iterdir():
+                    if not entry.is_dir() or entry.name.startswith('.'):
+                        continue
+                    try:
+                        size = sum(f.stat().st_size for f in entry.rglob('*') if f.is_file())
+                        cache_entries.append((entry, size, entry.stat().st_mtime))
+                        total_size += size
+                    except OSError as e:
+                        logger.warning(f"Error processing cache entry {entry}: {e}")
+
+                if total_size <= self.size_limit:
+                    return
+
+                # Oldest access first
+                cache_entries.sort(key=lambda x: x[2])
+                for entry_path, entry_size, _ in cache_entries:
+                    if total_size <= self.size_limit:
+                        break
+                    try:
+                        shutil.rmtree(str(entry_path))
+                        total_size -= entry_size
+                    except OSError as e:
+                        logger.warning(f"Failed to remove cache entry {entry_path}: {e}")
+        except Exception as e:
+            logger.warning(f"Cache cleanup failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+# Global build cache instance
+build_cache = BuildCache()
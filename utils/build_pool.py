@@ -0,0 +1,297 @@
+"""
+Pool of warm dotnet build workers.
+
+Each worker owns a stable DOTNET_CLI_HOME and builds with MSBuild node
+reuse and the shared Roslyn compiler server enabled, so the compiler
+processes stay resident between jobs instead of cold-starting per run.
+Jobs reach the workers through a bounded in-process queue.
+"""
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Outside compiler_workspace, whose idle directories ResourceMonitor deletes
+BUILD_POOL_DIR = os.path.join(os.getcwd(), 'instance', 'build_workers')
+BUILD_POOL_SIZE = int(os.environ.get('BUILD_POOL_SIZE', min(os.cpu_count() or 2, 4)))
+BUILD_QUEUE_SIZE = int(os.environ.get('BUILD_QUEUE_SIZE', 32))
+RECYCLE_AFTER_BUILDS = 200
+HEALTH_CHECK_INTERVAL = 300  # seconds between idle health checks
+WARMUP_TIMEOUT = 120
+UNHEALTHY_RETRY_DELAY = 30  # seconds before recycling a worker whose warmup failed
+
+WARMUP_CODE = """using System;
+class Program {
+    static void Main() {
+        Console.WriteLine("warm");
+    }
+}"""
+
+WARMUP_PROJECT = """<Project Sdk="Microsoft.NET.Sdk">
+  <PropertyGroup>
+    <OutputType>Exe</OutputType>
+    <TargetFramework>net7.0</TargetFramework>
+    <RuntimeIdentifier>linux-x64</RuntimeIdentifier>
+    <SelfContained>false</SelfContained>
+  </PropertyGroup>
+</Project>"""
+
+class BuildQueueFull(Exception):
+    """Raised when the build queue cannot accept more jobs"""
+    pass
+
+class BuildWorker:
+    """A build slot whose dotnet build server survives between jobs"""
+
+    def __init__(self, worker_id: int, base_dir: str = BUILD_POOL_DIR):
+        self.worker_id = worker_id
+        self.home = Path(base_dir) / f"worker_{worker_id}"
+        self.home.mkdir(parents=True, exist_ok=True)
+        self.builds_done = 0
+        self.healthy = False
+        self.last_health_check = 0.0
+
+    @property
+    def env(self) -> Dict[str, str]:
+        """Environment shared by every build this worker runs"""
+        env = {
+            **os.environ,
+            'DOTNET_CLI_HOME': str(self.home),
+            'DOTNET_NOLOGO': 'true',
+            'DOTNET_CLI_TELEMETRY_OPTOUT': 'true',
+            'DOTNET_SKIP_FIRST_TIME_EXPERIENCE': 'true',
+        }
+        env.pop('MSBUILDDISABLENODEREUSE', None)
+        return env
+
+    def build(self, project_file: str, cwd: str, timeout: float,
+              configuration: str = 'Release') -> subprocess.CompletedProcess:
+        """Run dotnet build against the resident build server"""
+        result = subprocess.run(
+            ['dotnet', 'build', str(project_file), '--nologo', '-c', configuration,
+             '/nodeReuse:true',
+             '/p:UseSharedCompilation=true',
+             '/p:GenerateFullPaths=true',
+             '/consoleloggerparameters:NoSummary'],
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+            cwd=cwd,
+            env=self.env
+        )
+        self.builds_done += 1
+        return result
+
+    def warm(self) -> bool:
+        """Build a trivial program so the compiler server is resident"""
+        warmup_dir = self.home / 'warmup'
+        warmup_dir.mkdir(parents=True, exist_ok=True)
+        (warmup_dir / 'Program.cs').write_text(WARMUP_CODE)
+        project_file = warmup_dir / 'warmup.csproj'
+        project_file.write_text(WARMUP_PROJECT)
+
+        start = time.time()
+        try:
+            result = self.build(str(project_file), str(warmup_dir), WARMUP_TIMEOUT)
+            self.healthy = result.returncode == 0
+            if not self.healthy:
+                logger.error(f"[BuildWorker {self.worker_id}] Warmup build failed: {result.stderr}")
+        except Exception as e:
+            logger.error(f"[BuildWorker {self.worker_id}] Warmup failed: {e}")
+            self.healthy = False
+
+        self.last_health_check = time.time()
+        logger.info(f"[BuildWorker {self.worker_id}] Warmup finished in {time.time() - start:.2f}s, "
+                    f"healthy={self.healthy}")
+        return self.healthy
+
+    def needs_recycle(self, recycle_after: int) -> bool:
+        return not self.healthy or self.builds_done >= recycle_after
+
+    def recycle(self) -> bool:
+        """Stop this worker's build servers and warm up fresh ones"""
+        logger.info(f"[BuildWorker {self.worker_id}] Recycling after {self.builds_done} builds")
+        try:
+            subprocess.run(
+                ['dotnet', 'build-server', 'shutdown'],
+                capture_output=True,
+                text=True,
+                timeout=30,
+                env=self.env
+            )
+        except Exception as e:
+            logger.warning(f"[BuildWorker {self.worker_id}] Error shutting down build server: {e}")
+        shutil.rmtree(self.home / 'warmup', ignore_errors=True)
+        self.builds_done = 0
+        return self.warm()
+
+class BuildPool:
+    """Dispatches build jobs from a bounded queue to warm workers"""
+
+    def __init__(self, size: int = BUILD_POOL_SIZE, max_queue: int = BUILD_QUEUE_SIZE,
+                 recycle_after: int = RECYCLE_AFTER_BUILDS, base_dir: str = BUILD_POOL_DIR):
+        self.size = size
+        self.recycle_after = recycle_after
+        self.base_dir = base_dir
+        self.jobs: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.workers: List[BuildWorker] = []
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._started = False
+        self.completed = 0
+        self.rejected = 0
+
+    def start(self):
+        """Create the workers and start warming them in the background"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self._stopping.clear()
+            for worker_id in range(self.size):
+                worker = BuildWorker(worker_id, self.base_dir)
+                thread = threading.Thread(
+                    target=self._run_worker,
+                    args=(worker,),
+                    name=f"build-worker-{worker_id}",
+                    daemon=True
+                )
+                self.workers.append(worker)
+                self._threads.append(thread)
+                thread.start()
+            logger.info(f"Build pool started with {self.size} workers")
+
+    def _run_worker(self, worker: BuildWorker):
+        worker.warm()
+        while True:
+            if not worker.healthy:
+                # Never hand a job to a worker that failed its warmup
+                if self._stopping.wait(UNHEALTHY_RETRY_DELAY):
+                    return
+                worker.recycle()
+                continue
+
+            try:
+                job = self.jobs.get(timeout=HEALTH_CHECK_INTERVAL)
+            except queue.Empty:
+                # Idle: a warmup build doubles as the health check
+                if time.time() - worker.last_health_check >= HEALTH_CHECK_INTERVAL:
+                    worker.warm()
+                if worker.needs_recycle(self.recycle_after):
+                    worker.recycle()
+                continue
+
+            if job is None:
+                self.jobs.task_done()
+                return
+
+            future, args = job
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(worker.build(**args))
+                except BaseException as e:
+                    future.set_exception(e)
+                finally:
+                    self.completed += 1
+            self.jobs.task_done()
+
+            if worker.needs_recycle(self.recycle_after):
+                worker.recycle()
+
+    def submit(self, project_file: str, cwd: str, timeout: float,
+               configuration: str = 'Release') -> Future:
+        """Queue a build job, raising BuildQueueFull if the queue is at capacity"""
+        self.start()
+        if self.workers and all(w.last_health_check and not w.healthy for w in self.workers):
+            raise RuntimeError("No healthy build workers, the dotnet SDK may be unavailable")
+        future: Future = Future()
+        args = {
+            'project_file': str(project_file),
+            'cwd': str(cwd),
+            'timeout': timeout,
+            'configuration': configuration
+        }
+        try:
+            self.jobs.put_nowait((future, args))
+        except queue.Full:
+            self.rejected += 1
+            raise BuildQueueFull(f"Build queue is full ({self.jobs.maxsize} jobs)")
+        return future
+
+    def build(self, project_file: str, cwd: str, timeout: float,
+              configuration: str = 'Release') -> subprocess.CompletedProcess:
+        """Build on a warm worker and wait for the result"""
+        future = self.submit(project_file, cwd, timeout, configuration)
+        # The worker enforces the build timeout; allow extra time spent queued
+        wait = timeout * 2 + WARMUP_TIMEOUT
+        try:
+            return future.result(timeout=wait)
+        except FutureTimeout:
+            future.cancel()
+            raise subprocess.TimeoutExpired(['dotnet', 'build', str(project_file)], wait)
+
+    def shutdown(self):
+        """Stop the workers and their resident build servers"""
+        with self._lock:
+            if not self._started:
+                return
+            self._stopping.set()
+            for _ in self.workers:
+                self.jobs.put(None)
+            for thread in self._threads:
+                thread.join(timeout=5)
+            # Unhealthy workers exit without taking their stop marker
+            while True:
+                try:
+                    job = self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    job[0].cancel()
+            for worker in self.workers:
+                try:
+                    subprocess.run(['dotnet', 'build-server', 'shutdown'],
+                                   capture_output=True, timeout=30, env=worker.env)
+                except Exception as e:
+                    logger.warning(f"[BuildWorker {worker.worker_id}] Shutdown failed: {e}")
+            self.workers = []
+            self._threads = []
+            self._started = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth and per-worker health"""
+        return {
+            'workers': [
+                {
+                    'id': w.worker_id,
+                    'healthy': w.healthy,
+                    'builds_done': w.builds_done,
+                    'last_health_check': w.last_health_check
+                }
+                for w in self.workers
+            ],
+            'queued': self.jobs.qsize(),
+            'max_queue': self.jobs.maxsize,
+            'completed': self.completed,
+            'rejected': self.rejected
+        }
+
+# Initialize pool only when needed
+build_pool: Optional[BuildPool] = None
+_pool_lock = threading.Lock()
+def get_build_pool() -> BuildPool:
+    global build_pool
+    with _pool_lock:
+        if build_pool is None:
+            build_pool = BuildPool()
+            build_pool.start()
+    return build_pool
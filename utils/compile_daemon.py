@@ -0,0 +1,214 @@
+"""
+Direct csc compile backend for single-file C# programs.
+
+Skips MSBuild project evaluation entirely: the source is compiled by csc
+against reference assemblies resolved once per process, and csc hands the
+work to a resident VBCSCompiler server over its named pipe, so Roslyn
+stays loaded and JIT-warm between compilations.
+"""
+import glob
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from utils.compiler_types import CompilationError
+
+logger = logging.getLogger(__name__)
+
+TARGET_FRAMEWORK = 'net7.0'
+SERVER_KEEPALIVE = 600  # seconds the compiler server stays up when idle
+DAEMON_DIR = os.path.join(os.getcwd(), 'instance', 'compile_daemon')  # Not swept by ResourceMonitor
+
+DIAGNOSTIC_PATTERN = re.compile(
+    r'^(?P<file>[^(\n]*)\((?P<line>\d+),(?P<column>\d+)\): '
+    r'(?P<severity>error|warning) (?P<code>[A-Z]+\d+): (?P<message>.*)$'
+)
+
+def _version_key(path: str) -> List[int]:
+    """Sort key for versioned SDK/pack directories"""
+    return [int(p) if p.isdigit() else -1 for p in re.split(r'[.-]', os.path.basename(path))]
+
+def parse_diagnostics(output: str) -> List[CompilationError]:
+    """Parse csc output lines into structured diagnostics"""
+    diagnostics = []
+    seen = set()
+    for line in output.splitlines():
+        match = DIAGNOSTIC_PATTERN.match(line.strip())
+        if not match or line in seen:
+            continue
+        seen.add(line)
+        diagnostics.append(CompilationError(
+            error_type=match.group('severity'),
+            message=match.group('message').strip(),
+            file=os.path.basename(match.group('file')),
+            line=int(match.group('line')),
+            column=int(match.group('column')),
+            code=match.group('code')
+        ))
+    return diagnostics
+
+class CompileDaemon:
+    """Compiles Program.cs with csc through a long-lived compiler server"""
+
+    def __init__(self, dotnet_root: Optional[str] = None,
+                 target_framework: str = TARGET_FRAMEWORK, work_dir: str = DAEMON_DIR):
+        self.target_framework = target_framework
+        self.work_dir = Path(work_dir)
+        self.dotnet_root = dotnet_root or self._find_dotnet_root()
+        self.csc_path: Optional[str] = None
+        self.runtime_version: Optional[str] = None
+        self.response_file = self.work_dir / 'references.rsp'
+        self._lock = threading.Lock()
+        self._resolved = False
+        self.compilations = 0
+
+    @staticmethod
+    def _find_dotnet_root() -> str:
+        if os.environ.get('DOTNET_ROOT'):
+            return os.environ['DOTNET_ROOT']
+        dotnet = shutil.which('dotnet')
+        return os.path.dirname(os.path.realpath(dotnet)) if dotnet else ''
+
+    def resolve(self) -> bool:
+        """Locate csc and write the reference response file once"""
+        with self._lock:
+            if self._resolved:
+                return True
+
+            compilers = sorted(
+                glob.glob(os.path.join(self.dotnet_root, 'sdk', '*', 'Roslyn', 'bincore', 'csc.dll')),
+                key=lambda p: _version_key(Path(p).parents[2].name)
+            )
+            major = self.target_framework.replace('net', '').split('.')[0]
+            packs = sorted(
+                glob.glob(os.path.join(self.dotnet_root, 'packs', 'Microsoft.NETCore.App.Ref', f'{major}.*')),
+                key=_version_key
+            )
+            if not compilers or not packs:
+                logger.error(f"csc or {self.target_framework} reference pack not found under {self.dotnet_root}")
+                return False
+
+            references = sorted(glob.glob(os.path.join(packs[-1], 'ref', self.target_framework, '*.dll')))
+            if not references:
+                logger.error(f"No reference assemblies in {packs[-1]}")
+                return False
+
+            self.work_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.response_file, 'w') as f:
+                f.write('\n'.join(f'/reference:"{ref}"' for ref in references))
+
+            self.csc_path = compilers[-1]
+            self.runtime_version = os.path.basename(packs[-1])
+            self._resolved = True
+            logger.info(f"Compile daemon using {self.csc_path} with {len(references)} references "
+                        f"from {self.runtime_version}")
+            return True
+
+    def _runtime_config(self) -> Dict[str, Any]:
+        major_minor = '.'.join(self.runtime_version.split('.')[:2])
+        return {
+            'runtimeOptions': {
+                'tfm': self.target_framework,
+                'framework': {
+                    'name': 'Microsoft.NETCore.App',
+                    'version': f'{major_minor}.0'
+                }
+            }
+        }
+
+    def compile(self, code: str, output_dir: Path, timeout: float = 30) -> Dict[str, Any]:
+        """Compile source into output_dir/program.dll"""
+        if not self.resolve():
+            return {'success': False, 'error': 'C# compiler not available'}
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        source_file = output_dir / 'Program.cs'
+        source_file.write_text(code)
+        assembly = output_dir / 'program.dll'
+
+        start = time.time()
+        try:
+            result = subprocess.run(
+                ['dotnet', 'exec', self.csc_path,
+                 '/shared', f'/keepalive:{SERVER_KEEPALIVE}',
+                 '/noconfig', '/nologo', '/nostdlib+', '/utf8output',
+                 '/target:exe', '/optimize+', '/deterministic+',
+                 f'@{self.response_file}',
+                 f'/out:{assembly}',
+                 str(source_file)],
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+                cwd=str(output_dir),
+                env={
+                    **os.environ,
+                    'DOTNET_CLI_TELEMETRY_OPTOUT': 'true',
+                    'DOTNET_NOLOGO': 'true'
+                }
+            )
+        except subprocess.TimeoutExpired:
+            logger.error("csc compilation timed out")
+            return {'success': False, 'error': 'Compilation timed out'}
+
+        self.compilations += 1
+        compilation_time = time.time() - start
+        output = result.stdout + result.stderr
+        diagnostics = parse_diagnostics(output)
+        errors = [d for d in diagnostics if d.error_type == 'error']
+
+        if result.returncode != 0:
+            error_text = '\n'.join(
+                f"{d.file}({d.line},{d.column}): error {d.code}: {d.message}" for d in errors
+            ) or output.strip()
+            logger.debug(f"csc failed in {compilation_time:.2f}s with {len(errors)} errors")
+            return {
+                'success': False,
+                'error': error_text,
+                'diagnostics': [d.to_dict() for d in diagnostics],
+                'compilation_time': compilation_time
+            }
+
+        with open(output_dir / 'program.runtimeconfig.json', 'w') as f:
+            json.dump(self._runtime_config(), f)
+
+        logger.debug(f"csc compiled {assembly} in {compilation_time:.2f}s")
+        return {
+            'success': True,
+            'assembly': str(assembly),
+            'command': ['dotnet', str(assembly)],
+            'diagnostics': [d.to_dict() for d in diagnostics],
+            'compilation_time': compilation_time
+        }
+
+    def warm(self) -> bool:
+        """Compile a trivial program so the compiler server is resident"""
+        result = self.compile(
+            'class Program { static void Main() { System.Console.WriteLine("warm"); } }',
+            self.work_dir / 'warmup'
+        )
+        return result['success']
+
+    def shutdown(self):
+        """Stop the resident compiler server"""
+        try:
+            subprocess.run(['dotnet', 'build-server', 'shutdown', '--vbcscompiler'],
+                           capture_output=True, timeout=30)
+        except Exception as e:
+            logger.warning(f"Error shutting down compiler server: {e}")
+
+# Initialize daemon only when needed
+compile_daemon: Optional[CompileDaemon] = None
+_daemon_lock = threading.Lock()
+def get_compile_daemon() -> CompileDaemon:
+    global compile_daemon
+    with _daemon_lock:
+        if compile_daemon is None:
+            compile_daemon = CompileDaemon()
+    return compile_daemon
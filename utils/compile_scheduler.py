@@ -0,0 +1,234 @@
+"""
+Admission control for compile-and-run requests.
+
+A fixed number of workers drain a bounded queue. Pending jobs are kept
+per user and dispatched round-robin, so one student pressing Run
+repeatedly cannot starve the rest of the class. Background users, such as
+bulk regrades, are only dispatched when no other user has a job waiting.
+Callers can subscribe to queue-position updates and get a retry-after
+hint when the queue is full.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque, OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMPILE_QUEUE_SIZE = int(os.environ.get('COMPILE_QUEUE_SIZE', 60))
+MAX_PENDING_PER_USER = 2
+COMPILE_MEMORY_MB = 512  # Rough peak of one dotnet build plus program
+DEFAULT_JOB_SECONDS = 5.0
+
+class SchedulerFull(Exception):
+    """Raised when a job cannot be admitted"""
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+@dataclass
+class CompileJob:
+    user_key: str
+    func: Callable[..., Any]
+    args: Tuple[Any, ...]
+    kwargs: Dict[str, Any]
+    future: Future = field(default_factory=Future)
+    on_position: Optional[Callable[[int], None]] = None
+    enqueued_at: float = field(default_factory=time.time)
+    position: int = -1
+
+class CompileScheduler:
+    """Fixed worker pool with a bounded, per-user fair FIFO"""
+
+    def __init__(self, workers: Optional[int] = None, max_queue: int = COMPILE_QUEUE_SIZE,
+                 max_per_user: int = MAX_PENDING_PER_USER):
+        if workers is None:
+            from optimization_analyzer import get_optimizer
+            workers = get_optimizer().get_recommended_compile_workers(COMPILE_MEMORY_MB)
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        # user_key -> pending jobs; insertion order is the round-robin order
+        self._queues: "OrderedDict[str, Deque[CompileJob]]" = OrderedDict()
+        self._background: set = set()  # user_keys dispatched only when nobody else waits
+        self._pending = 0
+        self._running = 0
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._started = False
+        self._stopping = False
+        self._avg_job_seconds = DEFAULT_JOB_SECONDS
+        self.completed = 0
+        self.rejected = 0
+
+    def start(self):
+        with self._condition:
+            if self._started:
+                return
+            self._started = True
+            self._stopping = False
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run_worker, name=f"compile-worker-{i}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+        logger.info(f"Compile scheduler started with {self.workers} workers, queue size {self.max_queue}")
+
+    def retry_after(self) -> int:
+        """Estimate seconds until a queue slot frees up"""
+        waves = (self._pending + self._running) / max(self.workers, 1)
+        return max(1, int(round(waves * self._avg_job_seconds)))
+
+    def submit(self, user_key: str, func: Callable[..., Any], *args,
+               on_position: Optional[Callable[[int], None]] = None,
+               background: bool = False, **kwargs) -> Future:
+        """Admit a job or raise SchedulerFull with a retry-after hint"""
+        self.start()
+        job = CompileJob(str(user_key), func, args, kwargs, on_position=on_position)
+        with self._condition:
+            user_queue = self._queues.get(job.user_key)
+            if self._pending >= self.max_queue:
+                self.rejected += 1
+                raise SchedulerFull('Compile queue is full', self.retry_after())
+            if user_queue is not None and len(user_queue) >= self.max_per_user:
+                self.rejected += 1
+                raise SchedulerFull('Too many runs already queued', self.retry_after())
+
+            if user_queue is None:
+                user_queue = self._queues[job.user_key] = deque()
+                if background:
+                    self._background.add(job.user_key)
+            user_queue.append(job)
+            self._pending += 1
+            updates = self._positions()
+            self._condition.notify()
+
+        self._publish(updates)
+        return job.future
+
+    def run(self, user_key: str, func: Callable[..., Any], *args,
+            on_position: Optional[Callable[[int], None]] = None,
+            timeout: Optional[float] = None, **kwargs) -> Any:
+        """Submit a job and wait for its result"""
+        return self.submit(user_key, func, *args, on_position=on_position, **kwargs).result(timeout=timeout)
+
+    def _groups(self) -> Tuple[List[Deque[CompileJob]], List[Deque[CompileJob]]]:
+        """Foreground and background queues, each in round-robin order; caller holds the lock"""
+        foreground, background = [], []
+        for user_key, user_queue in self._queues.items():
+            (background if user_key in self._background else foreground).append(user_queue)
+        return foreground, background
+
+    def _positions(self) -> List[Tuple[CompileJob, int]]:
+        """Jobs whose count of jobs ahead in dispatch order changed; caller holds the lock"""
+        updates = []
+        foreground, background = self._groups()
+        # Every foreground job is dispatched before any background one
+        for group, offset in ((foreground, 0), (background, sum(len(q) for q in foreground))):
+            lengths = [len(q) for q in group]
+            for user_index, user_queue in enumerate(group):
+                for depth, job in enumerate(user_queue):
+                    ahead = offset + sum(
+                        min(length, depth + (1 if other_index < user_index else 0))
+                        for other_index, length in enumerate(lengths)
+                    )
+                    if ahead != job.position:
+                        job.position = ahead
+                        updates.append((job, ahead))
+        return updates
+
+    def _publish(self, updates: List[Tuple[CompileJob, int]]):
+        for job, position in updates:
+            if job.on_position is None:
+                continue
+            try:
+                job.on_position(position)
+            except Exception as e:
+                logger.warning(f"Queue position callback failed for {job.user_key}: {e}")
+
+    def _next_job(self) -> CompileJob:
+        """Pop the next job round-robin across users, background users last; caller holds the lock"""
+        user_key = next((k for k in self._queues if k not in self._background), None)
+        if user_key is None:
+            user_key = next(iter(self._queues))
+        user_queue = self._queues.pop(user_key)
+        job = user_queue.popleft()
+        if user_queue:
+            # Move this user to the back of the rotation
+            self._queues[user_key] = user_queue
+        else:
+            self._background.discard(user_key)
+        self._pending -= 1
+        return job
+
+    def _run_worker(self):
+        while True:
+            with self._condition:
+                while not self._queues and not self._stopping:
+                    self._condition.wait()
+                if self._stopping:
+                    return
+                job = self._next_job()
+                self._running += 1
+                updates = self._positions()
+
+            self._publish(updates)
+            if job.future.set_running_or_notify_cancel():
+                start = time.time()
+                try:
+                    job.future.set_result(job.func(*job.args, **job.kwargs))
+                except BaseException as e:
+                    job.future.set_exception(e)
+                duration = time.time() - start
+                logger.debug(f"Compile job for {job.user_key} ran {duration:.2f}s "
+                             f"after waiting {start - job.enqueued_at:.2f}s")
+            else:
+                duration = None
+
+            with self._condition:
+                self._running -= 1
+                if duration is not None:
+                    self.completed += 1
+                    self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * duration
+
+    def shutdown(self):
+        """Stop workers; jobs still queued are cancelled"""
+        with self._condition:
+            self._stopping = True
+            for user_queue in self._queues.values():
+                for job in user_queue:
+                    job.future.cancel()
+            self._queues.clear()
+            self._background.clear()
+            self._pending = 0
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        self._started = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                'workers': self.workers,
+                'running': self._running,
+                'queued': self._pending,
+                'max_queue': self.max_queue,
+                'queued_users': len(self._queues),
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'avg_job_seconds': self._avg_job_seconds
+            }
+
+# Initialize scheduler only when needed
+compile_scheduler: Optional[CompileScheduler] = None
+_scheduler_lock = threading.Lock()
+def get_compile_scheduler() -> CompileScheduler:
+    global compile_scheduler
+    with _scheduler_lock:
+        if compile_scheduler is None:
+            compile_scheduler = CompileScheduler()
+    return compile_scheduler
@@ -1,9 +1,12 @@
+import atexit
 import logging
 import json
 import os
+import traceback
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from pathlib import Path
+from utils.jsonl_writer import JsonlWriter, session_timeline
 
 # Configure basic logging
 logger = logging.getLogger('compiler')
@@ -24,10 +27,13 @@ logger.addHandler(console_handler)
 class CompilerLogger:
     """Handles logging for C# compiler service"""
 
-    def __init__(self):
-        self.log_dir = Path('logs/compiler')
+    def __init__(self, log_dir: str = 'logs/compiler'):
+        self.log_dir = Path(log_dir)
         self.log_dir.mkdir(parents=True, exist_ok=True)
         self.logger = logger
+        # Events of all sessions go to one append-only log, written off the request thread
+        self.writer = JsonlWriter(str(self.log_dir), name='events')
+        atexit.register(self.writer.close)
 
     def debug(self, message: str, *args, **kwargs):
         """Forward debug messages to logger"""
@@ -65,7 +71,7 @@ class CompilerLogger:
         self._log_event(session_id, 'compilation_error', {
             'error_type': error.__class__.__name__,
             'error_message': str(error),
-            'stack_trace': getattr(error, '__traceback__', None),
+            'stack_trace': ''.join(traceback.format_tb(error.__traceback__)),
             'context': context,
             'process_id': os.getpid(),
             'timestamp': datetime.utcnow().isoformat()
@@ -128,31 +134,19 @@ class CompilerLogger:
         })
 
     def _log_event(self, session_id: str, event_type: str, data: Dict[str, Any]) -> None:
-        """Write structured log entry to session log file"""
-        log_file = self.log_dir / f"session_{session_id}.json"
-
-        try:
-            existing_logs = []
-            if log_file.exists():
-                with open(log_file, 'r') as f:
-                    existing_logs = json.load(f)
-
-            if not isinstance(existing_logs, list):
-                existing_logs = []
-
-            log_entry = {
-                'event_type': event_type,
-                'timestamp': datetime.utcnow().isoformat(),
-                'data': data
-            }
-
-            existing_logs.append(log_entry)
-
-            with open(log_file, 'w') as f:
-                json.dump(existing_logs, f, indent=2)
-
-        except Exception as e:
-            self.error(f"[ERROR] Error writing to log file: {str(e)}")
+        """Queue a structured log entry for the session's event log"""
+        if not self.writer.write({
+            'session_id': session_id,
+            'event_type': event_type,
+            'timestamp': datetime.utcnow().isoformat(),
+            'data': data
+        }):
+            self.warning(f"[LOG] Event log queue full, dropped {event_type} for session {session_id}")
+
+    def get_session_timeline(self, session_id: str) -> List[Dict[str, Any]]:
+        """Every logged event of a session, oldest first"""
+        self.writer.flush()
+        return session_timeline(str(self.log_dir), session_id, name='events')
 
 # Global compiler logger instance
 compiler_logger = CompilerLogger()
\ No newline at end of file
@@ -0,0 +1,128 @@
+"""
+TF-IDF index over the memory files.
+
+The vectorizer is fitted once over the whole corpus and each file's
+vector is cached with its mtime, size and content hash. On refresh only
+files whose stat changed are re-read, and only files whose content hash
+changed are re-vectorized, against the fitted vocabulary. The vocabulary
+and IDF weights are refitted when files are added or removed, or once
+more than REFIT_FRACTION of the corpus has changed since the last fit.
+A query is scored against every file with one sparse matrix-vector
+product; vectors are L2-normalized so the product is cosine similarity.
+"""
+import glob
+import hashlib
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+logger = logging.getLogger(__name__)
+
+REFIT_FRACTION = 0.25
+
+class ContextIndex:
+    """Cached TF-IDF vectors of a directory of markdown files plus any extra files"""
+
+    def __init__(self, base_dir: str, pattern: str = '*.md'):
+        self.base_dir = base_dir
+        self.pattern = pattern
+        self.vectorizer: Optional[TfidfVectorizer] = None
+        # path -> (mtime_ns, size, content hash)
+        self._signatures: Dict[str, Tuple[int, int, str]] = {}
+        self._vectors: Dict[str, sparse.csr_matrix] = {}
+        self._contents: Dict[str, str] = {}
+        self._extra_paths: set = set()
+        self._paths: List[str] = []
+        self._matrix: Optional[sparse.csr_matrix] = None
+        self._changed_since_fit = 0
+        self._lock = threading.Lock()
+        self.fits = 0
+        self.transforms = 0
+
+    def _corpus_paths(self) -> List[str]:
+        paths = {os.path.abspath(p) for p in glob.glob(os.path.join(self.base_dir, self.pattern))}
+        return sorted(paths | {p for p in self._extra_paths if os.path.exists(p)})
+
+    def _fit(self):
+        paths = sorted(self._contents)
+        self.vectorizer = TfidfVectorizer(stop_words='english')
+        try:
+            matrix = self.vectorizer.fit_transform([self._contents[p] for p in paths]).tocsr()
+        except ValueError:
+            # Nothing but stop words in the corpus
+            self.vectorizer = None
+            self._vectors = {}
+            matrix = None
+        else:
+            self._vectors = {path: matrix[i] for i, path in enumerate(paths)}
+        self._changed_since_fit = 0
+        self.fits += 1
+        logger.debug(f"Fitted context index over {len(paths)} files")
+
+    def refresh(self, extra_paths: Iterable[str] = ()) -> None:
+        """Bring the cached vectors up to date with the files on disk"""
+        with self._lock:
+            self._extra_paths.update(os.path.abspath(p) for p in extra_paths)
+            paths = self._corpus_paths()
+            changed = []
+            for path in paths:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                signature = self._signatures.get(path)
+                if signature and signature[:2] == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                    content = f.read()
+                digest = hashlib.sha256(content.encode()).hexdigest()
+                self._signatures[path] = (stat.st_mtime_ns, stat.st_size, digest)
+                if signature and signature[2] == digest:
+                    continue
+                self._contents[path] = content
+                changed.append(path)
+
+            removed = set(self._contents) - set(paths)
+            for path in removed:
+                self._contents.pop(path, None)
+                self._signatures.pop(path, None)
+                self._vectors.pop(path, None)
+            added = [p for p in changed if p not in self._vectors]
+
+            if not changed and not removed and self.fits:
+                return
+
+            self._changed_since_fit += len(changed)
+            if self.vectorizer is None or added or removed or \
+                    self._changed_since_fit > REFIT_FRACTION * max(1, len(paths)):
+                self._fit()
+            else:
+                rows = self.vectorizer.transform([self._contents[p] for p in changed])
+                for i, path in enumerate(changed):
+                    self._vectors[path] = rows[i]
+                self.transforms += len(changed)
+
+            self._paths = sorted(self._vectors)
+            self._matrix = sparse.vstack([self._vectors[p] for p in self._paths]).tocsr() \
+                if self._paths else None
+
+    def score(self, query: str, paths: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Cosine similarity of the query to each file, all files unless paths is given"""
+        wanted = [os.path.abspath(p) for p in paths] if paths is not None else None
+        self.refresh(wanted or ())
+        with self._lock:
+            if self.vectorizer is None or self._matrix is None:
+                return {path: 0.0 for path in (wanted or self._paths)}
+            query_vector = self.vectorizer.transform([query])
+            similarities = np.asarray((self._matrix @ query_vector.T).todense()).ravel()
+            scores = dict(zip(self._paths, similarities.tolist()))
+        if wanted is None:
+            return scores
+        missing = [p for p in wanted if p not in scores]
+        if missing:
+            raise FileNotFoundError(f"Not in context index: {', '.join(missing)}")
+        return {path: scores[path] for path in wanted}
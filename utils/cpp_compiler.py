@@ -0,0 +1,257 @@
+"""
+C++ compile backend for single-file student programs.
+
+Student programs include the same heavy standard headers on every run,
+so the standard headers a program includes up front are compiled once per
+distinct set into a precompiled header, which compilations of programs
+with the same set force-include. Finished executables are kept in the shared
+build cache keyed by source, flags and compiler version, so an unchanged
+program is never compiled twice.
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from utils.build_cache import build_cache
+from utils.compiler_types import CompilationError
+
+logger = logging.getLogger(__name__)
+
+CXX_FLAGS = ['-std=c++17', '-O1', '-pipe', '-Wall']
+PCH_HEADERS = [
+    'iostream', 'string', 'vector', 'algorithm', 'cmath', 'iomanip',
+    'sstream', 'map', 'cstdlib', 'ctime', 'limits'
+]
+PCH_DIR = os.path.join(os.getcwd(), 'instance', 'cpp_pch')  # Kept across runs, so not in compiler_workspace
+PCH_BUILD_TIMEOUT = 120
+
+LEADING_INCLUDE = re.compile(r'^\s*#\s*include\s*<([\w./]+)>\s*(//.*)?$')
+
+DIAGNOSTIC_PATTERN = re.compile(
+    r'^(?P<file>[^:\n]+):(?P<line>\d+):(?P<column>\d+): '
+    r'(?P<severity>fatal error|error|warning): (?P<message>.*?)(?: \[(?P<code>-W[\w=+-]+)\])?$'
+)
+
+def parse_diagnostics(output: str) -> List[CompilationError]:
+    """Parse g++/clang++ output lines into structured diagnostics"""
+    diagnostics = []
+    for line in output.splitlines():
+        match = DIAGNOSTIC_PATTERN.match(line.strip())
+        if not match:
+            continue
+        severity = match.group('severity')
+        diagnostics.append(CompilationError(
+            error_type='error' if severity == 'fatal error' else severity,
+            message=match.group('message').strip(),
+            file=os.path.basename(match.group('file')),
+            line=int(match.group('line')),
+            column=int(match.group('column')),
+            code=match.group('code') or ''
+        ))
+    return diagnostics
+
+def leading_headers(code: str) -> Optional[Tuple[str, ...]]:
+    """
+    Headers the program includes before anything else, if all of them are
+    precompiled. Force-including a header the program did not ask for can
+    change its meaning (e.g. a global named count clashes with std::count
+    under using namespace std), so anything else means no precompiled header.
+    """
+    headers = []
+    for line in code.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith('//'):
+            continue
+        match = LEADING_INCLUDE.match(stripped)
+        if not match:
+            break
+        if match.group(1) not in PCH_HEADERS:
+            return None
+        if match.group(1) not in headers:
+            headers.append(match.group(1))
+    return tuple(headers) or None
+
+class CppCompiler:
+    """Compiles main.cpp with g++ or clang++ against a shared precompiled header"""
+
+    def __init__(self, cxx: Optional[str] = None, flags: Optional[List[str]] = None,
+                 pch_dir: str = PCH_DIR):
+        self.cxx = cxx or os.environ.get('CXX') or shutil.which('g++') or shutil.which('clang++')
+        self.flags = list(flags or CXX_FLAGS)
+        self.pch_dir = Path(pch_dir)
+        self._version: Optional[str] = None
+        # Header set -> flags, resolved when its precompiled header is built
+        self._pch_builds: Dict[Tuple[str, ...], Future] = {}
+        self._lock = threading.Lock()
+        self.compilations = 0
+
+    def version(self) -> str:
+        if self._version is None:
+            try:
+                result = subprocess.run([self.cxx, '--version'], capture_output=True, text=True, timeout=10)
+                self._version = result.stdout.splitlines()[0] if result.stdout else self.cxx
+            except (OSError, subprocess.TimeoutExpired):
+                self._version = ''
+        return self._version
+
+    @property
+    def is_clang(self) -> bool:
+        return 'clang' in self.version()
+
+    def pch_flags(self, headers: Optional[Sequence[str]] = None,
+                  timeout: float = PCH_BUILD_TIMEOUT) -> List[str]:
+        """
+        Flags that force-include the precompiled header for a header set.
+        Each set is built once; only requests for a set that is still being
+        built wait for it, for at most timeout seconds, and get no flags if
+        it is not ready by then.
+        """
+        headers = tuple(PCH_HEADERS if headers is None else headers)
+        if not headers:
+            return []
+        with self._lock:
+            build = self._pch_builds.get(headers)
+            owner = build is None
+            if owner:
+                build = self._pch_builds[headers] = Future()
+
+        if not owner:
+            try:
+                return build.result(timeout=timeout)
+            except FutureTimeout:
+                logger.warning(f"Precompiled header for {','.join(headers)} not ready, compiling without it")
+                return []
+
+        flags, final = [], False
+        try:
+            flags, final = self._build_pch(headers, timeout)
+        finally:
+            if not final:
+                # Transient failure: let a later request try again
+                with self._lock:
+                    del self._pch_builds[headers]
+            build.set_result(flags)
+        return flags
+
+    def _build_pch(self, headers: Tuple[str, ...], timeout: float) -> Tuple[List[str], bool]:
+        """Build one header set; returns its flags and whether the outcome may be kept"""
+        content = ''.join(f'#include <{header}>\n' for header in headers)
+        digest = hashlib.sha256(
+            '|'.join([self.version(), ' '.join(self.flags), content]).encode()
+        ).hexdigest()
+        # One directory per header set; g++ finds the .gch next to the header it includes
+        variant_dir = self.pch_dir / digest[:16]
+        header = variant_dir / 'student_pch.h'
+        output = variant_dir / ('student_pch.h.pch' if self.is_clang else 'student_pch.h.gch')
+        flags = ['-include-pch', str(output)] if self.is_clang else ['-include', str(header)]
+
+        if output.exists():
+            return flags, True
+
+        variant_dir.mkdir(parents=True, exist_ok=True)
+        header.write_text(content)
+        partial = variant_dir / f'{output.name}.{os.getpid()}.{threading.get_ident()}.tmp'
+        start = time.time()
+        try:
+            result = subprocess.run(
+                [self.cxx, *self.flags, '-x', 'c++-header', str(header), '-o', str(partial)],
+                capture_output=True, text=True, timeout=timeout
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.error(f"Failed to build precompiled header: {e}")
+            partial.unlink(missing_ok=True)
+            return [], False
+
+        if result.returncode != 0:
+            # The same headers and flags would fail again
+            logger.error(f"Failed to build precompiled header: {result.stderr}")
+            partial.unlink(missing_ok=True)
+            return [], True
+        os.replace(partial, output)
+        logger.info(f"Built precompiled header {output} in {time.time() - start:.2f}s")
+        return flags, True
+
+    def compile(self, code: str, output_dir: Path, timeout: float = 30) -> Dict[str, Any]:
+        """Compile source into output_dir/program, reusing cached executables"""
+        if not self.cxx:
+            return {'success': False, 'error': 'C++ compiler not available'}
+
+        output_dir = Path(output_dir)
+        executable = output_dir / 'program'
+        cache_key = build_cache.get_key(
+            code, f"cpp|{self.version()}|{' '.join(self.flags)}|{','.join(PCH_HEADERS)}"
+        )
+        if build_cache.restore(cache_key, output_dir):
+            logger.debug(f"Using cached C++ build {cache_key[:12]}")
+            return {
+                'success': True,
+                'executable': str(executable),
+                'command': [str(executable)],
+                'diagnostics': [],
+                'compilation_time': 0.0,
+                'cached': True
+            }
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        source_file = output_dir / 'main.cpp'
+        source_file.write_text(code)
+
+        start = time.time()
+        # Building or waiting for the precompiled header may use half the budget
+        pch_flags = self.pch_flags(leading_headers(code) or (), timeout / 2)
+        try:
+            result = subprocess.run(
+                [self.cxx, *self.flags, *pch_flags, str(source_file), '-o', str(executable)],
+                capture_output=True,
+                text=True,
+                timeout=timeout - (time.time() - start),
+                cwd=str(output_dir)
+            )
+        except subprocess.TimeoutExpired:
+            logger.error("C++ compilation timed out")
+            return {'success': False, 'error': 'Compilation timed out'}
+
+        self.compilations += 1
+        compilation_time = time.time() - start
+        diagnostics = parse_diagnostics(result.stderr)
+
+        if result.returncode != 0:
+            errors = [d for d in diagnostics if d.error_type == 'error']
+            error_text = '\n'.join(
+                f"{d.file}:{d.line}:{d.column}: error: {d.message}" for d in errors
+            ) or result.stderr.strip()
+            logger.debug(f"C++ compilation failed in {compilation_time:.2f}s with {len(errors)} errors")
+            return {
+                'success': False,
+                'error': error_text,
+                'diagnostics': [d.to_dict() for d in diagnostics],
+                'compilation_time': compilation_time
+            }
+
+        build_cache.store(cache_key, output_dir)
+        logger.debug(f"Compiled {executable} in {compilation_time:.2f}s")
+        return {
+            'success': True,
+            'executable': str(executable),
+            'command': [str(executable)],
+            'diagnostics': [d.to_dict() for d in diagnostics],
+            'compilation_time': compilation_time,
+            'cached': False
+        }
+
+# Initialize compiler only when needed
+cpp_compiler: Optional[CppCompiler] = None
+_compiler_lock = threading.Lock()
+def get_cpp_compiler() -> CppCompiler:
+    global cpp_compiler
+    with _compiler_lock:
+        if cpp_compiler is None:
+            cpp_compiler = CppCompiler()
+    return cpp_compiler
@@ -0,0 +1,107 @@
+"""
+C# builds shared by interactive runs and batch grading.
+
+COMPILER_BACKEND selects csc through the resident compile daemon or
+MSBuild on the warm build pool. When csc is selected but the SDK has no
+csc or reference pack, builds fall back to the build pool, so a server
+without the csc toolchain still compiles. Successful builds are stored in
+the build cache under a key that includes the backend that produced them.
+"""
+import logging
+import os
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Dict
+from utils.build_cache import build_cache
+from utils.build_pool import get_build_pool, BuildQueueFull
+from utils.compile_daemon import get_compile_daemon
+
+logger = logging.getLogger(__name__)
+
+COMPILER_BACKEND = os.environ.get('COMPILER_BACKEND', 'msbuild')  # 'msbuild' or 'csc'
+
+PROJECT_CONTENT = """<Project Sdk="Microsoft.NET.Sdk">
+          <PropertyGroup>
+            <OutputType>Exe</OutputType>
+            <TargetFramework>net7.0</TargetFramework>
+            <RuntimeIdentifier>linux-x64</RuntimeIdentifier>
+            <PublishSingleFile>true</PublishSingleFile>
+            <SelfContained>false</SelfContained>
+            <EnableDefaultItems>false</EnableDefaultItems>
+            <GenerateAssemblyInfo>false</GenerateAssemblyInfo>
+          </PropertyGroup>
+          <ItemGroup>
+            <Compile Include="Program.cs" />
+          </ItemGroup>
+        </Project>"""
+
+def select_backend() -> str:
+    """The configured backend, or msbuild when csc is configured but unavailable"""
+    if COMPILER_BACKEND == 'csc':
+        if get_compile_daemon().resolve():
+            return 'csc'
+        logger.warning("csc not available, building with MSBuild instead")
+    return 'msbuild'
+
+def program_command(output_dir: Path):
+    """Command that runs a build: the MSBuild apphost, or the csc assembly via the dotnet host"""
+    exe_path = output_dir / "program"
+    assembly_path = output_dir / "program.dll"
+    if exe_path.exists():
+        return [str(exe_path)]
+    if assembly_path.exists() and (output_dir / "program.runtimeconfig.json").exists():
+        return ['dotnet', str(assembly_path)]
+    return None
+
+def build_csharp(code: str, work_dir: Path, timeout: float) -> Dict[str, Any]:
+    """Build Program.cs in work_dir with the selected backend, reusing cached builds"""
+    work_dir = Path(work_dir)
+    output_dir = work_dir / "bin" / "Release" / "net7.0" / "linux-x64"
+    backend = select_backend()
+    cache_key = build_cache.get_key(code, PROJECT_CONTENT if backend == 'msbuild' else backend)
+    cached = build_cache.restore(cache_key, output_dir)
+    start = time.time()
+
+    if cached:
+        logger.debug(f"Using cached build {cache_key[:12]}")
+    elif backend == 'csc':
+        compile_result = get_compile_daemon().compile(code, output_dir, timeout)
+        if not compile_result['success']:
+            return {
+                'success': False,
+                'error': compile_result['error'],
+                'diagnostics': compile_result.get('diagnostics', [])
+            }
+        build_cache.store(cache_key, output_dir)
+    else:
+        work_dir.mkdir(parents=True, exist_ok=True)
+        (work_dir / "Program.cs").write_text(code)
+        project_file = work_dir / "program.csproj"
+        project_file.write_text(PROJECT_CONTENT)
+        try:
+            compile_result = get_build_pool().build(project_file, str(work_dir), timeout)
+        except BuildQueueFull:
+            return {'success': False, 'error': 'Compiler is busy, please try again'}
+        except subprocess.TimeoutExpired:
+            return {'success': False, 'error': 'Compilation timed out'}
+        except Exception as e:
+            logger.error(f"Build failed to run: {e}")
+            return {'success': False, 'error': str(e)}
+        if compile_result.returncode != 0:
+            # MSBuild reports errors on stdout
+            return {'success': False, 'error': (compile_result.stderr or compile_result.stdout).strip()}
+        build_cache.store(cache_key, output_dir)
+
+    command = program_command(output_dir)
+    if command is None:
+        logger.error(f"Executable not found in {output_dir}")
+        return {'success': False, 'error': 'Compiled executable not found'}
+    return {
+        'success': True,
+        'command': command,
+        'output_dir': output_dir,
+        'backend': backend,
+        'cached': cached,
+        'compilation_time': 0.0 if cached else time.time() - start
+    }
@@ -1,12 +1,25 @@
 """
 Curriculum Compliance Checker for Ontario Computer Science Curriculum
 Focuses on validating activities against curriculum expectations
+
+Expectations are loaded from the curriculum tables into one index per
+course: a code -> expectation dict, strand and overall code -> codes
+below it, and a bit position for every leaf expectation (specific
+expectations, and overall expectations without any). A student's
+coverage is the OR of the bitmaps of the activities they completed, so
+progress and suggestions are set operations on ints. The indexes are
+rebuilt when the curriculum version changes (see utils/curriculum_tree.py).
 """
 import logging
-from typing import Dict, List, Optional
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
 from dataclasses import dataclass
+from sqlalchemy import case, func, select
+from app import db
+from models.curriculum import Course, Strand, OverallExpectation, SpecificExpectation
+from models.student import CodingActivity, StudentProgress
+from utils import curriculum_tree
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -15,65 +28,128 @@ class CurriculumExpectation:
     description: str
     strand: str  # e.g., "Programming Concepts", "Software Development"
     grade: str  # e.g., "ICS4U", "ICS3U"
+    overall: Optional[str] = None  # Parent overall code of a specific expectation
+
+class CurriculumIndex:
+    """Expectations of one course, indexed by code and prefix"""
+
+    def __init__(self, grade: str):
+        self.grade = grade
+        self.expectations: Dict[str, CurriculumExpectation] = {}
+        self.by_strand: Dict[str, List[str]] = {}
+        self.by_overall: Dict[str, List[str]] = {}
+        self.bits: Dict[str, int] = {}  # Leaf code -> bit position
+        self.leaves: List[str] = []     # Bit position -> leaf code
+        self._masks: Dict[str, int] = {}
+
+    def add(self, strand_code: str, strand_title: str, overall_code: Optional[str],
+            overall_description: str, specific_code: Optional[str], specific_description: str):
+        strand_code = strand_code.upper()
+        self.by_strand.setdefault(strand_code, [])
+        if overall_code is None:
+            return
+        overall_code = overall_code.upper()
+        if overall_code not in self.expectations:
+            self.expectations[overall_code] = CurriculumExpectation(
+                code=overall_code, description=overall_description, strand=strand_title, grade=self.grade
+            )
+            self.by_strand[strand_code].append(overall_code)
+            self.by_overall[overall_code] = []
+        if specific_code is not None:
+            specific_code = specific_code.upper()
+            self.expectations[specific_code] = CurriculumExpectation(
+                code=specific_code, description=specific_description, strand=strand_title,
+                grade=self.grade, overall=overall_code
+            )
+            self.by_strand[strand_code].append(specific_code)
+            self.by_overall[overall_code].append(specific_code)
+
+    def finish(self):
+        """Assign bit positions once every row has been added"""
+        for overall_code, specifics in self.by_overall.items():
+            for code in specifics or [overall_code]:
+                self.bits[code] = len(self.leaves)
+                self.leaves.append(code)
+
+    def lookup(self, prefix: str) -> List[CurriculumExpectation]:
+        """Expectations under a strand ("B"), an overall ("B2") or one code ("B2.1")"""
+        prefix = prefix.strip().upper()
+        if prefix in self.by_strand:
+            codes = self.by_strand[prefix]
+        elif prefix in self.by_overall:
+            codes = [prefix] + self.by_overall[prefix]
+        else:
+            codes = [prefix] if prefix in self.expectations else []
+        return [self.expectations[code] for code in codes]
+
+    def mask(self, codes: Iterable[str]) -> int:
+        """Bitmap of the leaf expectations under the given codes; unknown codes are ignored"""
+        mask = 0
+        for code in codes:
+            code = code.strip().upper()
+            bits = self._masks.get(code)
+            if bits is None:
+                bits = 0
+                for expectation in self.lookup(code):
+                    if expectation.code in self.bits:
+                        bits |= 1 << self.bits[expectation.code]
+                self._masks[code] = bits
+            mask |= bits
+        return mask
+
+    def codes(self, mask: int) -> List[str]:
+        return [code for i, code in enumerate(self.leaves) if mask >> i & 1]
+
+    @property
+    def full_mask(self) -> int:
+        return (1 << len(self.leaves)) - 1
+
+def load_indexes() -> Dict[str, CurriculumIndex]:
+    """Index every course from one joined query"""
+    rows = db.session.execute(
+        select(Course.code, Strand.code, Strand.title_en, OverallExpectation.code,
+               OverallExpectation.description_en, SpecificExpectation.code, SpecificExpectation.description_en)
+        .join(Strand, Strand.course_id == Course.id)
+        .outerjoin(OverallExpectation, OverallExpectation.strand_id == Strand.id)
+        .outerjoin(SpecificExpectation, SpecificExpectation.overall_expectation_id == OverallExpectation.id)
+        .order_by(Course.code, func.upper(Strand.code), func.upper(OverallExpectation.code),
+                  func.upper(SpecificExpectation.code))
+    ).all()
+    indexes: Dict[str, CurriculumIndex] = {}
+    for course_code, *row in rows:
+        index = indexes.get(course_code)
+        if index is None:
+            index = indexes[course_code] = CurriculumIndex(course_code)
+        index.add(*row)
+    for index in indexes.values():
+        index.finish()
+    logger.info(f"Indexed curriculum expectations for {len(indexes)} courses")
+    return indexes
 
 class CurriculumChecker:
     def __init__(self):
-        # Initialize with ICS4U curriculum expectations
-        self.curriculum_expectations = {
-            "ICS4U": {
-                "programming_concepts": [
-                    CurriculumExpectation(
-                        code="A1.1",
-                        description="Use advanced programming concepts and features",
-                        strand="Programming Concepts",
-                        grade="ICS4U"
-                    ),
-                    CurriculumExpectation(
-                        code="A1.2",
-                        description="Use complex data types and advanced functions",
-                        strand="Programming Concepts",
-                        grade="ICS4U"
-                    ),
-                ],
-                "algorithms": [
-                    CurriculumExpectation(
-                        code="A2.1",
-                        description="Design complex algorithms for solving problems",
-                        strand="Algorithms",
-                        grade="ICS4U"
-                    ),
-                    CurriculumExpectation(
-                        code="A2.2",
-                        description="Analyze algorithm efficiency",
-                        strand="Algorithms",
-                        grade="ICS4U"
-                    ),
-                ],
-                "software_development": [
-                    CurriculumExpectation(
-                        code="B1.1",
-                        description="Use software development lifecycle principles",
-                        strand="Software Development",
-                        grade="ICS4U"
-                    ),
-                    CurriculumExpectation(
-                        code="B1.2",
-                        description="Apply modular design concepts",
-                        strand="Software Development",
-                        grade="ICS4U"
-                    ),
-                ]
-            }
-        }
+        self._indexes: Optional[Dict[str, CurriculumIndex]] = None
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def get_index(self, grade_level: str) -> Optional[CurriculumIndex]:
+        """Index of a course, rebuilt after curriculum changes; None for unknown courses"""
+        version = curriculum_tree.curriculum_version()
+        with self._lock:
+            if self._indexes is None or version != self._version:
+                self._indexes = load_indexes()
+                self._version = version
+            return self._indexes.get(grade_level)
 
-    def validate_activity(self, activity_data: Dict, grade_level: str = "ICS4U") -> Dict:
+    def validate_activity(self, activity_data: Dict, grade_level: str = "ICS3U") -> Dict:
         """
         Validates an activity against curriculum expectations
         Returns validation results with detailed feedback
         """
         logger.debug(f"Validating activity for grade level: {grade_level}")
-        
-        if grade_level not in self.curriculum_expectations:
+
+        index = self.get_index(grade_level)
+        if index is None:
             logger.warning(f"Unsupported grade level: {grade_level}")
             return {
                 "valid": False,
@@ -87,25 +163,18 @@ class CurriculumChecker:
         # Check activity metadata
         if "curriculum_expectations" not in activity_data:
             errors.append("Activity missing curriculum expectations metadata")
-        
+
         # Validate against curriculum expectations
-        activity_expectations = activity_data.get("curriculum_expectations", [])
-        for exp_code in activity_expectations:
-            found = False
-            for strand in self.curriculum_expectations[grade_level].values():
-                for expectation in strand:
-                    if expectation.code == exp_code:
-                        matches.append({
-                            "code": exp_code,
-                            "description": expectation.description,
-                            "strand": expectation.strand
-                        })
-                        found = True
-                        break
-                if found:
-                    break
-            if not found:
+        for exp_code in activity_data.get("curriculum_expectations") or []:
+            expectation = index.expectations.get(exp_code.strip().upper())
+            if expectation is None:
                 errors.append(f"Invalid curriculum expectation code: {exp_code}")
+                continue
+            matches.append({
+                "code": expectation.code,
+                "description": expectation.description,
+                "strand": expectation.strand
+            })
 
         return {
             "valid": len(errors) == 0,
@@ -113,25 +182,85 @@ class CurriculumChecker:
             "matches": matches
         }
 
-    def get_student_progress(self, student_id: int, grade_level: str = "ICS4U") -> Dict:
+    def _activity_coverage(self, index: CurriculumIndex, student_id: int) -> Tuple[int, List[Tuple[int, int, int]]]:
+        """
+        One aggregate query over the course's activities and the student's progress.
+        Returns the coverage bitmap and (activity id, sequence, mask) of activities not yet completed.
+        """
+        rows = db.session.execute(
+            select(CodingActivity.id, CodingActivity.sequence, CodingActivity.curriculum_expectations,
+                   func.max(case((StudentProgress.completed.is_(True), 1), else_=0)).label('completed'))
+            .outerjoin(StudentProgress, (StudentProgress.activity_id == CodingActivity.id) &
+                       (StudentProgress.student_id == student_id))
+            .where(CodingActivity.curriculum == index.grade, CodingActivity.deleted_at.is_(None))
+            .group_by(CodingActivity.id)
+        ).all()
+
+        covered = 0
+        remaining = []
+        for activity_id, sequence, codes, completed in rows:
+            mask = index.mask(codes or [])
+            if completed:
+                covered |= mask
+            else:
+                remaining.append((activity_id, sequence, mask))
+        return covered, remaining
+
+    def get_student_coverage(self, student_id: int, grade_level: str = "ICS3U") -> int:
+        """Bitmap of the expectations covered by the student's completed activities"""
+        index = self.get_index(grade_level)
+        if index is None:
+            return 0
+        return self._activity_coverage(index, student_id)[0]
+
+    def get_student_progress(self, student_id: int, grade_level: str = "ICS3U") -> Dict:
         """
         Analyzes student's progress against curriculum expectations
         Returns progress report with completed and pending expectations
         """
-        # This would integrate with the database to get student's completed activities
-        # For now, return a template structure
+        index = self.get_index(grade_level)
+        if index is None:
+            return {
+                "grade_level": grade_level,
+                "completed_expectations": [],
+                "pending_expectations": [],
+                "progress_percentage": 0
+            }
+
+        covered, _ = self._activity_coverage(index, student_id)
+        total = len(index.leaves)
         return {
             "grade_level": grade_level,
-            "completed_expectations": [],
-            "pending_expectations": list(self.curriculum_expectations[grade_level].values()),
-            "progress_percentage": 0
+            "completed_expectations": index.codes(covered),
+            "pending_expectations": index.codes(index.full_mask & ~covered),
+            "progress_percentage": round(100 * bin(covered).count('1') / total, 1) if total else 0
         }
 
-    def suggest_next_activities(self, student_id: int, grade_level: str = "ICS4U") -> List[str]:
+    def suggest_next_activities(self, student_id: int, grade_level: str = "ICS3U", limit: int = 5) -> List[int]:
         """
         Suggests next activities based on curriculum progression
-        Returns list of recommended activity IDs
+        Returns list of recommended activity IDs, those covering the most pending expectations first
         """
-        # This would integrate with the activity recommendation system
-        # For now, return empty list
-        return []
+        index = self.get_index(grade_level)
+        if index is None:
+            return []
+
+        covered, remaining = self._activity_coverage(index, student_id)
+        pending = index.full_mask & ~covered
+        ranked = sorted(
+            ((bin(mask & pending).count('1'), sequence, activity_id)
+             for activity_id, sequence, mask in remaining if mask & pending),
+            key=lambda item: (-item[0], item[1] if item[1] is not None else float('inf'), item[2])
+        )
+        return [activity_id for _, _, activity_id in ranked[:limit]]
+
+# Initialize checker only when needed
+curriculum_checker: Optional[CurriculumChecker] = None
+_checker_lock = threading.Lock()
+
+def get_curriculum_checker() -> CurriculumChecker:
+    global curriculum_checker
+    with _checker_lock:
+        if curriculum_checker is None:
+            curriculum_checker = CurriculumChecker()
+    return curriculum_checker
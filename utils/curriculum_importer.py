@@ -4,9 +4,50 @@ Parses and imports Ontario CS curriculum data into the database
 """
 import re
 import logging
-from typing import Dict, List, Tuple
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+from sqlalchemy import delete, insert, select, update
 from app import db
 from models.curriculum import Course, Strand, OverallExpectation, SpecificExpectation
+from utils.curriculum_snapshots import publish_snapshots
+
+LEVELS = ('courses', 'strands', 'overall_expectations', 'specific_expectations')
+FIELDS = {
+    'courses': ('title_en', 'title_fr', 'description_en', 'description_fr'),
+    'strands': ('title_en', 'title_fr'),
+    'overall_expectations': ('description_en', 'description_fr'),
+    'specific_expectations': ('description_en', 'description_fr'),
+}
+REQUIRED = {
+    'courses': ('title_en', 'title_fr'),
+    'strands': FIELDS['strands'],
+    'overall_expectations': FIELDS['overall_expectations'],
+    'specific_expectations': FIELDS['specific_expectations'],
+}
+PARENT_COLUMNS = {
+    'strands': 'course_id',
+    'overall_expectations': 'strand_id',
+    'specific_expectations': 'overall_expectation_id',
+}
+# Rows per INSERT or IN list, well under SQLite's bound parameter limit
+CHUNK_SIZE = 100
+
+def _chunks(items: List[Any]) -> Iterator[List[Any]]:
+    for i in range(0, len(items), CHUNK_SIZE):
+        yield items[i:i + CHUNK_SIZE]
+
+def _changes(row, node: Dict[str, Any], fields: Tuple[str, ...]) -> Dict[str, Any]:
+    return {f: node[f] for f in fields if node.get(f) is not None and row[f] != node[f]}
+
+def _insert_values(node: Dict[str, Any], level: str, code: str) -> Dict[str, Any]:
+    """Values for a new row; required text missing from the tree falls back to the other language, then the code"""
+    defaults = node.get('defaults', {})
+    values = {f: node[f] if node.get(f) is not None else defaults.get(f) for f in FIELDS[level]}
+    fallback = next((v for v in values.values() if v), code)
+    # Titles and descriptions may not be empty (see the check constraints in models/curriculum.py)
+    for f in REQUIRED[level]:
+        values[f] = values[f] or fallback
+    return {f: v for f, v in values.items() if v is not None}
 
 class CurriculumImporter:
     def __init__(self) -> None:
@@ -50,85 +91,201 @@ class CurriculumImporter:
 
         return None, None, None, None
 
-    def import_curriculum(self, content: str, course_code: str = "ICS3U") -> None:
-        """Import curriculum content into database"""
+    def parse_curriculum(self, content: str, course_code: str = "ICS3U") -> Dict[str, Any]:
+        """
+        Parse a curriculum document into a course tree for bulk_import.
+        The document only carries French descriptions, so English fields are
+        left as None and keep whatever the database already has.
+        """
+        tree = {
+            'code': course_code,
+            # Only used when the course does not exist yet
+            'defaults': {
+                'title_fr': f'Introduction au génie informatique, {course_code[-2:]}e année',
+                'title_en': f'Introduction to Computer Science, Grade {course_code[-2:]}'
+            },
+            'strands': {}
+        }
+        skipped = 0
+        for line in content.split('\n'):
+            strand_code, overall_code, specific_code, description = self.parse_expectation(line)
+            if not strand_code:
+                continue
+            strand = tree['strands'].setdefault(strand_code, {'overall': {}})
+            if not specific_code:
+                strand['overall'].setdefault(overall_code, {'specifics': {}})['description_fr'] = description
+            elif overall_code in strand['overall']:
+                strand['overall'][overall_code]['specifics'][specific_code] = {'description_fr': description}
+            else:
+                skipped += 1
+                self.logger.warning(f"Skipping specific expectation {specific_code} - parent {overall_code} not found")
+        if skipped:
+            self.logger.warning(f"Skipped {skipped} specific expectations without a parent")
+        return tree
+
+    def import_curriculum(self, content: str, course_code: str = "ICS3U") -> Dict[str, Any]:
+        """Import curriculum content into database; returns the bulk_import statistics"""
+        started = time.perf_counter()
+        tree = self.parse_curriculum(content, course_code)
+        parse_seconds = time.perf_counter() - started
+        stats = self.bulk_import(tree)
+        stats['timings']['parse'] = round(parse_seconds, 4)
+        return stats
+
+    def bulk_import(self, tree: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Bring one course in the database in line with a course tree, in one transaction.
+
+        tree is {'code', 'title_en', ..., 'strands': {code: {'title_en', ...,
+        'overall': {code: {'description_en', ..., 'specifics': {code: {...}}}}}}}.
+        Rows are matched by code under their parent. New rows are inserted with
+        one multi-row INSERT ... RETURNING per table, changed rows are updated
+        in one bulk UPDATE per table and rows missing from the tree are deleted,
+        so importing an unchanged course writes nothing. Fields that are absent
+        or None are left as they are.
+        """
+        started = time.perf_counter()
+        stats: Dict[str, Any] = {level: dict.fromkeys(('inserted', 'updated', 'unchanged', 'deleted'), 0)
+                                 for level in LEVELS}
         try:
-            # Initialize tracking dictionaries
-            strands = {}  # key: strand_code, value: Strand object
-            overall_expectations = {}  # key: overall_code, value: OverallExpectation object
+            course_id = self._sync_course(tree, stats)
+            existing = self._load_existing(course_id)
+            loaded = time.perf_counter()
 
-            with db.session.begin():
-                # Clear existing course data
-                Course.query.filter_by(code=course_code).delete()
-                db.session.commit()
-                self.logger.debug(f"Cleared existing {course_code} data")
-
-                # Create course
-                course = Course(
-                    code=course_code,
-                    title_fr=f'Introduction au génie informatique, {course_code[-2:]}e année',
-                    title_en=f'Introduction to Computer Science, Grade {course_code[-2:]}'
-                )
-                db.session.add(course)
-                db.session.flush()
-                self.logger.debug(f"Created course: {course.code}")
-
-                # Process each line
-                lines = [line for line in content.split('\n') if line.strip()]
-                for line in lines:
-                    strand_code, overall_code, specific_code, description = self.parse_expectation(line)
-                    if not strand_code:
-                        continue
-
-                    # Create strand if needed
-                    if strand_code not in strands:
-                        strand = Strand(
-                            course_id=course.id,
-                            code=strand_code,
-                            title_fr='',  # Will be filled later if needed
-                            title_en=''
-                        )
-                        db.session.add(strand)
-                        db.session.flush()
-                        strands[strand_code] = strand
-                        self.logger.debug(f"Created strand: {strand_code}")
-
-                    # Handle overall expectation
-                    if overall_code and not specific_code:
-                        overall = OverallExpectation(
-                            strand_id=strands[strand_code].id,
-                            code=overall_code,
-                            description_fr=description,
-                            description_en=''
-                        )
-                        db.session.add(overall)
-                        db.session.flush()
-                        overall_expectations[overall_code] = overall
-                        self.logger.debug(f"Created overall expectation: {overall_code}")
-
-                    # Handle specific expectation
-                    elif specific_code:
-                        if overall_code not in overall_expectations:
-                            self.logger.warning(f"Skipping specific expectation {specific_code} - parent {overall_code} not found")
-                            continue
-
-                        specific = SpecificExpectation(
-                            overall_expectation_id=overall_expectations[overall_code].id,
-                            code=specific_code,
-                            description_fr=description,
-                            description_en=''
-                        )
-                        db.session.add(specific)
-                        self.logger.debug(f"Created specific expectation: {specific_code}")
-
-                db.session.commit()
-                self.logger.info("Curriculum import completed successfully")
+            strand_ids = self._sync_level(
+                Strand, {(course_id, code): node for code, node in tree.get('strands', {}).items()},
+                existing['strands'], stats
+            )
+            overall_ids = self._sync_level(
+                OverallExpectation,
+                {(strand_ids[(course_id, strand_code)], code): node
+                 for strand_code, strand in tree.get('strands', {}).items()
+                 for code, node in strand.get('overall', {}).items()},
+                existing['overall_expectations'], stats
+            )
+            self._sync_level(
+                SpecificExpectation,
+                {(overall_ids[(strand_ids[(course_id, strand_code)], overall_code)], code): node
+                 for strand_code, strand in tree.get('strands', {}).items()
+                 for overall_code, overall in strand.get('overall', {}).items()
+                 for code, node in overall.get('specifics', {}).items()},
+                existing['specific_expectations'], stats
+            )
+            # Children first, so no row is left pointing at a deleted parent
+            for model in (SpecificExpectation, OverallExpectation, Strand):
+                stale = stats.pop(f'_stale_{model.__tablename__}', [])
+                for chunk in _chunks(stale):
+                    db.session.execute(delete(model).where(model.id.in_(chunk)))
+                stats[model.__tablename__]['deleted'] = len(stale)
 
+            db.session.commit()
         except Exception as e:
             self.logger.error(f"Import failed: {str(e)}")
             db.session.rollback()
             raise
 
+        finished = time.perf_counter()
+        stats['changed'] = any(stats[level][kind] for level in LEVELS
+                               for kind in ('inserted', 'updated', 'deleted'))
+        stats['timings'] = {'load': round(loaded - started, 4), 'write': round(finished - loaded, 4)}
+        summary = ', '.join(f"{level}: {counts['inserted']} inserted, {counts['updated']} updated, "
+                            f"{counts['unchanged']} unchanged, {counts['deleted']} deleted"
+                            for level, counts in ((level, stats[level]) for level in LEVELS))
+        self.logger.info(f"Imported {tree['code']} in {finished - started:.3f}s ({summary})")
+
+        self.publish_snapshots()
+        return stats
+
+    def _sync_course(self, tree: Dict[str, Any], stats: Dict[str, Any]) -> int:
+        row = db.session.execute(
+            select(Course.id, *[getattr(Course, f) for f in FIELDS['courses']])
+            .where(Course.code == tree['code'])
+        ).mappings().first()
+        if row is None:
+            course_id = db.session.execute(
+                insert(Course).values(code=tree['code'], **_insert_values(tree, 'courses', tree['code']))
+                .returning(Course.id)
+            ).scalar_one()
+            stats['courses']['inserted'] = 1
+            return course_id
+
+        changes = _changes(row, tree, FIELDS['courses'])
+        if changes:
+            db.session.execute(update(Course), [{'id': row['id'], **changes}])
+            stats['courses']['updated'] = 1
+        else:
+            stats['courses']['unchanged'] = 1
+        return row['id']
+
+    def _load_existing(self, course_id: int) -> Dict[str, Dict[Tuple[int, str], Any]]:
+        """Current rows of the course keyed by (parent id, code), one query per table"""
+        queries = {
+            'strands': select(Strand.id, Strand.course_id.label('parent_id'), Strand.code,
+                              Strand.title_en, Strand.title_fr)
+                .where(Strand.course_id == course_id),
+            'overall_expectations': select(OverallExpectation.id, OverallExpectation.strand_id.label('parent_id'),
+                                           OverallExpectation.code, OverallExpectation.description_en,
+                                           OverallExpectation.description_fr)
+                .join(Strand, Strand.id == OverallExpectation.strand_id)
+                .where(Strand.course_id == course_id),
+            'specific_expectations': select(SpecificExpectation.id,
+                                            SpecificExpectation.overall_expectation_id.label('parent_id'),
+                                            SpecificExpectation.code, SpecificExpectation.description_en,
+                                            SpecificExpectation.description_fr)
+                .join(OverallExpectation, OverallExpectation.id == SpecificExpectation.overall_expectation_id)
+                .join(Strand, Strand.id == OverallExpectation.strand_id)
+                .where(Strand.course_id == course_id),
+        }
+        return {
+            level: {(row['parent_id'], row['code']): row for row in db.session.execute(query).mappings()}
+            for level, query in queries.items()
+        }
+
+    def _sync_level(self, model, wanted: Dict[Tuple[int, str], Dict[str, Any]],
+                    existing: Dict[Tuple[int, str], Any], stats: Dict[str, Any]) -> Dict[Tuple[int, str], int]:
+        """Insert, update and mark for deletion one table; returns ids keyed by (parent id, code)"""
+        level = model.__tablename__
+        fields = FIELDS[level]
+        parent_column = PARENT_COLUMNS[level]
+        ids: Dict[Tuple[int, str], int] = {}
+        new_rows, updates = [], []
+
+        for key, node in wanted.items():
+            row = existing.get(key)
+            if row is None:
+                new_rows.append({parent_column: key[0], 'code': key[1], **_insert_values(node, level, key[1])})
+                continue
+            ids[key] = row['id']
+            changes = _changes(row, node, fields)
+            if changes:
+                updates.append({'id': row['id'], **changes})
+            else:
+                stats[level]['unchanged'] += 1
+
+        for chunk in _chunks(new_rows):
+            returned = db.session.execute(
+                insert(model).values(chunk)
+                .returning(model.id, getattr(model, parent_column), model.code)
+            )
+            for row_id, parent_id, code in returned:
+                ids[(parent_id, code)] = row_id
+        if updates:
+            db.session.execute(update(model), updates)
+
+        stats[level]['inserted'] = len(new_rows)
+        stats[level]['updated'] = len(updates)
+        stats[f'_stale_{level}'] = [row['id'] for key, row in existing.items() if key not in wanted]
+        return ids
+
+    def publish_snapshots(self) -> None:
+        """Regenerate the published curriculum snapshots"""
+        try:
+            stats = publish_snapshots()
+            self.logger.info(f"Published curriculum snapshots for {stats['courses']} courses")
+        except Exception as e:
+            # The import itself succeeded; pages fall back to the database until the next publish
+            self.logger.error(f"Snapshot publish failed: {str(e)}")
+
     def clear_existing_data(self, course_code: str = "ICS3U") -> None:
         """Clear existing curriculum data"""
         try:
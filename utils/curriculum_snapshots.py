@@ -0,0 +1,172 @@
+"""
+Published curriculum snapshots.
+
+publish_snapshots writes each course's English and French documents as
+immutable files named by their content hash, e.g. ICS3U.3f2a9c1d7b4e.fr.json,
+next to gzip and (when brotli is installed) brotli variants, then points
+manifest.json at the current files. The import scripts publish at the end
+of every run, so curriculum pages are served from these files without
+touching the database.
+
+The manifest records the curriculum version it was built from (see
+utils/curriculum_tree.py). A later change that was not published makes the
+manifest stale, and the routes fall back to the database until the next
+publish.
+"""
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select
+from app import db
+from models.curriculum import Course
+from utils import curriculum_tree
+from utils.curriculum_tree import LANGUAGES, CourseJson, load_course_tree
+from utils.memory_state import write_json_atomic
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.environ.get(
+    'CURRICULUM_SNAPSHOT_DIR', os.path.join(os.getcwd(), 'instance', 'curriculum')
+)
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+SNAPSHOT_NAME = re.compile(r'^[A-Za-z0-9]+\.[0-9a-f]{%d}\.(en|fr)\.json$' % HASH_LENGTH)
+# Preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+def _write_once(path: str, data: bytes):
+    # Snapshot files are content-addressed, so an existing file is already correct
+    if os.path.exists(path):
+        return
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def _write_snapshot(directory: str, course_code: str, lang: str, tree: Dict[str, Any]) -> str:
+    document = CourseJson(tree)
+    name = f"{course_code}.{document.etag[:HASH_LENGTH]}.{lang}.json"
+    path = os.path.join(directory, name)
+    _write_once(path, document.body)
+    _write_once(f"{path}.gz", gzip.compress(document.body, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _write_once(f"{path}.br", brotli.compress(document.body, quality=11))
+    return name
+
+def _read_manifest(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not read curriculum manifest {path}: {e}")
+        return None
+
+def _referenced(manifest: Optional[Dict[str, Any]]) -> set:
+    if not manifest:
+        return set()
+    return {name for course in manifest.get('courses', []) for name in course['files'].values()}
+
+def publish_snapshots(directory: Optional[str] = None) -> Dict[str, Any]:
+    """Write snapshots of every course and point the manifest at them"""
+    directory = directory or SNAPSHOT_DIR
+    os.makedirs(directory, exist_ok=True)
+    # Read first: a change committed while publishing leaves the manifest stale, not wrong
+    version = curriculum_tree.curriculum_version()
+
+    courses = []
+    for code in db.session.execute(select(Course.code).order_by(Course.code)).scalars():
+        trees = load_course_tree(code)
+        if trees is None:
+            continue
+        courses.append({
+            'code': code,
+            'title_en': trees['en']['title'],
+            'title_fr': trees['fr']['title'],
+            'files': {lang: _write_snapshot(directory, code, lang, trees[lang]) for lang in LANGUAGES}
+        })
+
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    manifest = {'version': version, 'courses': courses}
+    previous = _read_manifest(manifest_path)
+    write_json_atomic(manifest_path, manifest)
+
+    # Keep the previous generation for pages rendered before this publish
+    keep = _referenced(manifest) | _referenced(previous)
+    removed = 0
+    for name in os.listdir(directory):
+        base = name[:-3] if name.endswith(('.gz', '.br')) else name
+        if SNAPSHOT_NAME.match(base) and base not in keep:
+            try:
+                os.remove(os.path.join(directory, name))
+                removed += 1
+            except OSError as e:
+                logger.warning(f"Could not remove old snapshot {name}: {e}")
+
+    logger.info(f"Published curriculum snapshots for {len(courses)} courses to {directory}")
+    return {'courses': len(courses), 'version': version, 'removed': removed}
+
+def _file_key(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+        return stat.st_ino, stat.st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+class SnapshotStore:
+    """The current manifest, reloaded when it or the curriculum version changes"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or SNAPSHOT_DIR
+        self._key = None
+        self._courses: Optional[Dict[str, Dict[str, Any]]] = None
+        self._lock = threading.Lock()
+
+    def _current(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        key = (_file_key(manifest_path), _file_key(curriculum_tree.CURRICULUM_VERSION_FILE))
+        with self._lock:
+            if key != self._key:
+                manifest = _read_manifest(manifest_path)
+                if manifest is not None and manifest.get('version') == curriculum_tree.curriculum_version():
+                    self._courses = {course['code']: course for course in manifest['courses']}
+                else:
+                    if manifest is not None:
+                        logger.info("Curriculum snapshots are stale, serving from the database")
+                    self._courses = None
+                self._key = key
+            return self._courses
+
+    def courses(self) -> Optional[List[Dict[str, Any]]]:
+        """Courses of the current snapshot, None if there is none"""
+        courses = self._current()
+        return None if courses is None else list(courses.values())
+
+    def snapshot_name(self, course_code: str, lang: str) -> Optional[str]:
+        courses = self._current()
+        course = courses.get(course_code) if courses is not None else None
+        return course['files'].get(lang) if course else None
+
+    def variant(self, name: str, accept_encodings) -> Optional[Tuple[str, Optional[str]]]:
+        """Path and Content-Encoding of the best variant the client accepts"""
+        if not SNAPSHOT_NAME.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            return None
+        for encoding, suffix in ENCODINGS:
+            if accept_encodings[encoding] and os.path.exists(path + suffix):
+                return path + suffix, encoding
+        return path, None
+
+snapshot_store = SnapshotStore()
@@ -0,0 +1,164 @@
+"""
+Cached curriculum trees.
+
+A course's strands, overall and specific expectations are loaded with one
+joined, ordered SELECT and turned into the English and French JSON
+documents at the same time. The serialized bytes and their ETag are kept
+in memory until the curriculum changes.
+
+Curriculum data only changes when an import or update script runs, often
+in another process, so changes are signalled through a version stamp
+file: committing any change to a curriculum model rewrites it (see the
+session listeners in models/curriculum.py), and each lookup compares the
+stamp's inode and mtime with the ones the cache was built against.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy import func, select
+from app import db
+from models.curriculum import Course, Strand, OverallExpectation, SpecificExpectation
+
+logger = logging.getLogger(__name__)
+
+CURRICULUM_VERSION_FILE = os.environ.get(
+    'CURRICULUM_VERSION_FILE', os.path.join(os.getcwd(), 'instance', 'curriculum.version')
+)
+LANGUAGES = ('en', 'fr')
+
+class CourseJson:
+    """Serialized course document and its ETag"""
+    __slots__ = ('body', 'etag')
+
+    def __init__(self, data: Dict[str, Any]):
+        self.body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+
+def load_course_tree(course_code: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Build the course document in every language from one query; None if no such course"""
+    rows = db.session.execute(
+        select(Course, Strand, OverallExpectation, SpecificExpectation)
+        .outerjoin(Strand, Strand.course_id == Course.id)
+        .outerjoin(OverallExpectation, OverallExpectation.strand_id == Strand.id)
+        .outerjoin(SpecificExpectation, SpecificExpectation.overall_expectation_id == OverallExpectation.id)
+        .where(Course.code == course_code)
+        .order_by(func.upper(Strand.code), func.upper(OverallExpectation.code),
+                  func.upper(SpecificExpectation.code))
+    ).all()
+    if not rows:
+        return None
+
+    course = rows[0][0]
+    trees = {
+        lang: {
+            'code': course.code,
+            'title': getattr(course, f'title_{lang}'),
+            'description': getattr(course, f'description_{lang}'),
+            'strands': []
+        }
+        for lang in LANGUAGES
+    }
+    strand_nodes: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    overall_nodes: Dict[Tuple[str, int], Dict[str, Any]] = {}
+
+    for _, strand, overall, specific in rows:
+        for lang in LANGUAGES:
+            if strand is None:
+                continue
+            strand_node = strand_nodes.get((lang, strand.id))
+            if strand_node is None:
+                strand_node = strand_nodes[(lang, strand.id)] = {
+                    'code': strand.code.upper(),
+                    'title': getattr(strand, f'title_{lang}'),
+                    'overall_expectations': []
+                }
+                trees[lang]['strands'].append(strand_node)
+            if overall is None:
+                continue
+            overall_node = overall_nodes.get((lang, overall.id))
+            if overall_node is None:
+                overall_node = overall_nodes[(lang, overall.id)] = {
+                    'code': overall.code,
+                    'description': getattr(overall, f'description_{lang}'),
+                    'specific_expectations': []
+                }
+                strand_node['overall_expectations'].append(overall_node)
+            if specific is not None:
+                overall_node['specific_expectations'].append({
+                    'code': specific.code,
+                    'description': getattr(specific, f'description_{lang}')
+                })
+    return trees
+
+def _stamp() -> Tuple[int, int]:
+    # The stamp is replaced by rename, so its inode changes even within one mtime tick
+    try:
+        stat = os.stat(CURRICULUM_VERSION_FILE)
+        return stat.st_ino, stat.st_mtime_ns
+    except FileNotFoundError:
+        return 0, 0
+
+def curriculum_version() -> str:
+    """Token rewritten on every committed curriculum change; empty before the first"""
+    try:
+        with open(CURRICULUM_VERSION_FILE, 'r') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ''
+
+class CurriculumTreeCache:
+    """Serialized course documents keyed by course code and language"""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], CourseJson] = {}
+        self._stamp = _stamp()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, course_code: str, lang: str) -> Optional[CourseJson]:
+        lang = lang if lang in LANGUAGES else 'en'
+        stamp = _stamp()
+        with self._lock:
+            if stamp != self._stamp:
+                self._entries.clear()
+                self._stamp = stamp
+            entry = self._entries.get((course_code, lang))
+            if entry is not None:
+                self.hits += 1
+                return entry
+
+        trees = load_course_tree(course_code)
+        with self._lock:
+            self.misses += 1
+            if _stamp() != stamp:
+                # Changed while loading; serve this result but do not keep it
+                return CourseJson(trees[lang]) if trees else None
+            if trees is None:
+                # Not cached: codes come from URLs, so remembering misses would grow without bound
+                return None
+            for tree_lang, tree in trees.items():
+                self._entries[(course_code, tree_lang)] = CourseJson(tree)
+            logger.debug(f"Cached curriculum tree for {course_code}")
+            return self._entries[(course_code, lang)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._stamp = _stamp()
+
+def invalidate_curriculum_cache():
+    """Mark cached curriculum trees stale in every process"""
+    os.makedirs(os.path.dirname(CURRICULUM_VERSION_FILE), exist_ok=True)
+    temp_path = f"{CURRICULUM_VERSION_FILE}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, 'w') as f:
+        f.write(uuid.uuid4().hex)
+    os.replace(temp_path, CURRICULUM_VERSION_FILE)
+    curriculum_cache.clear()
+    logger.info("Curriculum cache invalidated")
+
+curriculum_cache = CurriculumTreeCache()
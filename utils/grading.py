@@ -0,0 +1,183 @@
+"""
+Batch grading of a submission against an activity's test cases.
+
+A submission is compiled once; every test case then runs the same binary
+as a separate sandboxed process, several at a time, with its input on
+stdin and its stdout compared with the expected output.
+
+Test cases are stored in CodingActivity.test_cases as a list of
+{"input": str, "expected_output": str} objects, optionally with a
+"name" and a per-case "timeout" in seconds.
+"""
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from utils.cpp_compiler import get_cpp_compiler
+from utils.csharp_build import build_csharp
+from utils.sandbox import SandboxLimits, sandboxed_popen
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CASE_TIMEOUT = 5
+MAX_GRADING_WORKERS = 8
+MAX_OUTPUT_CHARS = 2000  # Per case, in the returned result
+# Not compiler_workspace: ResourceMonitor would delete a directory mid-grade
+GRADING_DIR = os.path.join(os.getcwd(), 'instance', 'grading')
+
+def normalize_output(text: str) -> str:
+    """Compare outputs line by line, ignoring trailing whitespace"""
+    lines = text.replace('\r\n', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip('\n')
+
+def compile_once(code: str, language: str, output_dir: Path, timeout: float = 30) -> Dict[str, Any]:
+    """Compile a submission and return the command that runs it"""
+    if language == 'cpp':
+        result = get_cpp_compiler().compile(code, output_dir, timeout)
+        result['limits'] = SandboxLimits(runtime='native')
+        return result
+
+    if language != 'csharp':
+        return {'success': False, 'error': f"Unsupported language: {language}"}
+
+    # Same backend selection and build pool fallback as interactive runs
+    result = build_csharp(code, output_dir, timeout)
+    if result['success']:
+        result['limits'] = SandboxLimits()
+    return result
+
+def run_case(command: List[str], case: Dict[str, Any], index: int, cwd: str,
+             limits: Optional[SandboxLimits] = None) -> Dict[str, Any]:
+    """Run one test case against the compiled program"""
+    name = case.get('name') or f"Test {index + 1}"
+    timeout = case.get('timeout', DEFAULT_CASE_TIMEOUT)
+    expected = case.get('expected_output', '')
+    start = time.time()
+    try:
+        process = sandboxed_popen(
+            command,
+            limits=limits,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            cwd=cwd,
+            env={**os.environ, 'DOTNET_NOLOGO': 'true', 'DOTNET_CLI_TELEMETRY_OPTOUT': 'true'}
+        )
+    except Exception as e:
+        logger.error(f"Failed to start test case {name}: {e}")
+        return {'name': name, 'passed': False, 'status': 'error', 'error': str(e), 'time': 0.0}
+
+    try:
+        stdout, stderr = process.communicate(input=case.get('input', ''), timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        stdout, stderr = process.communicate()
+        return {
+            'name': name,
+            'passed': False,
+            'status': 'timeout',
+            'error': f"Timed out after {timeout}s",
+            'time': time.time() - start,
+            'actual_output': stdout[:MAX_OUTPUT_CHARS]
+        }
+
+    elapsed = time.time() - start
+    passed = process.returncode == 0 and normalize_output(stdout) == normalize_output(expected)
+    if passed:
+        status = 'passed'
+    elif process.returncode != 0:
+        status = 'error'
+    else:
+        status = 'failed'
+
+    result = {
+        'name': name,
+        'passed': passed,
+        'status': status,
+        'time': elapsed,
+        'exit_code': process.returncode,
+        'usage': process.usage()
+    }
+    if not passed:
+        result['expected_output'] = expected[:MAX_OUTPUT_CHARS]
+        result['actual_output'] = stdout[:MAX_OUTPUT_CHARS]
+        if stderr:
+            result['error'] = stderr[:MAX_OUTPUT_CHARS]
+    return result
+
+def grade_submission(code: str, language: str, test_cases: List[Dict[str, Any]],
+                     stop_on_failure: bool = False, max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """Compile once and run every test case in parallel against the binary"""
+    if not code:
+        return {'success': False, 'error': "No code provided"}
+    if not test_cases:
+        return {'success': False, 'error': "Activity has no test cases"}
+
+    start = time.time()
+    os.makedirs(GRADING_DIR, exist_ok=True)
+    work_dir = Path(tempfile.mkdtemp(prefix='grade_', dir=GRADING_DIR))
+    try:
+        compiled = compile_once(code, language, work_dir / 'bin')
+        if not compiled['success']:
+            return {
+                'success': False,
+                'error': compiled['error'],
+                'diagnostics': compiled.get('diagnostics', [])
+            }
+
+        workers = max_workers or min(len(test_cases), os.cpu_count() or 2, MAX_GRADING_WORKERS)
+        stop = threading.Event()
+
+        def run(index: int, case: Dict[str, Any]) -> Dict[str, Any]:
+            if stop.is_set():
+                return {'name': case.get('name') or f"Test {index + 1}", 'passed': False,
+                        'status': 'skipped', 'time': 0.0}
+            result = run_case(compiled['command'], case, index, str(work_dir), compiled.get('limits'))
+            if stop_on_failure and not result['passed']:
+                stop.set()
+            return result
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='grader') as executor:
+            results = list(executor.map(run, range(len(test_cases)), test_cases))
+
+        passed = sum(1 for r in results if r['passed'])
+        total_time = time.time() - start
+        logger.info(f"Graded {len(test_cases)} cases with {workers} workers in {total_time:.2f}s: "
+                    f"{passed} passed")
+        return {
+            'success': True,
+            'passed': passed,
+            'total': len(test_cases),
+            'all_passed': passed == len(test_cases),
+            'score': passed / len(test_cases),
+            'results': results,
+            'compilation_time': compiled.get('compilation_time', 0.0),
+            'cached': compiled.get('cached', False),
+            'total_time': total_time
+        }
+    except Exception as e:
+        logger.error(f"Grading failed: {e}", exc_info=True)
+        return {'success': False, 'error': str(e)}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def activity_language(activity) -> str:
+    """Grading language name for a CodingActivity"""
+    language = (activity.language or 'csharp').lower()
+    if language in ('c++', 'cpp'):
+        return 'cpp'
+    if language in ('c#', 'cs', 'csharp'):
+        return 'csharp'
+    return language
+
+def grade_activity(activity, code: str, stop_on_failure: bool = False) -> Dict[str, Any]:
+    """Grade a submission against a CodingActivity's test cases"""
+    return grade_submission(code, activity_language(activity), activity.test_cases or [],
+                            stop_on_failure=stop_on_failure)
@@ -0,0 +1,191 @@
+"""
+Append-only JSON Lines event log.
+
+Callers hand records to JsonlWriter.write, which only puts them on a
+bounded queue; a background thread serializes them one per line onto the
+active segment. The segment is rotated once it reaches a size or age
+limit, rotated segments are optionally gzipped, and only the newest
+max_segments are kept. read_events and session_timeline read the
+segments back in order, compressed or not.
+"""
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LOG_MAX_BYTES = int(os.environ.get('EVENT_LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_MAX_AGE = int(os.environ.get('EVENT_LOG_MAX_AGE', 3600))  # Seconds
+LOG_MAX_SEGMENTS = int(os.environ.get('EVENT_LOG_MAX_SEGMENTS', 50))
+LOG_QUEUE_SIZE = 10000
+FLUSH_INTERVAL = 0.5
+
+class JsonlWriter:
+    """Writes queued records to rotating JSON Lines segments from one thread"""
+
+    def __init__(self, directory: str, name: str = 'events', max_bytes: int = LOG_MAX_BYTES,
+                 max_age: float = LOG_MAX_AGE, compress: bool = True,
+                 max_segments: int = LOG_MAX_SEGMENTS, max_queue: int = LOG_QUEUE_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.name = name
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compress = compress
+        self.max_segments = max_segments
+        self.flush_interval = flush_interval
+        self.active_path = self.directory / f"{name}.jsonl"
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._file = None
+        self._opened_at = 0.0
+        self._size = 0
+        self._sequence = 0
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self._thread = threading.Thread(target=self._run, name=f'jsonl-{name}', daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict[str, Any]) -> bool:
+        """Queue a record; False if the queue was full and it was dropped"""
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def _open(self):
+        self._file = open(self.active_path, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+        # An existing active segment is continued; its age restarts with the process
+        self._opened_at = time.time()
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        self._sequence += 1
+        stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+        rotated = self.directory / f"{self.name}-{stamp}-{self._sequence:04d}.jsonl"
+        os.replace(self.active_path, rotated)
+        if self.compress:
+            with open(rotated, 'rb') as source, gzip.open(f"{rotated}.gz", 'wb') as target:
+                shutil.copyfileobj(source, target)
+            rotated.unlink()
+        self.rotations += 1
+
+        rotated_segments = [path for path in segment_paths(self.directory, self.name)
+                            if path != self.active_path]
+        for old in rotated_segments[:max(0, len(rotated_segments) - self.max_segments)]:
+            try:
+                old.unlink()
+            except OSError as e:
+                logger.warning(f"Could not remove old log segment {old}: {e}")
+
+    def _write_batch(self, records: List[Dict[str, Any]]):
+        if self._file is None:
+            self._open()
+        for record in records:
+            line = json.dumps(record, default=str, separators=(',', ':')) + '\n'
+            self._file.write(line)
+            self._size += len(line)
+            if self._size >= self.max_bytes:
+                self._file.flush()
+                self._rotate()
+                self._open()
+        self._file.flush()
+        if self._size and time.time() - self._opened_at >= self.max_age:
+            self._rotate()
+            self._open()
+
+    def _run(self):
+        while True:
+            try:
+                records = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                if self._stopping.is_set():
+                    break
+                continue
+            while len(records) < 1000:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(records)
+                with self._lock:
+                    self.written += len(records)
+            except Exception as e:
+                logger.error(f"Failed to write {len(records)} log records: {e}")
+            finally:
+                for _ in records:
+                    self._queue.task_done()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def flush(self, timeout: float = 5) -> bool:
+        """Wait until every queued record has reached the file"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout: float = 5):
+        self.flush(timeout)
+        self._stopping.set()
+        self._thread.join(timeout=timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'written': self.written,
+                'dropped': self.dropped,
+                'rotations': self.rotations
+            }
+
+def segment_paths(directory: str, name: str = 'events') -> List[Path]:
+    """Segments oldest first, the active segment last"""
+    directory = Path(directory)
+    rotated = sorted(
+        list(directory.glob(f"{name}-*.jsonl")) + list(directory.glob(f"{name}-*.jsonl.gz")),
+        key=lambda path: path.name.split('.')[0]
+    )
+    active = directory / f"{name}.jsonl"
+    return rotated + ([active] if active.exists() else [])
+
+def read_events(directory: str, name: str = 'events', session_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Records from every segment in write order, optionally for one session"""
+    for path in segment_paths(directory, name):
+        opener = gzip.open if path.suffix == '.gz' else open
+        try:
+            with opener(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A line cut short by a crash
+                        continue
+                    if session_id is None or record.get('session_id') == session_id:
+                        yield record
+        except (OSError, EOFError) as e:
+            logger.warning(f"Could not read log segment {path}: {e}")
+
+def session_timeline(directory: str, session_id: str, name: str = 'events') -> List[Dict[str, Any]]:
+    """All events of one session, ordered by timestamp"""
+    return sorted(read_events(directory, name, session_id), key=lambda r: r.get('timestamp', ''))
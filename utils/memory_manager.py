@@ -6,7 +6,6 @@ error handling, automatic versioning, and intelligent context summarization.
 """
 
 import os
-import json
 import shutil
 import gzip
 from datetime import datetime, timedelta
@@ -17,8 +16,8 @@ import logging
 from functools import lru_cache
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+from utils.context_index import ContextIndex
+from utils.memory_state import MemoryStateStore
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +39,8 @@ class MemoryManager:
         self.relevance_file = os.path.join(self.base_dir, 'context_relevance.json')
         self.cache = {}
         self.relevance_scores: Dict[str, ContextRelevance] = {}
-        self.vectorizer = TfidfVectorizer(stop_words='english')
+        self.context_index = ContextIndex(self.base_dir)
+        self.state = MemoryStateStore(self.change_log_file, self.version_file, self.relevance_file)
 
         os.makedirs(self.backup_dir, exist_ok=True)
         self.executor = ThreadPoolExecutor(max_workers=4)
@@ -99,20 +99,7 @@ class MemoryManager:
             return False
 
     def _update_version(self, file_path: str) -> None:
-        try:
-            versions = {}
-            if os.path.exists(self.version_file):
-                with open(self.version_file, 'r') as f:
-                    versions = json.load(f)
-
-            file_name = os.path.basename(file_path)
-            current_version = versions.get(file_name, 0)
-            versions[file_name] = current_version + 1
-
-            with open(self.version_file, 'w') as f:
-                json.dump(versions, f, indent=2)
-        except Exception as e:
-            logger.error(f"Version update failed: {str(e)}")
+        self.state.bump_version(os.path.basename(file_path))
 
     def _check_conflicts(self, file_path: str, new_content: str) -> bool:
         try:
@@ -226,28 +213,13 @@ class MemoryManager:
                 }
             }
 
-            existing_logs = []
-            if os.path.exists(self.change_log_file):
-                with open(self.change_log_file, 'r') as f:
-                    existing_logs = json.load(f)
-
-            existing_logs.append(log_entry)
-
-            with open(self.change_log_file, 'w') as f:
-                json.dump(existing_logs, f, indent=2)
+            self.state.append_change(log_entry)
             logger.info(f"Logged change: {operation} on {os.path.basename(file_path)}")
         except Exception as e:
             logger.error(f"Logging failed: {str(e)}")
 
     def _get_current_version(self, file_path: str) -> int:
-        try:
-            if os.path.exists(self.version_file):
-                with open(self.version_file, 'r') as f:
-                    versions = json.load(f)
-                return versions.get(os.path.basename(file_path), 0)
-            return 0
-        except Exception:
-            return 0
+        return self.state.get_version(os.path.basename(file_path))
 
     def _validate_file_structure(self, file_path: str) -> bool:
         try:
@@ -279,81 +251,86 @@ class MemoryManager:
 
     def update_all_timestamps(self) -> List[str]:
         updated = []
-        for file_name in MEMORY_FILES:
-            file_path = os.path.join(self.base_dir, file_name)
-            if self.update_timestamp(file_path):
-                updated.append(file_name)
+        with self.state.batch():
+            for file_name in MEMORY_FILES:
+                file_path = os.path.join(self.base_dir, file_name)
+                if self.update_timestamp(file_path):
+                    updated.append(file_name)
         return updated
 
     def _load_relevance_scores(self) -> None:
         try:
-            if os.path.exists(self.relevance_file):
-                with open(self.relevance_file, 'r') as f:
-                    data = json.load(f)
-                    for file_name, score_data in data.items():
-                        self.relevance_scores[file_name] = ContextRelevance(
-                            score=score_data['score'],
-                            last_accessed=datetime.fromisoformat(score_data['last_accessed']),
-                            access_count=score_data['access_count'],
-                            importance_weight=score_data['importance_weight']
-                        )
+            for file_name, score_data in self.state.relevance.items():
+                self.relevance_scores[file_name] = ContextRelevance(
+                    score=score_data['score'],
+                    last_accessed=datetime.fromisoformat(score_data['last_accessed']),
+                    access_count=score_data['access_count'],
+                    importance_weight=score_data['importance_weight']
+                )
         except Exception as e:
             logger.error(f"Error loading relevance scores: {str(e)}")
 
     def _save_relevance_scores(self) -> None:
-        try:
-            data = {
-                file_name: {
-                    'score': relevance.score,
-                    'last_accessed': relevance.last_accessed.isoformat(),
-                    'access_count': relevance.access_count,
-                    'importance_weight': relevance.importance_weight
-                }
-                for file_name, relevance in self.relevance_scores.items()
+        self.state.set_relevance({
+            file_name: {
+                'score': relevance.score,
+                'last_accessed': relevance.last_accessed.isoformat(),
+                'access_count': relevance.access_count,
+                'importance_weight': relevance.importance_weight
             }
-            with open(self.relevance_file, 'w') as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            logger.error(f"Error saving relevance scores: {str(e)}")
+            for file_name, relevance in self.relevance_scores.items()
+        })
 
-    def calculate_context_relevance(self, file_path: str, current_context: str) -> float:
-        try:
-            with open(file_path, 'r') as f:
-                content = f.read()
-
-            tfidf_matrix = self.vectorizer.fit_transform([content, current_context])
-            similarity = (tfidf_matrix * tfidf_matrix.T).toarray()[0][1]
+    def _update_relevance(self, file_name: str, similarity: float) -> float:
+        relevance = self.relevance_scores.get(file_name, ContextRelevance(
+            score=0.0,
+            last_accessed=datetime.now(),
+            access_count=0,
+            importance_weight=1.0
+        ))
 
-            file_name = os.path.basename(file_path)
-            relevance = self.relevance_scores.get(file_name, ContextRelevance(
-                score=0.0,
-                last_accessed=datetime.now(),
-                access_count=0,
-                importance_weight=1.0
-            ))
+        relevance.access_count += 1
+        relevance.last_accessed = datetime.now()
 
-            relevance.access_count += 1
-            relevance.last_accessed = datetime.now()
+        time_factor = 1.0 / (1.0 + (datetime.now() - relevance.last_accessed).days)
+        usage_factor = min(1.0, relevance.access_count / 100)
 
-            time_factor = 1.0 / (1.0 + (datetime.now() - relevance.last_accessed).days)
-            usage_factor = min(1.0, relevance.access_count / 100)
+        final_score = (
+            similarity * 0.4 +
+            time_factor * 0.3 +
+            usage_factor * 0.3
+        ) * relevance.importance_weight
 
-            final_score = (
-                similarity * 0.4 +
-                time_factor * 0.3 +
-                usage_factor * 0.3
-            ) * relevance.importance_weight
+        relevance.score = final_score
+        self.relevance_scores[file_name] = relevance
+        return final_score
 
-            relevance.score = final_score
-            self.relevance_scores[file_name] = relevance
+    def calculate_context_relevance(self, file_path: str, current_context: str) -> float:
+        try:
+            similarity = self.context_index.score(current_context, [file_path])[os.path.abspath(file_path)]
+            final_score = self._update_relevance(os.path.basename(file_path), similarity)
             self._save_relevance_scores()
-
             return final_score
 
         except Exception as e:
             logger.error(f"Error calculating relevance: {str(e)}")
             return 0.0
 
+    def calculate_context_relevance_batch(self, file_paths: List[str], current_context: str) -> Dict[str, float]:
+        """Score several files against one context with a single index query"""
+        try:
+            similarities = self.context_index.score(current_context, file_paths)
+        except Exception as e:
+            logger.error(f"Error calculating relevance: {str(e)}")
+            return {os.path.basename(path): 0.0 for path in file_paths}
+
+        scores = {
+            os.path.basename(path): self._update_relevance(os.path.basename(path), similarity)
+            for path, similarity in similarities.items()
+        }
+        self._save_relevance_scores()
+        return scores
+
     def prune_outdated_context(self, threshold: float = 0.3) -> List[str]:
         pruned_files = []
         try:
@@ -0,0 +1,202 @@
+"""
+Persistent state of the memory subsystem.
+
+The change log, file versions and relevance scores are loaded once and
+kept as one in-memory working copy. Changes mark the affected file dirty
+and schedule a flush DEBOUNCE_SECONDS later, so a burst of operations
+costs one write per file. Inside batch() nothing is written until the
+outermost batch ends.
+
+Several processes may share the files, so every flush holds an exclusive
+lock on the file it writes and merges with what is on disk: new change
+log entries are appended, version bumps are added to the stored counts,
+and the relevance scores replace the stored ones. The change log is an
+append-only journal of JSON lines next to memory_changes.json; once the
+journal passes COMPACT_BYTES it is folded into the JSON file. JSON files
+are written to a temporary file, fsynced and renamed over the original,
+so a crash leaves either the old or the new contents.
+"""
+import atexit
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEBOUNCE_SECONDS = 1.0
+COMPACT_BYTES = 256 * 1024  # Journal size at which the change log is compacted
+
+def _read_json(path: str, default):
+    try:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return data if isinstance(data, type(default)) else default
+    except FileNotFoundError:
+        return default
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not load {path}, starting empty: {e}")
+        return default
+
+def _read_journal(path: str) -> List[Dict[str, Any]]:
+    entries = []
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"Skipping torn entry in {path}")
+    except FileNotFoundError:
+        pass
+    return entries
+
+def _append_journal(path: str, entries: List[Dict[str, Any]]) -> None:
+    data = ''.join(json.dumps(entry) + '\n' for entry in entries).encode()
+    with open(path, 'ab+') as f:
+        # Start on a fresh line if a crash left a partial entry
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                data = b'\n' + data
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+@contextmanager
+def _file_lock(path: str):
+    """Exclusive lock held by any process writing path"""
+    with open(f"{path}.lock", 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+def write_json_atomic(path: str, data: Any) -> None:
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+class MemoryStateStore:
+    """Working copy of the memory JSON files with debounced atomic writes"""
+
+    def __init__(self, change_log_file: str, version_file: str, relevance_file: str,
+                 debounce: float = DEBOUNCE_SECONDS):
+        self.paths = {
+            'changes': change_log_file,
+            'versions': version_file,
+            'relevance': relevance_file
+        }
+        self.journal = f"{change_log_file}.log"
+        self.debounce = debounce
+        self.changes: List[Dict[str, Any]] = _read_json(change_log_file, []) + _read_journal(self.journal)
+        self.versions: Dict[str, int] = _read_json(version_file, {})
+        self.relevance: Dict[str, Dict[str, Any]] = _read_json(relevance_file, {})
+        # Not yet on disk, merged into the files at the next flush
+        self._new_changes: List[Dict[str, Any]] = []
+        self._version_bumps: Dict[str, int] = {}
+        self._dirty = set()
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        self._batch_depth = 0
+        self.writes = 0
+        atexit.register(self.flush)
+
+    def _mark(self, name: str):
+        self._dirty.add(name)
+        if self._batch_depth or self._timer is not None:
+            return
+        self._timer = threading.Timer(self.debounce, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def append_change(self, entry: Dict[str, Any]):
+        with self._lock:
+            self.changes.append(entry)
+            self._new_changes.append(entry)
+            self._mark('changes')
+
+    def get_version(self, file_name: str) -> int:
+        with self._lock:
+            return self.versions.get(file_name, 0)
+
+    def bump_version(self, file_name: str) -> int:
+        with self._lock:
+            version = self.versions.get(file_name, 0) + 1
+            self.versions[file_name] = version
+            self._version_bumps[file_name] = self._version_bumps.get(file_name, 0) + 1
+            self._mark('versions')
+            return version
+
+    def set_relevance(self, relevance: Dict[str, Dict[str, Any]]):
+        with self._lock:
+            self.relevance = relevance
+            self._mark('relevance')
+
+    @contextmanager
+    def batch(self):
+        """Defer all writes until the outermost batch exits, then write once"""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                done = self._batch_depth == 0
+            if done:
+                self.flush()
+
+    def _write_changes(self):
+        path = self.paths['changes']
+        with _file_lock(path):
+            _append_journal(self.journal, self._new_changes)
+            self._new_changes = []
+            if os.path.getsize(self.journal) >= COMPACT_BYTES:
+                # Other processes' entries are in the journal too, so rebuild from disk
+                self.changes = _read_json(path, []) + _read_journal(self.journal)
+                write_json_atomic(path, self.changes)
+                os.remove(self.journal)
+                logger.info(f"Compacted {len(self.changes)} change log entries into {path}")
+
+    def _write_versions(self):
+        path = self.paths['versions']
+        with _file_lock(path):
+            versions = _read_json(path, {})
+            for file_name, bumps in self._version_bumps.items():
+                versions[file_name] = versions.get(file_name, 0) + bumps
+            write_json_atomic(path, versions)
+            self._version_bumps = {}
+            self.versions = versions
+
+    def _write_relevance(self):
+        path = self.paths['relevance']
+        with _file_lock(path):
+            write_json_atomic(path, self.relevance)
+
+    def flush(self):
+        """Merge every dirty file with its on-disk contents and write it now"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            dirty, self._dirty = self._dirty, set()
+            writers = {'changes': self._write_changes, 'versions': self._write_versions,
+                       'relevance': self._write_relevance}
+            for name in sorted(dirty):
+                try:
+                    writers[name]()
+                    self.writes += 1
+                except OSError as e:
+                    logger.error(f"Failed to write {self.paths[name]}: {e}")
+                    self._dirty.add(name)
@@ -0,0 +1,111 @@
+"""
+Fixed-memory latency histograms.
+
+Durations are counted in logarithmic buckets, BUCKETS_PER_DOUBLING per
+power of two between MIN_VALUE and MAX_VALUE, so memory does not grow
+with the number of observations and a percentile read from the buckets is
+within about 9% of the true value. SlidingHistogram keeps one histogram
+per time slot to answer the same questions over a recent window.
+"""
+import math
+import time
+from typing import Dict, List, Optional, Sequence
+
+MIN_VALUE = 1e-6     # Seconds; smaller durations land in the first bucket
+MAX_VALUE = 1e4      # Seconds; larger durations land in the last bucket
+BUCKETS_PER_DOUBLING = 8
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+_BUCKET_COUNT = int(math.ceil(math.log2(MAX_VALUE / MIN_VALUE) * BUCKETS_PER_DOUBLING)) + 1
+# Upper bound of each bucket
+BUCKET_BOUNDS: List[float] = [MIN_VALUE * 2 ** (i / BUCKETS_PER_DOUBLING) for i in range(_BUCKET_COUNT)]
+
+def bucket_index(value: float) -> int:
+    if value <= MIN_VALUE:
+        return 0
+    index = int(math.ceil(math.log2(value / MIN_VALUE) * BUCKETS_PER_DOUBLING))
+    return min(index, _BUCKET_COUNT - 1)
+
+class LogHistogram:
+    """Count, sum, min, max and log-bucketed counts of observations"""
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = [0] * _BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def record(self, value: float):
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: 'LogHistogram'):
+        if not other.count:
+            return
+        for i, count in enumerate(other.counts):
+            if count:
+                self.counts[i] += count
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def clear(self):
+        self.counts = [0] * _BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def percentile(self, quantile: float) -> Optional[float]:
+        """Upper bound of the bucket holding the quantile, clamped to min/max"""
+        if not self.count:
+            return None
+        rank = max(1, int(math.ceil(quantile * self.count)))
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(max(BUCKET_BOUNDS[i], self.min), self.max)
+        return self.max
+
+    def percentiles(self, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Dict[float, Optional[float]]:
+        return {q: self.percentile(q) for q in quantiles}
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+class SlidingHistogram:
+    """Histogram of the last `window` seconds, kept as `slots` rotating histograms"""
+
+    def __init__(self, window: float = 60, slots: int = 6):
+        self.window = window
+        self.slot_seconds = window / slots
+        self._slots = [LogHistogram() for _ in range(slots)]
+        self._slot_ids = [-1] * slots
+
+    def _slot(self, now: float) -> LogHistogram:
+        slot_id = int(now // self.slot_seconds)
+        index = slot_id % len(self._slots)
+        if self._slot_ids[index] != slot_id:
+            self._slots[index].clear()
+            self._slot_ids[index] = slot_id
+        return self._slots[index]
+
+    def record(self, value: float, now: Optional[float] = None):
+        self._slot(time.time() if now is None else now).record(value)
+
+    def snapshot(self, now: Optional[float] = None) -> LogHistogram:
+        """Merged histogram of the slots still inside the window"""
+        current = int((time.time() if now is None else now) // self.slot_seconds)
+        merged = LogHistogram()
+        for slot_id, histogram in zip(self._slot_ids, self._slots):
+            if current - len(self._slots) < slot_id <= current:
+                merged.merge(histogram)
+        return merged
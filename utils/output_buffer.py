@@ -0,0 +1,109 @@
+"""
+Fixed-capacity byte ring buffer for program output.
+
+A session's output is kept in one preallocated bytearray, so a program
+stuck printing in a loop costs at most `capacity` bytes of server memory.
+When the buffer is full the oldest output is dropped, or, with the 'kill'
+policy, new output is refused and the owner is told to stop the program.
+"""
+import os
+from typing import Tuple
+
+OUTPUT_BUFFER_SIZE = int(os.environ.get('OUTPUT_BUFFER_SIZE', 256 * 1024))
+OUTPUT_BUFFER_POLICY = os.environ.get('OUTPUT_BUFFER_POLICY', 'drop_oldest')
+
+DROP_OLDEST = 'drop_oldest'
+KILL = 'kill'
+
+class OutputRingBuffer:
+    """Bounded FIFO of bytes; callers are responsible for locking"""
+
+    def __init__(self, capacity: int = OUTPUT_BUFFER_SIZE, policy: str = OUTPUT_BUFFER_POLICY):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if policy not in (DROP_OLDEST, KILL):
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.capacity = capacity
+        self.policy = policy
+        self._data = bytearray(capacity)
+        self._head = 0
+        self._size = 0
+        self.bytes_produced = 0
+        self.bytes_dropped = 0
+        self.overflowed = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def write(self, data) -> int:
+        """Append data, applying the overflow policy; returns bytes kept"""
+        view = memoryview(data).cast('B')
+        self.bytes_produced += len(view)
+
+        free = self.capacity - self._size
+        if len(view) > free:
+            self.overflowed = True
+            if self.policy == KILL:
+                self.bytes_dropped += len(view) - free
+                view = view[:free]
+            else:
+                if len(view) > self.capacity:
+                    # Only the newest `capacity` bytes can survive
+                    self.bytes_dropped += len(view) - self.capacity
+                    view = view[len(view) - self.capacity:]
+                self._discard(len(view) - (self.capacity - self._size))
+
+        tail = (self._head + self._size) % self.capacity
+        first = min(len(view), self.capacity - tail)
+        self._data[tail:tail + first] = view[:first]
+        if first < len(view):
+            self._data[:len(view) - first] = view[first:]
+        self._size += len(view)
+        return len(view)
+
+    def _discard(self, count: int):
+        count = min(max(count, 0), self._size)
+        self._head = (self._head + count) % self.capacity
+        self._size -= count
+        self.bytes_dropped += count
+
+    def peek(self) -> Tuple[memoryview, ...]:
+        """Zero-copy views of the buffered bytes in order (one or two regions)"""
+        if not self._size:
+            return ()
+        buffer = memoryview(self._data)
+        end = self._head + self._size
+        if end <= self.capacity:
+            return (buffer[self._head:end],)
+        return (buffer[self._head:], buffer[:end - self.capacity])
+
+    def consume(self, count: int):
+        """Mark count bytes as read"""
+        count = min(max(count, 0), self._size)
+        self._head = (self._head + count) % self.capacity
+        self._size -= count
+        if not self._size:
+            self._head = 0
+
+    def read(self) -> bytes:
+        """Copy out and consume everything buffered"""
+        data = b''.join(self.peek())
+        self.consume(len(data))
+        return data
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+
+    def get_stats(self) -> dict:
+        return {
+            'capacity': self.capacity,
+            'buffered': self._size,
+            'bytes_produced': self.bytes_produced,
+            'bytes_dropped': self.bytes_dropped,
+            'overflowed': self.overflowed,
+            'policy': self.policy
+        }
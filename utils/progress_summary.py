@@ -0,0 +1,189 @@
+"""
+Per student and activity progress summaries.
+
+activity_progress_summary holds attempts, successes, first submission,
+first success and last submission for every (student, activity) pair that
+has submissions. It is updated in the transaction that inserts the
+submissions: record_submissions folds a batch into one row per pair and
+applies it with a single INSERT ... ON CONFLICT DO UPDATE, so the table
+never has to be recomputed from code_submission. rebuild_progress_summaries
+recomputes it with one INSERT ... SELECT after submissions are changed in
+place, e.g. by a regrade.
+
+class_grid and student_summary read the whole class or one student with
+a single query each.
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import case, delete, distinct, func, insert, select, true
+from sqlalchemy.dialects import postgresql, sqlite
+from database import db
+from models.student import ActivityProgressSummary, CodeSubmission, CodingActivity, Student
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+def _fold(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One summary delta per (student, activity) from a batch of submission rows"""
+    totals: Dict[tuple, Dict[str, Any]] = {}
+    for row in rows:
+        key = (row['student_id'], row['activity_id'])
+        submitted_at = row.get('created_at') or datetime.utcnow()
+        success = bool(row.get('success'))
+        total = totals.get(key)
+        if total is None:
+            total = totals[key] = {
+                'student_id': key[0], 'activity_id': key[1], 'attempts': 0, 'successes': 0,
+                'first_submission_at': submitted_at, 'first_success_at': None,
+                'last_submission_at': submitted_at, 'last_success': success
+            }
+        total['attempts'] += 1
+        total['successes'] += success
+        total['first_submission_at'] = min(total['first_submission_at'], submitted_at)
+        if success and (total['first_success_at'] is None or submitted_at < total['first_success_at']):
+            total['first_success_at'] = submitted_at
+        if submitted_at >= total['last_submission_at']:
+            total['last_submission_at'] = submitted_at
+            total['last_success'] = success
+    return list(totals.values())
+
+def record_submissions(connection, rows: Iterable[Dict[str, Any]]) -> int:
+    """Fold newly inserted submission rows into the summaries; returns the number of pairs touched"""
+    deltas = _fold(rows)
+    if not deltas:
+        return 0
+    dialect = connection.dialect.name
+    if dialect not in _UPSERT_INSERTS:
+        raise ValueError(f"Progress summaries need PostgreSQL or SQLite, not {dialect}")
+
+    table = ActivityProgressSummary.__table__
+    statement = _UPSERT_INSERTS[dialect](table).values(deltas)
+    new = statement.excluded
+    is_latest = new.last_submission_at >= table.c.last_submission_at
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.student_id, table.c.activity_id],
+        set_={
+            'attempts': table.c.attempts + new.attempts,
+            'successes': table.c.successes + new.successes,
+            'first_submission_at': case(
+                (new.first_submission_at < table.c.first_submission_at, new.first_submission_at),
+                else_=table.c.first_submission_at
+            ),
+            'first_success_at': case(
+                (table.c.first_success_at.is_(None), new.first_success_at),
+                (new.first_success_at < table.c.first_success_at, new.first_success_at),
+                else_=table.c.first_success_at
+            ),
+            'last_submission_at': case((is_latest, new.last_submission_at), else_=table.c.last_submission_at),
+            'last_success': case((is_latest, new.last_success), else_=table.c.last_success),
+        }
+    )
+    connection.execute(statement)
+    return len(deltas)
+
+def rebuild_progress_summaries(activity_id: Optional[int] = None) -> int:
+    """Recompute summaries from code_submission, for one activity or all; commits"""
+    last_success_at = func.max(case((CodeSubmission.success.is_(True), CodeSubmission.created_at)))
+    query = (
+        select(
+            CodeSubmission.student_id,
+            CodeSubmission.activity_id,
+            func.count(),
+            func.sum(case((CodeSubmission.success.is_(True), 1), else_=0)),
+            func.min(CodeSubmission.created_at),
+            func.min(case((CodeSubmission.success.is_(True), CodeSubmission.created_at))),
+            func.max(CodeSubmission.created_at),
+            case((last_success_at == func.max(CodeSubmission.created_at), True), else_=False)
+        )
+        .group_by(CodeSubmission.student_id, CodeSubmission.activity_id)
+    )
+    clear = delete(ActivityProgressSummary)
+    if activity_id is not None:
+        query = query.where(CodeSubmission.activity_id == activity_id)
+        clear = clear.where(ActivityProgressSummary.activity_id == activity_id)
+
+    table = ActivityProgressSummary.__table__
+    try:
+        db.session.execute(clear)
+        result = db.session.execute(insert(table).from_select(
+            ['student_id', 'activity_id', 'attempts', 'successes', 'first_submission_at',
+             'first_success_at', 'last_submission_at', 'last_success'],
+            query
+        ))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to rebuild progress summaries: {e}")
+        raise
+    scope = f"activity {activity_id}" if activity_id is not None else "all activities"
+    logger.info(f"Rebuilt {result.rowcount} progress summaries for {scope}")
+    return result.rowcount
+
+def _cell(row) -> Dict[str, Any]:
+    return {
+        'attempts': row.attempts,
+        'successes': row.successes,
+        'pass_rate': round(row.successes / row.attempts, 3) if row.attempts else 0.0,
+        'first_success_at': row.first_success_at.isoformat() if row.first_success_at else None,
+        'last_submission_at': row.last_submission_at.isoformat() if row.last_submission_at else None,
+        'last_success': bool(row.last_success)
+    }
+
+def class_grid(curriculum: str) -> Dict[str, Any]:
+    """Every non-admin student against every activity of a curriculum, from one query"""
+    rows = db.session.execute(
+        select(Student.id.label('student_id'), Student.username,
+               CodingActivity.id.label('activity_id'), CodingActivity.title,
+               ActivityProgressSummary.attempts, ActivityProgressSummary.successes,
+               ActivityProgressSummary.first_success_at, ActivityProgressSummary.last_submission_at,
+               ActivityProgressSummary.last_success)
+        .select_from(Student)
+        .join(CodingActivity, true())
+        .outerjoin(ActivityProgressSummary,
+                   (ActivityProgressSummary.student_id == Student.id) &
+                   (ActivityProgressSummary.activity_id == CodingActivity.id))
+        .where(CodingActivity.curriculum == curriculum, CodingActivity.deleted_at.is_(None),
+               Student.is_admin.isnot(True))
+        .order_by(Student.username, CodingActivity.sequence, CodingActivity.id)
+    ).all()
+
+    students: Dict[int, Dict[str, Any]] = {}
+    activities: Dict[int, Dict[str, Any]] = {}
+    cells = []
+    for row in rows:
+        students.setdefault(row.student_id, {'id': row.student_id, 'username': row.username})
+        activities.setdefault(row.activity_id, {'id': row.activity_id, 'title': row.title})
+        if row.attempts:
+            cells.append({'student_id': row.student_id, 'activity_id': row.activity_id, **_cell(row)})
+    return {
+        'curriculum': curriculum,
+        'students': list(students.values()),
+        'activities': list(activities.values()),
+        'cells': cells
+    }
+
+def student_summary(student_id: int) -> List[Dict[str, Any]]:
+    """A student's summary for every activity they have submitted to, from one query"""
+    rows = db.session.execute(
+        select(ActivityProgressSummary.activity_id, CodingActivity.title, CodingActivity.curriculum,
+               ActivityProgressSummary.attempts, ActivityProgressSummary.successes,
+               ActivityProgressSummary.first_success_at, ActivityProgressSummary.last_submission_at,
+               ActivityProgressSummary.last_success)
+        .join(CodingActivity, CodingActivity.id == ActivityProgressSummary.activity_id)
+        .where(ActivityProgressSummary.student_id == student_id)
+        .order_by(CodingActivity.curriculum, CodingActivity.sequence, CodingActivity.id)
+    ).all()
+    return [{'activity_id': row.activity_id, 'title': row.title, 'curriculum': row.curriculum, **_cell(row)}
+            for row in rows]
+
+def active_students_since(since: datetime) -> int:
+    """Number of students with a submission since the given time"""
+    return db.session.execute(
+        select(func.count(distinct(ActivityProgressSummary.student_id)))
+        .where(ActivityProgressSummary.last_submission_at >= since)
+    ).scalar() or 0
@@ -0,0 +1,343 @@
+"""
+Single epoll loop serving every interactive session PTY.
+
+Every session's master_fd is registered with one epoll instance. The loop
+drains readable PTYs into per-session buffers, hands new output to an
+optional subscriber, and detects child exit through a pidfd (falling back
+to polling the process when pidfds are unavailable).
+"""
+import logging
+import os
+import select
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+from utils.output_buffer import OutputRingBuffer, KILL
+
+try:
+    # eventlet's green select drops epoll, so take the real one
+    from eventlet import patcher as _patcher
+    _select = _patcher.original('select')
+except ImportError:
+    _select = select
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 4096
+MAX_READ_PER_WAKEUP = 64 * 1024  # Per fd, so one chatty program cannot hog the loop
+COALESCE_INTERVAL = 0.02         # Pause after dispatching so small writes batch up
+MAX_RATE = 256 * 1024            # Bytes/s per session before its fd is paused
+IDLE_TIMEOUT = 0.5
+METRICS_WINDOW = 5               # Seconds of history for bytes/sec
+SAMPLE_INTERVAL = 1.0            # Seconds between peak RSS samples of a running process
+
+OutputCallback = Callable[[str, bytes], None]
+ExitCallback = Callable[[str, Optional[int]], None]
+
+class PtyEntry:
+    """State for one registered PTY"""
+    def __init__(self, key: str, fd: int, process=None, buffer: Optional[OutputRingBuffer] = None):
+        self.key = key
+        self.fd = fd
+        self.process = process
+        self.pidfd: Optional[int] = None
+        self.buffer = buffer if buffer is not None else OutputRingBuffer()
+        self.on_output: Optional[OutputCallback] = None
+        self.on_exit: Optional[ExitCallback] = None
+        self.data_ready = threading.Condition()
+        self.exited = False
+        self.exit_code: Optional[int] = None
+        self.paused_until = 0.0
+        self.window_start = time.time()
+        self.window_bytes = 0
+        self.bytes_read = 0
+        self.last_sample = 0.0
+
+class PtyMultiplexer:
+    """One loop multiplexing output from all session PTYs"""
+
+    def __init__(self, max_rate: int = MAX_RATE):
+        self.max_rate = max_rate
+        self._epoll = _select.epoll()
+        self._entries: Dict[str, PtyEntry] = {}
+        self._by_fd: Dict[int, Tuple[PtyEntry, str]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._byte_samples: Deque[Tuple[float, int]] = deque()
+        self.bytes_total = 0
+        self.events_total = 0
+        self.loop_iterations = 0
+
+    def _ensure_running(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='pty-multiplexer', daemon=True)
+            self._thread.start()
+
+    def register(self, key: str, fd: int, process=None,
+                 buffer: Optional[OutputRingBuffer] = None) -> PtyEntry:
+        """Start watching a session's master_fd and, optionally, its child process"""
+        entry = PtyEntry(key, fd, process, buffer)
+        os.set_blocking(fd, False)
+        with self._lock:
+            if key in self._entries:
+                self._unregister_locked(key)
+            self._entries[key] = entry
+            self._by_fd[fd] = (entry, 'pty')
+            self._epoll.register(fd, _select.EPOLLIN | _select.EPOLLHUP | _select.EPOLLERR)
+
+            if process is not None and hasattr(os, 'pidfd_open'):
+                try:
+                    entry.pidfd = os.pidfd_open(process.pid)
+                    self._by_fd[entry.pidfd] = (entry, 'pid')
+                    self._epoll.register(entry.pidfd, _select.EPOLLIN)
+                except OSError as e:
+                    logger.debug(f"[Session {key}] pidfd unavailable, polling for exit: {e}")
+                    entry.pidfd = None
+            self._ensure_running()
+        logger.debug(f"[Session {key}] Registered fd {fd} with multiplexer")
+        return entry
+
+    def subscribe(self, key: str, on_output: OutputCallback,
+                  on_exit: Optional[ExitCallback] = None) -> bool:
+        """Push output to on_output from now on, starting with anything already buffered"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        # Swap under data_ready so output the loop delivers meanwhile is
+        # neither lost in the buffer nor sent ahead of what was buffered
+        with entry.data_ready:
+            entry.on_output = on_output
+            entry.on_exit = on_exit
+            pending = entry.buffer.read()
+            if pending:
+                self._call(entry, on_output, key, pending)
+            if entry.exited and on_exit:
+                self._call(entry, on_exit, key, entry.exit_code)
+        return True
+
+    def unregister(self, key: str):
+        """Stop watching a session; closing its fds remains the caller's job"""
+        with self._lock:
+            self._unregister_locked(key)
+
+    def _unregister_locked(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for fd in (entry.fd, entry.pidfd):
+            if fd is None:
+                continue
+            self._by_fd.pop(fd, None)
+            try:
+                self._epoll.unregister(fd)
+            except (OSError, ValueError):
+                pass
+        if entry.pidfd is not None:
+            try:
+                os.close(entry.pidfd)
+            except OSError:
+                pass
+        with entry.data_ready:
+            entry.data_ready.notify_all()
+
+    def read(self, key: str, timeout: float = 0) -> Optional[bytes]:
+        """Drain buffered output, waiting up to timeout for some to arrive"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        with entry.data_ready:
+            if not entry.buffer and timeout > 0 and not entry.exited:
+                entry.data_ready.wait(timeout)
+            return entry.buffer.read()
+
+    def has_exited(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is None or entry.exited
+
+    def _call(self, entry: PtyEntry, callback: Callable, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            logger.error(f"[Session {entry.key}] Multiplexer callback failed: {e}")
+
+    def _drain(self, entry: PtyEntry, limit: int = MAX_READ_PER_WAKEUP) -> bytes:
+        """Read what the PTY has available without blocking"""
+        chunks = []
+        total = 0
+        while total < limit:
+            try:
+                data = os.read(entry.fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            except OSError:
+                break
+            if not data:
+                break
+            chunks.append(data)
+            total += len(data)
+        return b''.join(chunks)
+
+    def _deliver(self, entry: PtyEntry, data: bytes, now: float):
+        entry.bytes_read += len(data)
+        self.bytes_total += len(data)
+        self._byte_samples.append((now, len(data)))
+
+        with entry.data_ready:
+            on_output = entry.on_output
+            if on_output is None:
+                entry.buffer.write(data)
+                entry.data_ready.notify_all()
+        if on_output is not None:
+            self._call(entry, on_output, entry.key, data)
+        elif entry.buffer.overflowed and entry.buffer.policy == KILL and not entry.exited \
+                and entry.process is not None and entry.process.poll() is None:
+            logger.warning(f"[Session {entry.key}] Output exceeded {entry.buffer.capacity} bytes, "
+                           f"stopping program")
+            entry.process.kill()
+
+        # Backpressure: stop reading a flooding session until its window ends,
+        # which blocks the program on its next write to the full PTY
+        if now - entry.window_start >= 1.0:
+            entry.window_start = now
+            entry.window_bytes = 0
+        entry.window_bytes += len(data)
+        if entry.window_bytes >= self.max_rate and not entry.exited:
+            entry.paused_until = entry.window_start + 1.0
+            try:
+                self._epoll.modify(entry.fd, 0)
+            except (OSError, ValueError):
+                pass
+
+    def _finish(self, entry: PtyEntry, now: float):
+        """Deliver the remaining output and report the exit"""
+        if entry.exited:
+            return
+        data = self._drain(entry, limit=1 << 30)
+        if data:
+            self._deliver(entry, data, now)
+        exit_code = entry.process.poll() if entry.process is not None else None
+        logger.debug(f"[Session {entry.key}] Child exited with code {exit_code}")
+        if entry.pidfd is not None:
+            with self._lock:
+                self._by_fd.pop(entry.pidfd, None)
+                try:
+                    self._epoll.unregister(entry.pidfd)
+                    os.close(entry.pidfd)
+                except (OSError, ValueError):
+                    pass
+                entry.pidfd = None
+        with entry.data_ready:
+            entry.exited = True
+            entry.exit_code = exit_code
+            on_exit = entry.on_exit
+            entry.data_ready.notify_all()
+        if on_exit is not None:
+            self._call(entry, on_exit, entry.key, exit_code)
+
+    def _next_timeout(self, now: float) -> float:
+        timeout = IDLE_TIMEOUT
+        for entry in list(self._entries.values()):
+            if entry.paused_until:
+                timeout = min(timeout, max(0.0, entry.paused_until - now))
+        return timeout
+
+    def _run(self):
+        logger.info("PTY multiplexer loop started")
+        while not self._stopping:
+            self.loop_iterations += 1
+            now = time.time()
+            # Waiting on the epoll fd through (possibly green) select keeps this
+            # loop cooperative under eventlet; poll(0) then collects the events
+            try:
+                ready, _, _ = select.select([self._epoll.fileno()], [], [], self._next_timeout(now))
+                events = self._epoll.poll(0) if ready else []
+            except (OSError, ValueError) as e:
+                if self._stopping:
+                    break
+                logger.error(f"Multiplexer wait failed: {e}")
+                time.sleep(IDLE_TIMEOUT)
+                continue
+
+            now = time.time()
+            dispatched = False
+            for fd, mask in events:
+                self.events_total += 1
+                with self._lock:
+                    target = self._by_fd.get(fd)
+                if target is None:
+                    continue
+                entry, kind = target
+                if kind == 'pid':
+                    self._finish(entry, now)
+                    continue
+                if mask & _select.EPOLLIN:
+                    data = self._drain(entry)
+                    if data:
+                        self._deliver(entry, data, now)
+                        dispatched = True
+                if mask & (_select.EPOLLHUP | _select.EPOLLERR) and not (mask & _select.EPOLLIN):
+                    self._finish(entry, now)
+
+            for entry in list(self._entries.values()):
+                # Resume paused sessions whose rate window has ended
+                if entry.paused_until and now >= entry.paused_until:
+                    entry.paused_until = 0.0
+                    try:
+                        self._epoll.modify(entry.fd, _select.EPOLLIN | _select.EPOLLHUP | _select.EPOLLERR)
+                    except (OSError, ValueError):
+                        pass
+                # Let sandboxed processes record their peak RSS while alive
+                sample = getattr(entry.process, 'sample', None)
+                if sample is not None and not entry.exited and now - entry.last_sample >= SAMPLE_INTERVAL:
+                    entry.last_sample = now
+                    sample()
+                # Without a pidfd, notice exits by polling the process
+                if entry.pidfd is None and not entry.exited and entry.process is not None \
+                        and entry.process.poll() is not None:
+                    self._finish(entry, now)
+
+            while self._byte_samples and now - self._byte_samples[0][0] > METRICS_WINDOW:
+                self._byte_samples.popleft()
+
+            if dispatched:
+                time.sleep(COALESCE_INTERVAL)
+        logger.info("PTY multiplexer loop stopped")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Active fds, throughput and loop counters"""
+        now = time.time()
+        recent = sum(size for ts, size in list(self._byte_samples) if now - ts <= METRICS_WINDOW)
+        with self._lock:
+            return {
+                'sessions': len(self._entries),
+                'active_fds': len(self._by_fd),
+                'bytes_total': self.bytes_total,
+                'bytes_per_sec': recent / METRICS_WINDOW,
+                'events_total': self.events_total,
+                'loop_iterations': self.loop_iterations,
+                'paused_sessions': sum(1 for e in self._entries.values() if e.paused_until),
+                'buffered_bytes': sum(len(e.buffer) for e in self._entries.values()),
+                'bytes_dropped': sum(e.buffer.bytes_dropped for e in self._entries.values())
+            }
+
+    def shutdown(self):
+        self._stopping = True
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        with self._lock:
+            for key in list(self._entries):
+                self._unregister_locked(key)
+        self._epoll.close()
+
+# Initialize multiplexer only when needed
+multiplexer: Optional[PtyMultiplexer] = None
+_multiplexer_lock = threading.Lock()
+def get_multiplexer() -> PtyMultiplexer:
+    global multiplexer
+    with _multiplexer_lock:
+        if multiplexer is None:
+            multiplexer = PtyMultiplexer()
+    return multiplexer
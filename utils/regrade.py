@@ -0,0 +1,291 @@
+"""
+Bulk regrading of every CodeSubmission for an activity.
+
+Used after a teacher changes an activity's test cases. Submissions are
+streamed in id order from a server-side cursor, one batch at a time. Each
+distinct program in a batch (by hash of its code) is graded once and the
+result is applied to every submission with that code. Gradings go through
+the compile scheduler as the background user "regrade", so a bulk regrade
+only uses workers that live run and grade requests leave idle.
+A batch is written back with one bulk UPDATE and committed, then the id it
+ended on is checkpointed, so an interrupted run resumes where it stopped.
+
+A checkpoint holds only the last id and the counters. Each batch's newly
+graded programs are appended to a JSON-lines sidecar, so checkpointing
+costs the same for every batch, and a resumed run still grades no program
+twice. A checkpoint only applies to the test cases it was made with;
+changing them again starts the regrade over.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, wait
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import select, update
+from database import db
+from models.student import CodeSubmission, CodingActivity
+from utils.compile_scheduler import SchedulerFull, get_compile_scheduler
+from utils.grading import activity_language, grade_submission
+from utils.progress_summary import rebuild_progress_summaries
+
+logger = logging.getLogger(__name__)
+
+REGRADE_BATCH_SIZE = int(os.environ.get('REGRADE_BATCH_SIZE', 500))
+REGRADE_WORKERS = int(os.environ.get('REGRADE_WORKERS', 4))  # Gradings in flight at once
+REGRADE_USER = 'regrade'  # Background user key in the compile scheduler
+# Checkpoints must outlive ResourceMonitor's sweep of compiler_workspace
+CHECKPOINT_DIR = os.path.join(os.getcwd(), 'instance', 'regrade')
+MAX_ERROR_CHARS = 2000
+
+def code_hash(code: str) -> str:
+    return hashlib.sha256(code.encode('utf-8')).hexdigest()
+
+def summarize(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a grading result to the CodeSubmission columns it updates"""
+    if not result.get('success'):
+        return {'success': False, 'output': '', 'error': (result.get('error') or '')[:MAX_ERROR_CHARS]}
+    failures = [r for r in result['results'] if not r['passed']]
+    error = '\n'.join(
+        f"{r['name']}: {r['status']}" + (f" - {r['error'].strip()}" if r.get('error') else '')
+        for r in failures
+    )
+    return {
+        'success': result['all_passed'],
+        'output': f"Passed {result['passed']}/{result['total']} test cases",
+        'error': error[:MAX_ERROR_CHARS] or None
+    }
+
+class RegradeJob:
+    """Regrades one activity's submissions, resumably"""
+
+    def __init__(self, activity_id: int, batch_size: int = REGRADE_BATCH_SIZE,
+                 workers: int = REGRADE_WORKERS, checkpoint_dir: str = CHECKPOINT_DIR,
+                 resume: bool = True):
+        self.activity_id = activity_id
+        self.batch_size = batch_size
+        self.workers = workers
+        self.checkpoint_path = os.path.join(checkpoint_dir, f"activity_{activity_id}.json")
+        self.results_path = os.path.join(checkpoint_dir, f"activity_{activity_id}.results.jsonl")
+        self.resume = resume
+        self.status = 'pending'
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.last_id = 0
+        self.processed = 0
+        self.graded = 0  # Distinct programs compiled and run
+        self.passed = 0
+        self.fingerprint = ''
+        # code hash -> column values, so duplicates across batches are graded once
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _load_checkpoint(self):
+        state = None
+        if self.resume and os.path.exists(self.checkpoint_path):
+            try:
+                with open(self.checkpoint_path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable regrade checkpoint {self.checkpoint_path}: {e}")
+        if state is not None and state.get('fingerprint') != self.fingerprint:
+            logger.info(f"Test cases of activity {self.activity_id} changed since checkpoint, starting over")
+            state = None
+        if state is None:
+            # Results graded against other test cases must not be reused
+            if os.path.exists(self.results_path):
+                os.remove(self.results_path)
+            return
+
+        self.last_id = state.get('last_id', 0)
+        self.processed = state.get('processed', 0)
+        self.graded = state.get('graded', 0)
+        self.passed = state.get('passed', 0)
+        self._results = self._load_results()
+        logger.info(f"Resuming regrade of activity {self.activity_id} after submission {self.last_id}")
+
+    def _load_results(self) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        try:
+            with open(self.results_path) as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                        results[row['hash']] = row['result']
+                    except (ValueError, KeyError, TypeError):
+                        # A torn last line only costs regrading that program
+                        continue
+        except FileNotFoundError:
+            pass
+        return results
+
+    def _save_checkpoint(self, new_results: Dict[str, Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+        if new_results:
+            with open(self.results_path, 'a') as f:
+                f.write(''.join(json.dumps({'hash': digest, 'result': result}) + '\n'
+                                for digest, result in new_results.items()))
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({
+                'activity_id': self.activity_id,
+                'fingerprint': self.fingerprint,
+                'last_id': self.last_id,
+                'processed': self.processed,
+                'graded': self.graded,
+                'passed': self.passed
+            }, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def _submit(self, code: str, language: str, test_cases: List[Dict[str, Any]], case_workers: int,
+                in_flight: Deque[Future]) -> Future:
+        """Queue one grading as the background regrade user, waiting while the scheduler is full"""
+        scheduler = get_compile_scheduler()
+        while True:
+            try:
+                return scheduler.submit(REGRADE_USER, grade_submission, code, language, test_cases,
+                                        background=True, max_workers=case_workers)
+            except SchedulerFull as e:
+                if in_flight:
+                    wait([in_flight.popleft()])
+                else:
+                    time.sleep(e.retry_after)
+
+    def _grade_batch(self, rows: List[Any], language: str, test_cases: List[Dict[str, Any]],
+                     case_workers: int) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """Column values for every row, and the results of programs graded in this batch"""
+        hashes = [code_hash(row.code) for row in rows]
+        pending: Dict[str, Future] = {}
+        in_flight: Deque[Future] = deque()
+        for digest, row in zip(hashes, rows):
+            if digest not in self._results and digest not in pending:
+                while len(in_flight) >= self.workers:
+                    wait([in_flight.popleft()])
+                pending[digest] = self._submit(row.code, language, test_cases, case_workers, in_flight)
+                in_flight.append(pending[digest])
+        for digest, future in pending.items():
+            try:
+                self._results[digest] = summarize(future.result())
+            except Exception as e:
+                logger.error(f"Regrade of program {digest[:12]} failed: {e}")
+                self._results[digest] = {'success': False, 'output': '', 'error': str(e)}
+        self.graded += len(pending)
+
+        mappings = []
+        for digest, row in zip(hashes, rows):
+            mappings.append({'id': row.id, **self._results[digest]})
+        return mappings, {digest: self._results[digest] for digest in pending}
+
+    def _batches(self) -> Iterator[List[Any]]:
+        """Submissions after the checkpoint, in id order, batch_size at a time"""
+        query = select(CodeSubmission.id, CodeSubmission.code).where(
+            CodeSubmission.activity_id == self.activity_id,
+            CodeSubmission.id > self.last_id
+        ).order_by(CodeSubmission.id)
+
+        if db.engine.dialect.name == 'sqlite':
+            # SQLite cannot commit while another connection holds a read open
+            last_id = self.last_id
+            while True:
+                rows = db.session.execute(
+                    query.where(CodeSubmission.id > last_id).limit(self.batch_size)
+                ).all()
+                if not rows:
+                    return
+                yield rows
+                last_id = rows[-1].id
+
+        # Read on a dedicated connection so committing each batch through
+        # the session does not invalidate the server-side cursor
+        with db.engine.connect() as connection:
+            result = connection.execution_options(
+                stream_results=True, yield_per=self.batch_size
+            ).execute(query)
+            yield from result.partitions()
+
+    def run(self) -> Dict[str, Any]:
+        """Regrade all submissions; must be called inside an app context"""
+        self.status = 'running'
+        self.started_at = time.time()
+        try:
+            activity = db.session.get(CodingActivity, self.activity_id)
+            if activity is None:
+                raise ValueError(f"Activity {self.activity_id} not found")
+            language = activity_language(activity)
+            test_cases = activity.test_cases or []
+            if not test_cases:
+                raise ValueError(f"Activity {self.activity_id} has no test cases")
+            self.fingerprint = hashlib.sha256(
+                json.dumps([language, test_cases], sort_keys=True).encode()
+            ).hexdigest()
+            self._load_checkpoint()
+
+            case_workers = max(1, (os.cpu_count() or 2) // self.workers)
+            for rows in self._batches():
+                mappings, new_results = self._grade_batch(rows, language, test_cases, case_workers)
+                db.session.execute(update(CodeSubmission), mappings)
+                db.session.commit()
+                with self._lock:
+                    self.last_id = rows[-1].id
+                    self.processed += len(rows)
+                    self.passed += sum(1 for m in mappings if m['success'])
+                self._save_checkpoint(new_results)
+                logger.info(f"Regraded {self.processed} submissions of activity {self.activity_id} "
+                            f"({self.graded} distinct programs)")
+
+            # Success counts in the progress summaries changed with the grades
+            rebuild_progress_summaries(self.activity_id)
+            self.status = 'completed'
+            for path in (self.checkpoint_path, self.results_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        except Exception as e:
+            db.session.rollback()
+            self.status = 'failed'
+            self.error = str(e)
+            logger.error(f"Regrade of activity {self.activity_id} failed: {e}", exc_info=True)
+        finally:
+            self.finished_at = time.time()
+        return self.get_status()
+
+    def get_status(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+            return {
+                'activity_id': self.activity_id,
+                'status': self.status,
+                'error': self.error,
+                'processed': self.processed,
+                'distinct_programs': self.graded,
+                'passed': self.passed,
+                'last_id': self.last_id,
+                'elapsed': round(elapsed, 2)
+            }
+
+# Background regrades started from the admin console, by activity id
+_jobs: Dict[int, RegradeJob] = {}
+_jobs_lock = threading.Lock()
+
+def start_regrade(app, activity_id: int, **kwargs) -> RegradeJob:
+    """Run a regrade in a background thread unless one is already running"""
+    with _jobs_lock:
+        job = _jobs.get(activity_id)
+        if job is not None and job.status in ('pending', 'running'):
+            return job
+        job = RegradeJob(activity_id, **kwargs)
+        _jobs[activity_id] = job
+
+    def run():
+        with app.app_context():
+            job.run()
+
+    threading.Thread(target=run, name=f'regrade-{activity_id}', daemon=True).start()
+    return job
+
+def get_regrade_job(activity_id: int) -> Optional[RegradeJob]:
+    with _jobs_lock:
+        return _jobs.get(activity_id)
@@ -0,0 +1,291 @@
+"""
+Resource limits and accounting for student programs.
+
+Programs are started through SandboxedProcess, a Popen that applies
+rlimits in the child before exec and, when a delegated cgroup v2 tree is
+configured, places the child in its own cgroup. poll() and wait() reap
+the child with os.wait4, so its peak RSS, CPU time and wall time are
+recorded for the result.
+
+The .NET runtime reserves a few GB of address space at startup whatever
+the program does, so for dotnet programs the memory budget is enforced
+through DOTNET_GCHeapHardLimit and RLIMIT_AS only sits above the runtime's
+reservations as a backstop.
+"""
+import logging
+import math
+import os
+import resource
+import signal
+import subprocess
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SANDBOX_MEMORY_MB = int(os.environ.get('SANDBOX_MEMORY_MB', 256))
+SANDBOX_CPU_SECONDS = int(os.environ.get('SANDBOX_CPU_SECONDS', 10))
+# RLIMIT_NPROC counts every process and thread of the user, server included, so
+# it only caps the whole server user; per-run fork bombs are stopped by pids.max
+SANDBOX_MAX_PROCESSES = int(os.environ.get('SANDBOX_MAX_PROCESSES', 1024))
+SANDBOX_MAX_PIDS = int(os.environ.get('SANDBOX_MAX_PIDS', 128))  # cgroup pids.max per run
+SANDBOX_MAX_FILE_MB = int(os.environ.get('SANDBOX_MAX_FILE_MB', 16))
+SANDBOX_CGROUP_ROOT = os.environ.get('SANDBOX_CGROUP_ROOT')  # Delegated cgroup v2 directory
+DOTNET_RESERVED_MB = 2560  # Address space CoreCLR reserves besides the GC heap
+
+@dataclass
+class SandboxLimits:
+    memory_mb: int = SANDBOX_MEMORY_MB
+    cpu_seconds: int = SANDBOX_CPU_SECONDS
+    max_processes: int = SANDBOX_MAX_PROCESSES
+    max_pids: int = SANDBOX_MAX_PIDS
+    max_file_size_mb: int = SANDBOX_MAX_FILE_MB
+    runtime: str = 'dotnet'  # 'dotnet' or 'native'
+
+    def address_space_bytes(self) -> int:
+        if self.runtime == 'dotnet':
+            # GC regions take twice the heap limit, plus the runtime's own reservations
+            return (2 * self.memory_mb + DOTNET_RESERVED_MB) << 20
+        return self.memory_mb << 20
+
+    def environment(self) -> Dict[str, str]:
+        """Variables that make the runtime itself respect the memory budget"""
+        if self.runtime != 'dotnet':
+            return {}
+        return {
+            'DOTNET_GCHeapHardLimit': hex(self.memory_mb << 20),
+            'DOTNET_GCRegionRange': hex(2 * self.memory_mb << 20),
+            # W^X double-maps code through a memfd that RLIMIT_FSIZE would cap
+            'DOTNET_EnableWriteXorExecute': '0'
+        }
+
+class Cgroup:
+    """Per-run child of a delegated cgroup v2 directory"""
+    def __init__(self, root: str, limits: SandboxLimits):
+        self.path = os.path.join(root, f"run-{uuid.uuid4().hex[:12]}")
+        os.mkdir(self.path)
+        self._write('memory.max', str(limits.memory_mb << 20))
+        self._write('pids.max', str(limits.max_pids))
+        # Resolved up front so the child only has to write its pid
+        self.procs_path = os.path.join(self.path, 'cgroup.procs')
+
+    @classmethod
+    def create(cls, limits: SandboxLimits) -> Optional['Cgroup']:
+        if not SANDBOX_CGROUP_ROOT or \
+                not os.path.exists(os.path.join(SANDBOX_CGROUP_ROOT, 'cgroup.controllers')):
+            return None
+        try:
+            return cls(SANDBOX_CGROUP_ROOT, limits)
+        except OSError as e:
+            logger.warning(f"cgroup unavailable, using rlimits only: {e}")
+            return None
+
+    def _write(self, name: str, value: str):
+        try:
+            with open(os.path.join(self.path, name), 'w') as f:
+                f.write(value)
+        except OSError as e:
+            logger.debug(f"Could not set {name} on {self.path}: {e}")
+
+    def _read(self, name: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.path, name)) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def usage(self) -> Dict[str, float]:
+        usage = {}
+        peak = self._read('memory.peak')
+        if peak and peak.strip().isdigit():
+            usage['peak_rss_mb'] = int(peak) / (1024 * 1024)
+        for line in (self._read('cpu.stat') or '').splitlines():
+            key, _, value = line.partition(' ')
+            if key == 'usage_usec':
+                usage['cpu_time'] = int(value) / 1e6
+        return usage
+
+    def remove(self):
+        try:
+            os.rmdir(self.path)
+        except OSError as e:
+            logger.debug(f"Could not remove cgroup {self.path}: {e}")
+
+def _limits_preexec(limits: SandboxLimits, cgroup: Optional[Cgroup]):
+    """Build the function run in the child between fork and exec"""
+    rlimits = [
+        (resource.RLIMIT_AS, limits.address_space_bytes()),
+        # SIGXCPU at the soft limit, SIGKILL a second later
+        (resource.RLIMIT_CPU, (limits.cpu_seconds, limits.cpu_seconds + 1)),
+        (resource.RLIMIT_NPROC, limits.max_processes),
+        (resource.RLIMIT_FSIZE, limits.max_file_size_mb << 20),
+        (resource.RLIMIT_CORE, 0),
+    ]
+    procs_path = cgroup.procs_path if cgroup else None
+
+    def preexec():
+        for which, value in rlimits:
+            soft, hard = value if isinstance(value, tuple) else (value, value)
+            resource.setrlimit(which, (soft, hard))
+        if procs_path:
+            fd = os.open(procs_path, os.O_WRONLY)
+            try:
+                os.write(fd, str(os.getpid()).encode())
+            finally:
+                os.close(fd)
+    return preexec
+
+def _rss_kb(pid='self') -> int:
+    """Current resident set size of a process in KB"""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def _cpu_seconds(pid: int) -> float:
+    """User plus system CPU time a running process has used, from /proc"""
+    with open(f'/proc/{pid}/stat') as f:
+        # Fields after the parenthesised command name; utime and stime are 14 and 15
+        fields = f.read().rpartition(')')[2].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+def _high_water_kb(pid: int) -> Optional[int]:
+    """Peak RSS of a running process's current image, from /proc"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+class SandboxedProcess(subprocess.Popen):
+    """Popen with resource limits that records resource usage when reaped"""
+
+    def __init__(self, args, limits: Optional[SandboxLimits] = None, **kwargs):
+        self.limits = limits or SandboxLimits()
+        self.cgroup = Cgroup.create(self.limits)
+        env = kwargs.pop('env', None)
+        kwargs['env'] = {**(env if env is not None else os.environ), **self.limits.environment()}
+        kwargs['preexec_fn'] = _limits_preexec(self.limits, self.cgroup)
+        self.rusage: Optional[resource.struct_rusage] = None
+        self.start_time = time.time()
+        self.end_time: Optional[float] = None
+        self._usage: Optional[Dict[str, Any]] = None
+        # ru_maxrss carries over the RSS the child inherited at fork, so it only
+        # measures the program when it exceeds this; otherwise use /proc samples
+        self.inherited_rss_kb = _rss_kb()
+        self.sampled_hwm_kb: Optional[int] = None
+        self.cpu_offset = 0.0  # CPU time spent before the program's budget started
+        self._reap_lock = threading.Lock()
+        try:
+            super().__init__(args, **kwargs)
+        except Exception:
+            if self.cgroup:
+                self.cgroup.remove()
+            raise
+
+    def _reap(self, flags: int) -> bool:
+        """Reap the child with wait4 to keep its rusage; True once it has exited"""
+        if self.returncode is not None:
+            return True
+        try:
+            pid, status, rusage = os.wait4(self.pid, flags)
+        except ChildProcessError:
+            # Already reaped elsewhere, so there is no usage to record
+            self.returncode = 0
+            return True
+        if pid != self.pid:
+            return False
+        self.rusage = rusage
+        self.end_time = time.time()
+        self.returncode = os.waitstatus_to_exitcode(status)
+        return True
+
+    def sample(self):
+        """Record the program's peak RSS so far while it is running"""
+        hwm = _high_water_kb(self.pid)
+        if hwm is not None:
+            self.sampled_hwm_kb = max(hwm, self.sampled_hwm_kb or 0)
+
+    def poll(self) -> Optional[int]:
+        if self.returncode is None and self._reap_lock.acquire(False):
+            try:
+                self.sample()
+                self._reap(os.WNOHANG)
+            finally:
+                self._reap_lock.release()
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        if timeout is None:
+            with self._reap_lock:
+                self._reap(0)
+            return self.returncode
+
+        deadline = time.monotonic() + timeout
+        delay = 0.0005
+        while self.poll() is None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(self.args, timeout)
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.05)
+        return self.returncode
+
+    def restart_budget(self, limits: SandboxLimits):
+        """Start the CPU budget and accounting now, for a process started ahead of its program"""
+        used = _cpu_seconds(self.pid)
+        soft = math.ceil(used) + limits.cpu_seconds
+        # Only lowers the limit the process was started with, which needs no privilege
+        resource.prlimit(self.pid, resource.RLIMIT_CPU, (soft, soft + 1))
+        self.limits = limits
+        self.cpu_offset = used
+        self.start_time = time.time()
+
+    def limit_exceeded(self) -> Optional[str]:
+        """Name of the limit that stopped the program, if one did"""
+        if self.returncode == -signal.SIGXCPU or \
+                (self.returncode == -signal.SIGKILL and self.rusage is not None and
+                 self.rusage.ru_utime + self.rusage.ru_stime - self.cpu_offset >= self.limits.cpu_seconds):
+            return 'cpu'
+        if self.returncode == -signal.SIGXFSZ:
+            return 'file_size'
+        return None
+
+    def usage(self) -> Dict[str, Any]:
+        """Peak RSS, CPU time and wall time of a finished run"""
+        if self.returncode is None:
+            return {'wall_time': round(time.time() - self.start_time, 3)}
+        if self._usage is not None:
+            return self._usage
+        usage: Dict[str, Any] = {
+            'wall_time': round((self.end_time or time.time()) - self.start_time, 3)
+        }
+        if self.rusage is not None:
+            # ru_maxrss is in KB
+            if self.rusage.ru_maxrss > self.inherited_rss_kb:
+                usage['peak_rss_mb'] = round(self.rusage.ru_maxrss / 1024, 1)
+            elif self.sampled_hwm_kb is not None:
+                usage['peak_rss_mb'] = round(self.sampled_hwm_kb / 1024, 1)
+            usage['cpu_time'] = round(self.rusage.ru_utime + self.rusage.ru_stime, 3)
+        if self.cgroup is not None:
+            usage.update({k: round(v, 3) for k, v in self.cgroup.usage().items()})
+            self.cgroup.remove()
+            self.cgroup = None
+        if 'cpu_time' in usage and self.cpu_offset:
+            usage['cpu_time'] = round(max(usage['cpu_time'] - self.cpu_offset, 0.0), 3)
+        exceeded = self.limit_exceeded()
+        if exceeded:
+            usage['limit_exceeded'] = exceeded
+        self._usage = usage
+        return usage
+
+def sandboxed_popen(command: List[str], limits: Optional[SandboxLimits] = None, **kwargs) -> SandboxedProcess:
+    """Start a student program under the sandbox limits"""
+    return SandboxedProcess(command, limits=limits, **kwargs)
@@ -1,116 +1,221 @@
+import itertools
 import logging
+import os
+import reprlib
+import threading
 import time
+from collections import deque
 from functools import wraps
+from typing import Dict, Optional
 from flask import current_app
 from datetime import datetime
 from .logging_config import setup_logging
+from .metrics import LogHistogram, SlidingHistogram
 
 # Initialize logger with our new configuration
 logger = setup_logging('socketio')
 
+METRICS_WINDOW = 60  # Seconds covered by the sliding-window percentiles
+RECENT_ERRORS = 20
+
+class EventStats:
+    """Counters and latency histograms of one Socket.IO event"""
+    __slots__ = ('count', 'errors', 'histogram', 'window', 'last_seen')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.histogram = LogHistogram()
+        self.window = SlidingHistogram(METRICS_WINDOW)
+        self.last_seen: Optional[float] = None
+
 class SocketIOMetrics:
+    """Fixed-memory Socket.IO counters and event latency percentiles"""
+
     def __init__(self):
         self.connections = 0
+        self.connections_total = 0
         self.active_sessions = set()
         self.events_processed = 0
         self.errors = 0
         self.start_time = time.time()
-        self.event_timings = {}
-        self.error_details = []  # Track detailed error information
+        self.event_stats: Dict[str, EventStats] = {}
+        self.error_details = deque(maxlen=RECENT_ERRORS)
+        self._lock = threading.Lock()
+
+    def _stats_for(self, event_name: str) -> EventStats:
+        stats = self.event_stats.get(event_name)
+        if stats is None:
+            stats = self.event_stats[event_name] = EventStats()
+        return stats
 
     def track_event(self, event_name, duration, context=None):
-        """Track event with enhanced context"""
-        if event_name not in self.event_timings:
-            self.event_timings[event_name] = []
-        self.event_timings[event_name].append({
-            'duration': duration,
-            'timestamp': datetime.now().isoformat(),
-            'context': context or {}
-        })
-        self.events_processed += 1
-        logger.debug(f"Event tracked: {event_name}, Duration: {duration:.3f}s, Context: {context}")
+        """Record an event's duration; the payload is never stored"""
+        now = time.time()
+        with self._lock:
+            stats = self._stats_for(event_name)
+            stats.count += 1
+            stats.histogram.record(duration)
+            stats.window.record(duration, now)
+            stats.last_seen = now
+            self.events_processed += 1
 
     def track_error(self, event_name, error, context=None):
-        """Track detailed error information"""
-        error_detail = {
-            'event': event_name,
-            'error': str(error),
-            'timestamp': datetime.now().isoformat(),
-            'context': context or {}
-        }
-        self.error_details.append(error_detail)
-        self.errors += 1
+        """Count an error and keep a short summary of the most recent ones"""
+        with self._lock:
+            self._stats_for(event_name).errors += 1
+            self.errors += 1
+            self.error_details.append({
+                'event': event_name,
+                'error': str(error)[:500],
+                'timestamp': datetime.now().isoformat()
+            })
         logger.error(f"Socket.IO error in {event_name}: {error}", exc_info=True)
 
+    def connection_opened(self):
+        with self._lock:
+            self.connections += 1
+            self.connections_total += 1
+            return self.connections
+
+    def connection_closed(self):
+        with self._lock:
+            self.connections = max(0, self.connections - 1)
+            return self.connections
+
     def get_stats(self):
-        """Get enhanced statistics including error details"""
-        uptime = time.time() - self.start_time
-        avg_timings = {
-            event: {
-                'avg_duration': sum(t['duration'] for t in times)/len(times),
-                'count': len(times),
-                'last_event': times[-1] if times else None
+        """Counters plus lifetime and sliding-window latency percentiles per event"""
+        now = time.time()
+        with self._lock:
+            timings = {}
+            for event, stats in self.event_stats.items():
+                window = stats.window.snapshot(now)
+                timings[event] = {
+                    'count': stats.count,
+                    'errors': stats.errors,
+                    'avg_duration': stats.histogram.mean,
+                    'max_duration': stats.histogram.max,
+                    **{f"p{int(q * 100)}": v for q, v in stats.histogram.percentiles().items()},
+                    'window': {
+                        'seconds': METRICS_WINDOW,
+                        'count': window.count,
+                        **{f"p{int(q * 100)}": v for q, v in window.percentiles().items()}
+                    },
+                    'last_event': datetime.fromtimestamp(stats.last_seen).isoformat() if stats.last_seen else None
+                }
+            return {
+                'uptime': now - self.start_time,
+                'total_connections': self.connections,
+                'active_sessions': len(self.active_sessions),
+                'events_processed': self.events_processed,
+                'errors': {
+                    'count': self.errors,
+                    'recent': list(self.error_details)[-5:]
+                },
+                'average_event_timings': timings
             }
-            for event, times in self.event_timings.items()
-        }
-
-        return {
-            'uptime': uptime,
-            'total_connections': self.connections,
-            'active_sessions': len(self.active_sessions),
-            'events_processed': self.events_processed,
-            'errors': {
-                'count': self.errors,
-                'recent': self.error_details[-5:] if self.error_details else []
-            },
-            'average_event_timings': avg_timings
-        }
+
+    def prometheus_text(self):
+        """Metrics in the Prometheus text exposition format"""
+        now = time.time()
+        with self._lock:
+            lines = [
+                '# HELP socketio_uptime_seconds Seconds since the metrics store was created',
+                '# TYPE socketio_uptime_seconds gauge',
+                f'socketio_uptime_seconds {now - self.start_time:.3f}',
+                '# HELP socketio_connections Currently open Socket.IO connections',
+                '# TYPE socketio_connections gauge',
+                f'socketio_connections {self.connections}',
+                '# HELP socketio_connections_total Socket.IO connections opened',
+                '# TYPE socketio_connections_total counter',
+                f'socketio_connections_total {self.connections_total}',
+                '# HELP socketio_active_sessions Interactive sessions currently active',
+                '# TYPE socketio_active_sessions gauge',
+                f'socketio_active_sessions {len(self.active_sessions)}',
+                '# HELP socketio_event_errors_total Socket.IO handler errors',
+                '# TYPE socketio_event_errors_total counter',
+            ]
+            for event, stats in sorted(self.event_stats.items()):
+                lines.append(f'socketio_event_errors_total{{event="{event}"}} {stats.errors}')
+
+            lines += [
+                '# HELP socketio_event_duration_seconds Socket.IO handler duration since start',
+                '# TYPE socketio_event_duration_seconds summary',
+            ]
+            for event, stats in sorted(self.event_stats.items()):
+                for q, value in stats.histogram.percentiles().items():
+                    if value is not None:
+                        lines.append(f'socketio_event_duration_seconds{{event="{event}",quantile="{q}"}} {value:.6f}')
+                lines.append(f'socketio_event_duration_seconds_sum{{event="{event}"}} {stats.histogram.total:.6f}')
+                lines.append(f'socketio_event_duration_seconds_count{{event="{event}"}} {stats.count}')
+
+            lines += [
+                f'# HELP socketio_event_recent_duration_seconds Socket.IO handler duration over the last {METRICS_WINDOW}s',
+                '# TYPE socketio_event_recent_duration_seconds gauge',
+            ]
+            for event, stats in sorted(self.event_stats.items()):
+                for q, value in stats.window.snapshot(now).percentiles().items():
+                    if value is not None:
+                        lines.append(f'socketio_event_recent_duration_seconds{{event="{event}",quantile="{q}"}} {value:.6f}')
+        return '\n'.join(lines) + '\n'
 
 # Global metrics instance
 metrics = SocketIOMetrics()
 
+# Event bodies are logged for one event in SOCKET_LOG_SAMPLE_RATE (0 disables),
+# each argument cut to SOCKET_LOG_MAX_CHARS; compile requests carry whole programs
+SOCKET_LOG_SAMPLE_RATE = int(os.environ.get('SOCKET_LOG_SAMPLE_RATE', 100))
+SOCKET_LOG_MAX_CHARS = int(os.environ.get('SOCKET_LOG_MAX_CHARS', 200))
+
+_payload_repr = reprlib.Repr()
+_payload_repr.maxstring = SOCKET_LOG_MAX_CHARS
+_payload_repr.maxother = SOCKET_LOG_MAX_CHARS
+_sample_counter = itertools.count()
+
+def _sample_payload() -> bool:
+    return SOCKET_LOG_SAMPLE_RATE > 0 and next(_sample_counter) % SOCKET_LOG_SAMPLE_RATE == 0
+
 def log_socket_event(func):
-    """Enhanced decorator to log Socket.IO events with detailed context"""
+    """Time Socket.IO handlers; event bodies are only formatted for sampled debug logs"""
+    event_name = func.__name__
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        event_name = func.__name__
-        start_time = time.time()
-        context = {
-            'args': str(args),
-            'kwargs': str(kwargs)
-        }
+        debug = logger.isEnabledFor(logging.DEBUG)
+        sampled = debug and _sample_payload()
+        if sampled:
+            logger.debug("Socket.IO event %s started, args=%s kwargs=%s",
+                         event_name, _payload_repr.repr(args), _payload_repr.repr(kwargs))
+        start_ns = time.perf_counter_ns()
 
         try:
-            logger.debug(f"Socket.IO event {event_name} started at {datetime.now()}")
-            logger.debug(f"Event context: {context}")
-
             result = func(*args, **kwargs)
-
-            duration = time.time() - start_time
-            metrics.track_event(event_name, duration, context)
-
-            logger.debug(f"Socket.IO event {event_name} completed in {duration:.3f}s")
-            logger.debug(f"Event result: {result}")
-            return result
-
         except Exception as e:
-            duration = time.time() - start_time
-            metrics.track_error(event_name, e, context)
-            logger.exception(f"Error in Socket.IO event {event_name} after {duration:.3f}s: {str(e)}")
+            duration = (time.perf_counter_ns() - start_ns) / 1e9
+            metrics.track_error(event_name, e)
+            logger.exception("Error in Socket.IO event %s after %.3fs: %s", event_name, duration, e)
             raise
 
+        duration = (time.perf_counter_ns() - start_ns) / 1e9
+        metrics.track_event(event_name, duration)
+        if debug:
+            logger.debug("Socket.IO event %s completed in %.3fs", event_name, duration)
+            if sampled:
+                logger.debug("Socket.IO event %s result: %s", event_name, _payload_repr.repr(result))
+        return result
+
     return wrapper
 
 def track_connection(connected=True, client_info=None):
     """Enhanced connection tracking with client information"""
     if connected:
-        metrics.connections += 1
-        logger.info(f"New connection established. Total connections: {metrics.connections}")
+        connections = metrics.connection_opened()
+        logger.info(f"New connection established. Total connections: {connections}")
         if client_info:
-            logger.debug(f"Client info: {client_info}")
+            logger.debug("Client info: %s", _payload_repr.repr(client_info))
     else:
-        metrics.connections = max(0, metrics.connections - 1)
-        logger.info(f"Connection closed. Remaining connections: {metrics.connections}")
+        connections = metrics.connection_closed()
+        logger.info(f"Connection closed. Remaining connections: {connections}")
 
 def track_session(session_id, active=True, context=None):
     """Enhanced session tracking with context"""
@@ -118,7 +223,7 @@ def track_session(session_id, active=True, context=None):
         metrics.active_sessions.add(session_id)
         logger.info(f"Session {session_id} activated. Total active sessions: {len(metrics.active_sessions)}")
         if context:
-            logger.debug(f"Session context: {context}")
+            logger.debug("Session context: %s", _payload_repr.repr(context))
     else:
         metrics.active_sessions.discard(session_id)
         logger.info(f"Session {session_id} deactivated. Remaining active sessions: {len(metrics.active_sessions)}")
@@ -126,7 +231,7 @@ def track_session(session_id, active=True, context=None):
 def get_current_metrics():
     """Get current Socket.IO metrics with enhanced error reporting"""
     stats = metrics.get_stats()
-    logger.debug(f"Current metrics: {stats}")
+    logger.debug("Current metrics: %s", stats)
     return stats
 
 def log_error(error_type, message, context=None):
@@ -0,0 +1,170 @@
+"""
+Write-behind persistence for CodeSubmission rows.
+
+run_code hands each submission to the sink and returns without waiting
+for the database. A background worker drains the bounded queue and
+inserts rows in batches with a single multi-row INSERT, whenever
+FLUSH_BATCH_ROWS rows are waiting or FLUSH_INTERVAL_MS has passed since
+the first of them arrived; the progress summaries (utils/progress_summary.py)
+are updated in the same transaction. When the queue is full, rows are dropped and
+counted rather than blocking the request. Pending rows are flushed at
+interpreter exit.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert
+from database import db
+from models.student import CodeSubmission
+from utils.progress_summary import record_submissions
+
+logger = logging.getLogger(__name__)
+
+SUBMISSION_QUEUE_SIZE = int(os.environ.get('SUBMISSION_QUEUE_SIZE', 2000))
+FLUSH_INTERVAL_MS = int(os.environ.get('SUBMISSION_FLUSH_INTERVAL_MS', 250))
+FLUSH_BATCH_ROWS = int(os.environ.get('SUBMISSION_FLUSH_BATCH_ROWS', 100))
+SHUTDOWN_TIMEOUT = 10
+
+class SubmissionSink:
+    """Bounded queue of submission rows drained by one batching writer"""
+
+    def __init__(self, app, max_queue: int = SUBMISSION_QUEUE_SIZE,
+                 flush_interval_ms: int = FLUSH_INTERVAL_MS, batch_rows: int = FLUSH_BATCH_ROWS):
+        self.app = app
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_rows = batch_rows
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0  # Rejected because the queue was full
+        self.failed = 0   # Lost to a failed insert
+        self.batches = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='submission-sink', daemon=True)
+            self._thread.start()
+
+    def submit(self, **values) -> bool:
+        """Queue a CodeSubmission row; False if it had to be dropped"""
+        values.setdefault('created_at', datetime.utcnow())
+        try:
+            self._queue.put_nowait(values)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                dropped = self.dropped
+            if dropped == 1 or dropped % 100 == 0:
+                logger.warning(f"Submission queue full, {dropped} submissions dropped so far")
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        """Block for the first row, then gather more until the batch is full or due"""
+        try:
+            rows = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(rows) < self.batch_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                rows.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return rows
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        rows = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                return rows
+
+    def _write(self, rows: List[Dict[str, Any]]):
+        start = time.time()
+        with self.app.app_context():
+            try:
+                db.session.execute(insert(CodeSubmission).values(rows))
+                # Same transaction, so the summaries never disagree with the submissions
+                record_submissions(db.session.connection(), rows)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                with self._lock:
+                    self.failed += len(rows)
+                logger.error(f"Failed to insert {len(rows)} submissions: {e}")
+                return
+            finally:
+                for _ in rows:
+                    self._queue.task_done()
+        with self._lock:
+            self.written += len(rows)
+            self.batches += 1
+        logger.debug(f"Inserted {len(rows)} submissions in {(time.time() - start) * 1000:.1f}ms")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            rows = self._next_batch()
+            if rows:
+                self._write(rows)
+
+    def flush(self, timeout: float = SHUTDOWN_TIMEOUT) -> bool:
+        """Wait until every queued row has been written or has failed"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def shutdown(self, timeout: float = SHUTDOWN_TIMEOUT):
+        """Stop the worker and write whatever is still queued"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        rows = self._drain()
+        for start in range(0, len(rows), self.batch_rows):
+            self._write(rows[start:start + self.batch_rows])
+        logger.info(f"Submission sink stopped: {self.written} written, {self.dropped} dropped, "
+                    f"{self.failed} failed")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'batches': self.batches
+            }
+
+# Initialize sink only when needed
+submission_sink: Optional[SubmissionSink] = None
+_sink_lock = threading.Lock()
+def get_submission_sink(app) -> SubmissionSink:
+    global submission_sink
+    with _sink_lock:
+        if submission_sink is None:
+            submission_sink = SubmissionSink(app)
+            submission_sink.start()
+            atexit.register(submission_sink.shutdown)
+    return submission_sink
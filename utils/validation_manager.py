@@ -6,6 +6,7 @@ the memory management system, ensuring data integrity and consistency.
 """
 
 import os
+import re
 import json
 import logging
 from typing import Dict, List, Optional, Tuple, Set
@@ -141,14 +142,14 @@ class ValidationManager:
             from utils.memory_manager import memory_manager
 
             test_context = "Testing context relevance with important technical content"
-            low_scores = []
-
-            for file_name in os.listdir(self.base_dir):
-                if file_name.endswith('.md'):
-                    file_path = os.path.join(self.base_dir, file_name)
-                    score = memory_manager.calculate_context_relevance(file_path, test_context)
-                    if score < 0.1:  # Lowered threshold for minimum relevance
-                        low_scores.append((file_name, score))
+            file_paths = [
+                os.path.join(self.base_dir, file_name)
+                for file_name in os.listdir(self.base_dir)
+                if file_name.endswith('.md')
+            ]
+            scores = memory_manager.calculate_context_relevance_batch(file_paths, test_context)
+            # Lowered threshold for minimum relevance
+            low_scores = [(file_name, score) for file_name, score in scores.items() if score < 0.1]
 
             if low_scores:
                 return ValidationResult(
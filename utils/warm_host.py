@@ -0,0 +1,315 @@
+"""
+Pre-started .NET hosts for running compiled student programs.
+
+Starting a program pays for host resolution, runtime initialization and
+JIT of the startup path before Main runs, which for a small exercise is
+most of its run time. A warm host is a dotnet process that has already
+done that work and is blocked waiting for a job. Given a job it loads the
+compiled program.dll into a collectible AssemblyLoadContext, makes the
+session's PTY its stdin/stdout/stderr and runs the entry point, then exits
+with the program's exit code. Each host runs one program, so it can be
+killed and accounted for exactly like an exec'd program, and a fresh host
+is started in the background to replace it.
+
+Enabled with EXECUTION_MODE=warm_host. Any failure to hand off a job
+returns None so the caller falls back to exec'ing the program.
+"""
+import hashlib
+import logging
+import os
+import select
+import subprocess
+import threading
+from collections import deque
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional
+from utils.compile_daemon import get_compile_daemon
+from utils.sandbox import SandboxLimits, SandboxedProcess, sandboxed_popen
+
+logger = logging.getLogger(__name__)
+
+EXECUTION_MODE = os.environ.get('EXECUTION_MODE', 'exec')  # 'exec' or 'warm_host'
+WARM_HOST_POOL_SIZE = int(os.environ.get('WARM_HOST_POOL_SIZE', 2))
+HOST_DIR = os.path.join(os.getcwd(), 'instance', 'warm_host')  # Long-lived, so kept out of compiler_workspace
+HOST_READY_TIMEOUT = 15
+HANDOFF_TIMEOUT = 5
+# CPU a host may use before its job; the program's own budget starts at hand-off
+HOST_STARTUP_CPU_SECONDS = 30
+
+HOST_SOURCE = r'''
+using System;
+using System.IO;
+using System.Reflection;
+using System.Runtime.InteropServices;
+using System.Runtime.Loader;
+using Microsoft.Win32.SafeHandles;
+
+static class WarmHost
+{
+    [DllImport("libc", SetLastError = true)]
+    static extern int open(string path, int flags);
+    [DllImport("libc", SetLastError = true)]
+    static extern int dup2(int oldfd, int newfd);
+    [DllImport("libc")]
+    static extern int close(int fd);
+    const int O_RDWR = 2;
+
+    // Exercise the paths most programs hit, without touching Console,
+    // which must first be opened on the session's PTY
+    static void Warm()
+    {
+        var context = new AssemblyLoadContext("warmup", isCollectible: true);
+        context.Unload();
+        string.Format("{0} {1:F2}", int.Parse("42"), double.Parse("1.5"));
+        var list = new System.Collections.Generic.List<int> { 3, 1, 2 };
+        list.Sort();
+        System.Linq.Enumerable.ToList(System.Linq.Enumerable.Select(list, x => x * 2));
+        new System.Text.StringBuilder().Append(1).Append("x").ToString();
+    }
+
+    static int Main()
+    {
+        var control = new StreamReader(new FileStream(new SafeFileHandle((IntPtr)0, false), FileAccess.Read));
+        var reply = new StreamWriter(new FileStream(new SafeFileHandle((IntPtr)1, false), FileAccess.Write));
+        reply.AutoFlush = true;
+
+        Warm();
+        reply.WriteLine("ready");
+
+        // Job: assembly path, PTY path and working directory, tab separated
+        string job = control.ReadLine();
+        if (job == null)
+            return 0;
+        string[] parts = job.Split('\t');
+        if (parts.Length != 3)
+        {
+            reply.WriteLine("error: malformed job");
+            return 70;
+        }
+
+        MethodInfo entry;
+        try
+        {
+            var context = new AssemblyLoadContext("program", isCollectible: true);
+            entry = context.LoadFromAssemblyPath(parts[0]).EntryPoint;
+        }
+        catch (Exception e)
+        {
+            reply.WriteLine("error: " + e.Message.Replace('\n', ' '));
+            return 70;
+        }
+        if (entry == null)
+        {
+            reply.WriteLine("error: no entry point");
+            return 70;
+        }
+
+        int tty = open(parts[1], O_RDWR);
+        if (tty < 0)
+        {
+            reply.WriteLine("error: cannot open " + parts[1]);
+            return 70;
+        }
+        Directory.SetCurrentDirectory(parts[2]);
+        reply.WriteLine("started");
+
+        dup2(tty, 0);
+        dup2(tty, 1);
+        dup2(tty, 2);
+        close(tty);
+
+        object[] arguments = entry.GetParameters().Length == 0 ? null : new object[] { new string[0] };
+        try
+        {
+            object result = entry.Invoke(null, arguments);
+            Console.Out.Flush();
+            return result is int code ? code : 0;
+        }
+        catch (TargetInvocationException e)
+        {
+            Console.Out.Flush();
+            Console.Error.WriteLine("Unhandled exception. " + e.InnerException);
+            return 134;
+        }
+    }
+}
+'''
+
+class WarmHostPool:
+    """Keeps a few .NET hosts started and ready to run a program"""
+
+    def __init__(self, size: int = WARM_HOST_POOL_SIZE, host_dir: str = HOST_DIR,
+                 limits: Optional[SandboxLimits] = None):
+        self.size = size
+        self.host_dir = Path(host_dir)
+        self.limits = limits or SandboxLimits()
+        self.host_assembly = self.host_dir / 'program.dll'
+        self._ready: Deque[SandboxedProcess] = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._built = False
+        self.launched = 0
+        self.fallbacks = 0
+        self.spawn_failures = 0
+
+    def build(self) -> bool:
+        """Compile the host once per version of its source"""
+        if self._built:
+            return True
+        stamp = self.host_dir / 'source.sha256'
+        digest = hashlib.sha256(HOST_SOURCE.encode()).hexdigest()
+        if self.host_assembly.exists() and stamp.exists() and stamp.read_text() == digest:
+            self._built = True
+            return True
+
+        result = get_compile_daemon().compile(HOST_SOURCE, self.host_dir, timeout=60)
+        if not result['success']:
+            logger.error(f"Failed to build warm host: {result.get('error')}")
+            return False
+        stamp.write_text(digest)
+        self._built = True
+        logger.info(f"Built warm host at {self.host_assembly}")
+        return True
+
+    def _spawn(self) -> Optional[SandboxedProcess]:
+        """Start a host and wait until it reports ready"""
+        try:
+            host = sandboxed_popen(
+                ['dotnet', str(self.host_assembly)],
+                limits=replace(self.limits, cpu_seconds=self.limits.cpu_seconds + HOST_STARTUP_CPU_SECONDS),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                close_fds=True,
+                cwd=str(self.host_dir),
+                env={
+                    **os.environ,
+                    'DOTNET_NOLOGO': 'true',
+                    'DOTNET_CLI_TELEMETRY_OPTOUT': 'true'
+                }
+            )
+        except Exception as e:
+            logger.error(f"Failed to start warm host: {e}")
+            return None
+
+        if self._read_line(host, HOST_READY_TIMEOUT) != 'ready':
+            logger.error(f"Warm host {host.pid} did not become ready")
+            self._discard(host)
+            return None
+        return host
+
+    @staticmethod
+    def _read_line(host: SandboxedProcess, timeout: float) -> Optional[str]:
+        ready, _, _ = select.select([host.stdout], [], [], timeout)
+        if not ready:
+            return None
+        return host.stdout.readline().decode(errors='replace').strip()
+
+    @staticmethod
+    def _discard(host: SandboxedProcess):
+        try:
+            host.kill()
+            host.wait(timeout=2)
+        except Exception:
+            pass
+        for pipe in (host.stdin, host.stdout):
+            try:
+                pipe.close()
+            except Exception:
+                pass
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._refill, name='warm-host-pool', daemon=True)
+            self._thread.start()
+
+    def _refill(self):
+        if not self.build():
+            return
+        while not self._stopping:
+            with self._lock:
+                # Drop hosts that died while idle
+                alive = [h for h in self._ready if h.poll() is None]
+                self._ready = deque(alive)
+                missing = self.size - len(self._ready)
+            if missing > 0:
+                host = self._spawn()
+                if host is None:
+                    self.spawn_failures += 1
+                    self._wakeup.wait(5)
+                    self._wakeup.clear()
+                    continue
+                with self._lock:
+                    self._ready.append(host)
+                continue
+            self._wakeup.wait(30)
+            self._wakeup.clear()
+
+    def launch(self, assembly_path: str, tty_path: str, cwd: str) -> Optional[SandboxedProcess]:
+        """Run a compiled program on a warm host, or return None to fall back"""
+        self.start()
+        with self._lock:
+            host = self._ready.popleft() if self._ready else None
+        self._wakeup.set()
+        if host is None or host.poll() is not None:
+            self.fallbacks += 1
+            logger.debug("No warm host ready, falling back to exec")
+            return None
+
+        try:
+            # Startup CPU is not charged to the program
+            host.restart_budget(self.limits)
+            host.stdin.write(f"{assembly_path}\t{tty_path}\t{cwd}\n".encode())
+            host.stdin.flush()
+            reply = self._read_line(host, HANDOFF_TIMEOUT)
+        except OSError as e:
+            reply = f"error: {e}"
+
+        if reply != 'started':
+            logger.warning(f"Warm host {host.pid} rejected job: {reply}")
+            self._discard(host)
+            self.fallbacks += 1
+            return None
+
+        for pipe in (host.stdin, host.stdout):
+            pipe.close()
+        self.launched += 1
+        return host
+
+    def shutdown(self):
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        with self._lock:
+            hosts = list(self._ready)
+            self._ready.clear()
+        for host in hosts:
+            self._discard(host)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            ready = len(self._ready)
+        return {
+            'size': self.size,
+            'ready': ready,
+            'launched': self.launched,
+            'fallbacks': self.fallbacks,
+            'spawn_failures': self.spawn_failures
+        }
+
+# Initialize pool only when needed
+warm_host_pool: Optional[WarmHostPool] = None
+_pool_lock = threading.Lock()
+def get_warm_host_pool() -> WarmHostPool:
+    global warm_host_pool
+    with _pool_lock:
+        if warm_host_pool is None:
+            warm_host_pool = WarmHostPool()
+    return warm_host_pool